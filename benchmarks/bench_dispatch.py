@@ -0,0 +1,107 @@
+"""Benchmark dispatch engines on a synthetic datadir.
+
+Usage:
+    python benchmarks/bench_dispatch.py [LINES] [RULES] [WORKERS]
+
+Reports wall time of each dispatch engine, of the compiled engine with a
+generated router (including time to generate it) and, if WORKERS is given, of the
+compiled engine routing lines in a pool of WORKERS processes. Also reports peak
+memory allocated by routing and ordering, and the memory held by the line table's
+cache of fields and sort texts relative to the lines themselves.
+"""
+
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+from mklists.exec.codegen import generate_router
+from mklists.exec.dispatch import (
+    _order_datalines,
+    _route_datalines,
+    compile_routing_program,
+)
+from mklists.exec.dispatch_numpy import numpy_available
+from mklists.exec.linetable import LineTable
+from mklists.exec.process_datalines import dispatch_datalines_to_targets
+from mklists.rules import Rule
+
+WORDS = ["NOW", "LATER", "@phone", "@home", "alpha", "beta", "gamma", "delta"]
+
+
+def make_datalines(count: int, rng: random.Random) -> list[str]:
+    """Return synthetic datalines of three to eight words."""
+    return [
+        " ".join(rng.choice(WORDS) + str(rng.randint(0, 99)) for _ in range(8))[
+            : rng.randint(20, 60)
+        ]
+        for _ in range(count)
+    ]
+
+
+def make_rules(count: int, rng: random.Random) -> list[Rule]:
+    """Return synthetic rule chain with most rules reading the initial list."""
+    targets = ["now", "later", "phone", "home", "archive"]
+    return [
+        Rule(
+            source_matchfield=rng.randint(0, 2),
+            source_matchpattern=re.compile(f"^{rng.choice(WORDS)}{rng.randint(0, 99)}"),
+            source="lines",
+            target=rng.choice(targets),
+            target_sortkey=rng.choice([None, 0, 1, 2]),
+        )
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    """Run benchmark and print results."""
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rule_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    rng = random.Random(0)
+    datalines = make_datalines(line_count, rng)
+    rules = make_rules(rule_count, rng)
+    print(f"{line_count} lines, {rule_count} rules")
+
+    engines = ["reference", "compiled"]
+    if numpy_available():
+        engines.append("numpy")
+
+    for engine in engines:
+        start = time.perf_counter()
+        dispatch_datalines_to_targets(rules, datalines, engine=engine)
+        print(f"  {engine:<10} {time.perf_counter() - start:8.3f} s")
+
+    start = time.perf_counter()
+    dispatch_datalines_to_targets(
+        rules, datalines, engine="compiled", router=generate_router(rules)
+    )
+    print(f"  {'generated':<10} {time.perf_counter() - start:8.3f} s")
+
+    if workers > 1:
+        start = time.perf_counter()
+        dispatch_datalines_to_targets(
+            rules, datalines, engine="compiled", workers=workers
+        )
+        label = f"compiled x{workers}"
+        print(f"  {label:<10} {time.perf_counter() - start:8.3f} s")
+
+    program = compile_routing_program(rules)
+    table = LineTable(datalines, cache_fields=True)
+    tracemalloc.start()
+    _order_datalines(program, table, _route_datalines(program, table))
+    peak_nbytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  peak allocated {peak_nbytes / 2**20:.1f} MiB (including cache)")
+    lines_nbytes = sum(sys.getsizeof(line) for line in datalines)
+    cache_nbytes = table.cache_nbytes()
+    print(
+        f"  line table cache {cache_nbytes / 2**20:.1f} MiB "
+        f"({cache_nbytes / lines_nbytes:.2f} x {lines_nbytes / 2**20:.1f} MiB of lines)"
+    )
+
+
+if __name__ == "__main__":
+    main()
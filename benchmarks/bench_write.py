@@ -0,0 +1,96 @@
+"""Benchmark writing large lists to datafiles.
+
+Usage:
+    python benchmarks/bench_write.py [LINES] [REPEAT]
+
+Reports best wall time and throughput of writing a synthetic list of LINES
+lines to a new datafile with one formatted write per line (as datafiles were
+once written) and with `DatafileReconciler` at several buffer sizes, and of
+comparing the list with an unchanged datafile (which is then not written).
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mklists.exec.reconcile import DatafileReconciler, datafile_state
+
+WORDS = ["NOW", "LATER", "@phone", "@home", "alpha", "beta", "gamma", "delta"]
+BUFFER_SIZES_KB = [4, 16, 64, 256, 1024]
+
+
+def make_datalines(count: int, rng: random.Random) -> list[str]:
+    """Return synthetic datalines of three to eight words."""
+    return [
+        " ".join(rng.choice(WORDS) + str(rng.randint(0, 99)) for _ in range(8))[
+            : rng.randint(20, 60)
+        ]
+        for _ in range(count)
+    ]
+
+
+def write_per_line(datadir: Path, datalines: list[str]) -> None:
+    """Write lines with one formatted write each."""
+    with (datadir / "list.txt").open("w", encoding="utf-8") as f:
+        for line in datalines:
+            f.write(f"{line}\n")
+
+
+def write_reconciled(
+    datadir: Path, datalines: list[str], old_states: dict, buffer_size: int
+) -> None:
+    """Write lines with a reconciler (without syncing)."""
+    reconciler = DatafileReconciler(
+        datadir, dict(old_states), fsync="none", buffer_size=buffer_size
+    )
+    reconciler.write("list.txt", datalines)
+    reconciler.finish()
+
+
+def best_time(function, repeat: int) -> float:
+    """Return shortest of repeated wall times of function."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    """Run benchmark and print results."""
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    datalines = make_datalines(line_count, random.Random(0))
+    nbytes = sum(len(line.encode()) + 1 for line in datalines)
+    print(f"{line_count} lines, {nbytes / 2**20:.1f} MiB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datadir = Path(tmp)
+
+        def report(label: str, seconds: float) -> None:
+            rate = nbytes / 2**20 / seconds
+            print(f"  {label:<22} {seconds:8.3f} s {rate:8.1f} MiB/s")
+
+        report(
+            "per-line write",
+            best_time(lambda: write_per_line(datadir, datalines), repeat),
+        )
+
+        for kb in BUFFER_SIZES_KB:
+            seconds = best_time(
+                lambda: write_reconciled(datadir, datalines, {}, kb * 1024), repeat
+            )
+            report(f"chunked {kb} KiB", seconds)
+
+        old_states = {"list.txt": datafile_state((datadir / "list.txt").read_bytes())}
+        seconds = best_time(
+            lambda: write_reconciled(datadir, datalines, old_states, 64 * 1024), repeat
+        )
+        report("unchanged 64 KiB", seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,27 @@
 """CLI entry point for mklists."""
 
 import datetime
+from dataclasses import replace
 from pathlib import Path
+from typing import TextIO
 
 import click
 
 from mklists.config.resolve import resolve_config
-from mklists.errors import MklistsError, StructureError
+from mklists.errors import DataNotFoundError, MklistsError, StructureError
+from mklists.exec.codegen import generate_router
+from mklists.exec.dispatch import RoutingTrace
+from mklists.exec.process_datadirs import trace_datadir
+from mklists.exec.rule_stats import (
+    DatadirRuleStats,
+    format_rule_stats,
+    rule_stats_to_json,
+)
 from mklists.exec.run import run_mklists
 from mklists.init.datadir import init_datadir
 from mklists.init.datatree import init_datatree
 from mklists.logging import init_logger
+from mklists.plan.model import RunPlan
 from mklists.plan.resolve import resolve_run_plan
 from mklists.structure.markers import (
     DATADIR_CONFIGFILE_NAME,
@@ -36,6 +47,40 @@ class _DateCommand(click.Command):
         _write_date_epilog(formatter)
 
 
+def _echo_routers(run_plan: RunPlan) -> None:
+    """Print generated routing source of each datadir in run plan."""
+    for datadir_plan in run_plan.datadir_plans:
+        click.echo(f"# {datadir_plan.datadir}")
+        if not datadir_plan.rules:
+            click.echo("# (no rules)")
+            continue
+        router = generate_router(datadir_plan.rules)
+        if router is None:
+            click.echo("# (too many rule tests to generate; routing is interpreted)")
+        else:
+            click.echo(router.source)
+
+
+def _echo_line_paths(trace: RoutingTrace, line_ids: list[int]) -> None:
+    """Print the path through the rules of each given traced line."""
+    rules = trace.program.rules
+    for line_id in line_ids:
+        click.echo(f"  {trace.lines[line_id]}")
+        for rule_index, source, target in trace.hops(line_id):
+            rule = rules[rule_index]
+            where = "" if rule.rulefile is None else f" ({rule.rulefile}:{rule.lineno})"
+            click.echo(f"    rule {rule_index}{where}: {source} -> {target}")
+        click.echo(f"    ends in {trace.final_list(line_id)}")
+
+
+def _echo_rule_stats(rule_stats: list[DatadirRuleStats], top: int) -> None:
+    """Print costliest rules of each datadir processed, pass by pass."""
+    for datadir_rule_stats in rule_stats:
+        click.echo("")
+        for line in format_rule_stats(datadir_rule_stats, top):
+            click.echo(line)
+
+
 def _echo_startdir_context(startdir: Path) -> None:
     """Echo directory, role, and marker file presence for startdir."""
 
@@ -223,7 +268,53 @@ def status(directory: str | None) -> None:
     metavar="<path>",
     help="Run as if started in <path> instead of current directory.",
 )
-def run(directory: str | None) -> None:
+@click.option(
+    "--dump-router",
+    is_flag=True,
+    default=False,
+    help="Print generated routing source for each datadir instead of running.",
+)
+@click.option(
+    "--rule-stats",
+    is_flag=True,
+    default=False,
+    help="Profile rules and print the costliest rules of each datadir.",
+)
+@click.option(
+    "--rule-stats-top",
+    default=10,
+    show_default=True,
+    type=click.IntRange(min=1),
+    metavar="<n>",
+    help="Number of rules per datadir printed by --rule-stats.",
+)
+@click.option(
+    "--rule-stats-json",
+    "rule_stats_json",
+    default=None,
+    type=click.File("w"),
+    metavar="<file>",
+    help=(
+        "Profile rules and write counters of all rules as JSON to <file> "
+        "('-' for stdout)."
+    ),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=None,
+    type=click.IntRange(min=1),
+    metavar="<n>",
+    help="Process up to <n> datadirs at a time (overrides performance.jobs).",
+)
+def run(
+    directory: str | None,
+    dump_router: bool,
+    rule_stats: bool,
+    rule_stats_top: int,
+    rule_stats_json: TextIO | None,
+    jobs: int | None,
+) -> None:
     """Run mklists against current directory."""
     startdir = Path(directory).resolve() if directory else Path.cwd()
     try:
@@ -237,8 +328,63 @@ def run(directory: str | None) -> None:
         run_plan = resolve_run_plan(
             structural_context=structural_context, config=config
         )
-        empty_datadirs = run_mklists(run_plan)
+        if dump_router:
+            _echo_routers(run_plan)
+            return
+        if jobs is not None:
+            run_plan = replace(
+                run_plan, performance=replace(run_plan.performance, jobs=jobs)
+            )
+        recorded = [] if rule_stats or rule_stats_json else None
+        empty_datadirs = run_mklists(run_plan, rule_stats=recorded)
     except MklistsError as e:
         raise click.ClickException(str(e)) from e
+    if rule_stats:
+        _echo_rule_stats(recorded, rule_stats_top)
+    if rule_stats_json is not None:
+        rule_stats_json.write(rule_stats_to_json(recorded) + "\n")
     for path in empty_datadirs:
         click.echo(f"No data found in {path}")
+
+
+@cli.command(cls=_DateCommand)
+@click.argument("text")
+@click.option(
+    "-C",
+    "directory",
+    default=None,
+    metavar="<path>",
+    help="Explain as if started in <path> instead of current directory.",
+)
+def explain(text: str, directory: str | None) -> None:
+    """Show which rules move each line containing TEXT, and where it ends up.
+
+    Rules are applied to the datalines of each datadir in scope, as by the
+    first pass of `mklists run`, but no datafile is changed.
+    """
+    startdir = Path(directory).resolve() if directory else Path.cwd()
+    try:
+        structural_context = resolve_structural_context(startdir)
+    except StructureError as e:
+        _echo_startdir_context(startdir)
+        raise click.ClickException(str(e)) from e
+    found = 0
+    try:
+        config = resolve_config(structural_context)
+        run_plan = resolve_run_plan(
+            structural_context=structural_context, config=config
+        )
+        for datadir_plan in run_plan.datadir_plans:
+            try:
+                trace = trace_datadir(datadir_plan=datadir_plan, safety=run_plan.safety)
+            except DataNotFoundError:
+                continue
+            line_ids = trace.find(text)
+            if line_ids:
+                click.echo(str(datadir_plan.datadir))
+                _echo_line_paths(trace, line_ids)
+                found += len(line_ids)
+    except MklistsError as e:
+        raise click.ClickException(str(e)) from e
+    if not found:
+        click.echo(f"No line contains {text!r}")
@@ -31,6 +31,36 @@ routing:
   #   to_b.txt: b
   #   to_bar.txt: /Users/foo/bar   # for moving files out of datatree
 
+# Performance: tuning for very large datadirs.
+# sort_memory_limit_mb: sort final lists larger than this many megabytes of text
+# on disk, in sorted runs merged while the list is written; null sorts in memory.
+# route_cache_entries: remember routes of up to this many lines in a hidden file
+# in each datadir, so that unchanged lines are not routed again; null disables.
+# fsync: none (leave writes to the OS), dir (sync each directory once after
+# writing to it) or file (also sync each file written).
+# write_buffer_kb: write datafiles in chunks of about this many kilobytes.
+# mmap_threshold_mb: memory-map datafiles of this many megabytes or more,
+# rather than reading them into memory; null always reads. A mapped datafile
+# truncated by another program while it is read crashes mklists (SIGBUS).
+# jobs: process up to this many datadirs at a time (overridden by --jobs).
+performance:
+  sort_memory_limit_mb: null
+  # sort_memory_limit_mb: 256
+  route_cache_entries: null
+  # route_cache_entries: 1000000
+  skip_unchanged: false
+  # skip_unchanged: true
+  fsync: dir
+  # fsync: file
+  write_buffer_kb: 64
+  mmap_threshold_mb: null
+  # mmap_threshold_mb: 16
+  jobs: 1
+  # jobs: 4
+  dispatch_workers: 1
+  # dispatch_workers: 4
+  min_chunk_lines: 50000
+
 # Safety: processing halts if safety criteria are violated.
 safety:
   invalid_filename_patterns:
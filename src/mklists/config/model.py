@@ -1,9 +1,11 @@
 """@@@"""
 
 from typing import Pattern
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
+FSYNC_POLICIES = ("none", "dir", "file")
+
 
 @dataclass(slots=True, frozen=True)
 class BackupConfig:
@@ -35,6 +37,21 @@ class LinkifyConfig:
     linkify_html_dir: Path | None
 
 
+@dataclass(slots=True, frozen=True)
+class PerformanceConfig:
+    """Settings for tuning the processing of very large datadirs."""
+
+    sort_memory_limit: int | None = None
+    route_cache_entries: int | None = None
+    skip_unchanged: bool = False
+    fsync: str = "dir"
+    write_buffer_size: int = 64 * 1024
+    mmap_threshold: int | None = None
+    jobs: int = 1
+    dispatch_workers: int = 1
+    min_chunk_lines: int = 50_000
+
+
 @dataclass(frozen=True, slots=True)
 class Config:
     """Normalized, validated settings for processing one or more datadirs."""
@@ -49,3 +66,4 @@ class Config:
     linkify: LinkifyConfig
     routing: RoutingConfig
     safety: SafetyConfig
+    performance: PerformanceConfig = field(default_factory=PerformanceConfig)
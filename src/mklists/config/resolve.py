@@ -10,8 +10,10 @@ import yaml
 from mklists.errors import ConfigError, StructureError
 from mklists.config.defaults import DEFAULT_CONFIG_YAML
 from mklists.config.model import (
+    FSYNC_POLICIES,
     BackupConfig,
     LinkifyConfig,
+    PerformanceConfig,
     RoutingConfig,
     SafetyConfig,
     Config,
@@ -62,6 +64,7 @@ def resolve_config(structural_context: StructuralContext) -> Config:
             config_dict=config_dict, config_rootdir=config_rootdir
         ),
         safety=_make_safety_config(config_dict=config_dict),
+        performance=_make_performance_config(config_dict=config_dict),
     )
 
 
@@ -370,3 +373,117 @@ def _make_linkify_config(
         linkify_md_dir=_resolve_dir(linkify_raw["linkify_md_dir"]),
         linkify_html_dir=_resolve_dir(linkify_raw["linkify_html_dir"]),
     )
+
+
+def _make_performance_config(config_dict: dict[str, Any]) -> PerformanceConfig:
+    """Initialize instance of PerformanceConfig.
+
+    Args:
+        config_dict: Config dictionary as derived from YAML.
+
+    Returns:
+        Instance of PerformanceConfig initialized from config dictionary.
+
+    Note:
+        Assumes all required keys are present.
+    """
+    performance_raw = config_dict["performance"]
+    sort_memory_limit_mb = performance_raw["sort_memory_limit_mb"]
+
+    if sort_memory_limit_mb is None:
+        sort_memory_limit = None
+    else:
+        if (
+            isinstance(sort_memory_limit_mb, bool)
+            or not isinstance(sort_memory_limit_mb, (int, float))
+            or sort_memory_limit_mb <= 0
+        ):
+            raise ValueError(
+                f"sort_memory_limit_mb must be a positive number or null, "
+                f"not {sort_memory_limit_mb!r}."
+            )
+        sort_memory_limit = int(sort_memory_limit_mb * 2**20)
+
+    route_cache_entries = performance_raw["route_cache_entries"]
+    if route_cache_entries is not None and (
+        isinstance(route_cache_entries, bool)
+        or not isinstance(route_cache_entries, int)
+        or route_cache_entries <= 0
+    ):
+        raise ValueError(
+            f"route_cache_entries must be a positive integer or null, "
+            f"not {route_cache_entries!r}."
+        )
+
+    skip_unchanged = performance_raw["skip_unchanged"]
+    if not isinstance(skip_unchanged, bool):
+        raise ValueError(
+            f"skip_unchanged must be true or false, not {skip_unchanged!r}."
+        )
+
+    fsync = performance_raw["fsync"]
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(
+            f"fsync must be one of {', '.join(FSYNC_POLICIES)}, not {fsync!r}."
+        )
+
+    write_buffer_kb = performance_raw["write_buffer_kb"]
+    if (
+        isinstance(write_buffer_kb, bool)
+        or not isinstance(write_buffer_kb, int)
+        or write_buffer_kb <= 0
+    ):
+        raise ValueError(
+            f"write_buffer_kb must be a positive integer, not {write_buffer_kb!r}."
+        )
+
+    mmap_threshold_mb = performance_raw["mmap_threshold_mb"]
+    if mmap_threshold_mb is None:
+        mmap_threshold = None
+    else:
+        if (
+            isinstance(mmap_threshold_mb, bool)
+            or not isinstance(mmap_threshold_mb, (int, float))
+            or mmap_threshold_mb <= 0
+        ):
+            raise ValueError(
+                f"mmap_threshold_mb must be a positive number or null, "
+                f"not {mmap_threshold_mb!r}."
+            )
+        mmap_threshold = int(mmap_threshold_mb * 2**20)
+
+    jobs = performance_raw["jobs"]
+    if isinstance(jobs, bool) or not isinstance(jobs, int) or jobs <= 0:
+        raise ValueError(f"jobs must be a positive integer, not {jobs!r}.")
+
+    dispatch_workers = performance_raw["dispatch_workers"]
+    if (
+        isinstance(dispatch_workers, bool)
+        or not isinstance(dispatch_workers, int)
+        or dispatch_workers <= 0
+    ):
+        raise ValueError(
+            f"dispatch_workers must be a positive integer, not {dispatch_workers!r}."
+        )
+
+    min_chunk_lines = performance_raw["min_chunk_lines"]
+    if (
+        isinstance(min_chunk_lines, bool)
+        or not isinstance(min_chunk_lines, int)
+        or min_chunk_lines <= 0
+    ):
+        raise ValueError(
+            f"min_chunk_lines must be a positive integer, not {min_chunk_lines!r}."
+        )
+
+    return PerformanceConfig(
+        sort_memory_limit=sort_memory_limit,
+        route_cache_entries=route_cache_entries,
+        skip_unchanged=skip_unchanged,
+        fsync=fsync,
+        write_buffer_size=write_buffer_kb * 1024,
+        mmap_threshold=mmap_threshold,
+        jobs=jobs,
+        dispatch_workers=dispatch_workers,
+        min_chunk_lines=min_chunk_lines,
+    )
@@ -8,9 +8,12 @@ Run layer:
 """
 
 import shutil
+from collections.abc import Mapping
 from pathlib import Path
 from typing import Iterable
 
+from mklists.exec.durability import sync_dir, sync_path
+from mklists.exec.snapshot import DirSnapshot, take_dir_snapshot
 from mklists.logging import logger
 
 
@@ -18,12 +21,17 @@ def backup_datadirs(
     *,
     datadirs: Iterable[Path],
     snapshot_dir: Path,
+    dir_snapshots: Mapping[Path, DirSnapshot] | None = None,
+    fsync: str = "dir",
 ) -> None:
     """Copy datadirs into already-initialized snapshot directory.
 
     Args:
         datadirs: Datadirs to snapshot.
         snapshot_dir: Directory for snapshots of datadirs.
+        dir_snapshots: Snapshots of datadirs taken at the start of the pass (a
+            snapshot is taken for any datadir not found here).
+        fsync: Durability policy ("none", "dir" or "file").
 
     Raises:
         FileExistsError: If snapshot_dir already exists.
@@ -36,19 +44,37 @@ def backup_datadirs(
     logger.info(f"Backup {snapshot_dir}")
 
     for datadir in datadirs:
-        target = snapshot_dir / datadir.name
-        shutil.copytree(src=datadir, dst=target)
+        dir_snapshot = None if dir_snapshots is None else dir_snapshots.get(datadir)
+        if dir_snapshot is None:
+            dir_snapshot = take_dir_snapshot(datadir)
+        _copy_datadir(dir_snapshot, snapshot_dir / datadir.name, fsync)
+    sync_dir(snapshot_dir, fsync)
+
+
+def _copy_datadir(dir_snapshot: DirSnapshot, target: Path, fsync: str) -> None:
+    """Copy entries of datadir, as listed in snapshot, as `shutil.copytree` would."""
+    target.mkdir()
+    for name, entry in dir_snapshot.entries.items():
+        if entry.is_dir():
+            shutil.copytree(src=entry.path, dst=target / name)
+        else:
+            shutil.copy2(src=entry.path, dst=target / name)
+            sync_path(target / name, fsync)
+    shutil.copystat(dir_snapshot.dirpath, target)
+    sync_dir(target, fsync)
 
 
 def init_snapshot_dir(
     snapshot_dir: Path,
     snapshot_datatree_configfiles: list[Path],
+    fsync: str = "dir",
 ) -> None:
     """Initialize directory for backup of one pass of a mklists run.
 
     Args:
         snapshot_dir: Backup directory to initialize.
         snapshot_datatree_configfiles: List of datatree-level config files to back up.
+        fsync: Durability policy ("none", "dir" or "file").
 
     Returns:
         None, after creating and initializing the backup root directory.
@@ -59,7 +85,9 @@ def init_snapshot_dir(
     snapshot_dir.mkdir(parents=True, exist_ok=False)
 
     for datatree_configfile_to_snapshot in snapshot_datatree_configfiles:
-        shutil.copy2(src=datatree_configfile_to_snapshot, dst=snapshot_dir)
+        copied = shutil.copy2(src=datatree_configfile_to_snapshot, dst=snapshot_dir)
+        sync_path(Path(copied), fsync)
+    sync_dir(snapshot_dir.parent, fsync)
 
 
 def prune_backupdirs(backup_rootdir: Path, backup_depth: int) -> None:
@@ -0,0 +1,269 @@
+"""Generate specialized Python source for routing datalines through a rule chain.
+
+The compiled engine in `dispatch` routes lines by interpreting a routing program:
+for each rule it looks up the match field, the matcher and the rule run, and
+branches on them. This module instead emits, for a given rule chain, Python
+source in which those decisions are already made: one straight-line function per
+point at which a line can enter a list (the start of the chain, or just after a
+rule that moves lines to that list), with constant field indexes, literal
+patterns written as string constants and regexes as bound `search` methods.
+
+Generated source is compiled once per rule chain with `compile()`, when the first
+datadir with that chain is processed, and the result is reused, so datadirs
+sharing rules, or processed in several passes, compile their rules once (and a
+datadir never processed, not at all). The router
+returns exactly what `_route_datalines` returns.
+
+Each entry inlines the tests of every later rule reading its list, so source
+grows with the number of entries times the number of rules, quadratically in
+long chains whose lists feed one another. Past MAX_GENERATED_TESTS inlined rule
+tests no router is generated, and the compiled engine interprets the routing
+program instead.
+"""
+
+from array import array
+from bisect import bisect_right
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from mklists.exec.dispatch import RoutingProgram, compile_routing_program
+from mklists.exec.linetable import LINE_ID_TYPECODE
+from mklists.rules import Rule
+from mklists.rules.load import RUN_GROUP_PREFIX
+
+INDENT = "    "
+
+# Compiling takes some 40 microseconds per inlined rule test.
+MAX_GENERATED_TESTS = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class GeneratedRouter:
+    """Routing function generated for one rule chain, and its source.
+
+    Attributes:
+        program: Routing program from which the function was generated.
+        source: Generated Python source (defining function `route`).
+        route: Function mapping datalines to, for each rule, an array of IDs of
+            lines moved by that rule, in ascending order.
+    """
+
+    program: RoutingProgram
+    source: str
+    route: Callable[[list[str]], list[array]] = field(repr=False, compare=False)
+
+
+def generate_router(rules: list[Rule]) -> GeneratedRouter | None:
+    """Generate and compile a routing function specialized to given rule chain.
+
+    Args:
+        rules: Non-empty list of Rule objects, in order of application.
+
+    Returns:
+        GeneratedRouter holding routing program, source and compiled function,
+        or None if the function would inline more than MAX_GENERATED_TESTS rule
+        tests.
+    """
+    program = compile_routing_program(rules)
+    entries = _reachable_entries(program)
+    test_count = sum(
+        len(program.source_events[list_id]) - position for list_id, position in entries
+    )
+    if test_count > MAX_GENERATED_TESTS:
+        return None
+
+    source, namespace = _generate_source(program, entries)
+    code = compile(source, f"<mklists router for {len(rules)} rules>", "exec")
+    exec(code, namespace)  # noqa: S102 - source is generated from validated rules
+
+    return GeneratedRouter(program=program, source=source, route=namespace["route"])
+
+
+def _generate_source(
+    program: RoutingProgram,
+    entries: list[tuple[int, int]],
+) -> tuple[str, dict[str, object]]:
+    """Return source of routing function, and the globals that it refers to.
+
+    Note:
+        An entry `e<list>_<position>` tests a line against the rules that take
+        list `<list>` as source, from `<position>` in `source_events` onward.
+        Entries return the next entry (or None once the line has come to rest)
+        and the fields of the line, so a line moves through any number of lists
+        without recursion.
+    """
+    namespace: dict[str, object] = {"array": array, "TYPECODE": LINE_ID_TYPECODE}
+    rule_count = len(program.rules)
+
+    lines = ["def route(lines):"]
+    for rule_index in range(rule_count):
+        lines.append(f"{INDENT}b{rule_index} = array(TYPECODE)")
+        lines.append(f"{INDENT}a{rule_index} = b{rule_index}.append")
+
+    for list_id, position in entries:
+        lines.extend(
+            INDENT + line
+            for line in _entry_source(program, namespace, list_id, position)
+        )
+
+    # Moves by rules in a run refer to entries, so follow their definitions.
+    reachable = {
+        rule_index
+        for list_id, position in entries
+        for rule_index in program.source_events[list_id][position:]
+    }
+    for rule_index, run in enumerate(program.rule_runs):
+        if run is not None and rule_index in reachable:
+            moves = ", ".join(
+                f"(a{i}, {_entry_after(program, i)})" for i in run.rule_indexes
+            )
+            lines.append(f"{INDENT}t{rule_index} = ({moves},)")
+
+    first = _entry_name(program.initial_list, 0)
+    lines.extend(
+        [
+            f"{INDENT}for line_id, line in enumerate(lines):",
+            f"{INDENT * 2}entry, fields = {first}(line_id, line, None)",
+            f"{INDENT * 2}while entry is not None:",
+            f"{INDENT * 3}entry, fields = entry(line_id, line, fields)",
+            f"{INDENT}return [{', '.join(f'b{i}' for i in range(rule_count))}]",
+        ]
+    )
+
+    return "\n".join(lines) + "\n", namespace
+
+
+def _reachable_entries(program: RoutingProgram) -> list[tuple[int, int]]:
+    """Return (list ID, position) of every entry a line can reach, first seen first."""
+    start = (program.initial_list, 0)
+    entries = [start]
+    seen = {start}
+    index = 0
+
+    while index < len(entries):
+        list_id, position = entries[index]
+        index += 1
+        for rule_index in program.source_events[list_id][position:]:
+            target_id = program.target_ids[rule_index]
+            events = program.source_events[target_id]
+            entry = (target_id, bisect_right(events, rule_index))
+            if entry[1] < len(events) and entry not in seen:
+                seen.add(entry)
+                entries.append(entry)
+
+    return entries
+
+
+def _entry_name(list_id: int, position: int) -> str:
+    return f"e{list_id}_{position}"
+
+
+def _entry_after(program: RoutingProgram, rule_index: int) -> str:
+    """Return name of entry reached by a line that given rule moves, or "None"."""
+    target_id = program.target_ids[rule_index]
+    events = program.source_events[target_id]
+    position = bisect_right(events, rule_index)
+    if position == len(events):
+        return "None"
+    return _entry_name(target_id, position)
+
+
+def _entry_source(
+    program: RoutingProgram,
+    namespace: dict[str, object],
+    list_id: int,
+    position: int,
+) -> list[str]:
+    """Return source lines of one entry function."""
+    events = program.source_events[list_id]
+    lines = [f"def {_entry_name(list_id, position)}(line_id, line, fields):"]
+    fields_split = False
+
+    while position < len(events):
+        rule_index = events[position]
+        rule = program.rules[rule_index]
+        run = program.rule_runs[rule_index]
+        position += 1 if run is None else len(run.rule_indexes)
+        matchfield = rule.source_matchfield
+
+        source = program.listnames[program.source_ids[rule_index]]
+        target = program.listnames[program.target_ids[rule_index]]
+        lines.append(
+            f"{INDENT}# rule {rule_index}: {source!r} -> {target!r}, field {matchfield}"
+            + ("" if run is None else f", run of {len(run.rule_indexes)}")
+        )
+
+        if matchfield < 0:
+            continue
+
+        if matchfield == 0:
+            text, indent = "line", INDENT
+        else:
+            if not fields_split:
+                lines.append(f"{INDENT}if fields is None:")
+                lines.append(f"{INDENT * 2}fields = line.split()")
+                fields_split = True
+            lines.append(f"{INDENT}if len(fields) >= {matchfield}:")
+            lines.append(f"{INDENT * 2}text = fields[{matchfield - 1}]")
+            text, indent = "text", INDENT * 2
+
+        if run is None:
+            test = _test_expression(rule, rule_index, text, namespace)
+            lines.append(f"{indent}if {test}:")
+            lines.append(f"{indent}{INDENT}a{rule_index}(line_id)")
+            entry = _entry_after(program, rule_index)
+            lines.append(f"{indent}{INDENT}return {entry}, fields")
+        elif run.index is not None:
+            namespace[f"x{rule_index}"] = run.index
+            lines.append(f"{indent}hit = x{rule_index}.get({text})")
+            lines.append(f"{indent}if hit is not None:")
+            lines.extend(_run_move_source(indent + INDENT, rule_index))
+        else:
+            groups = {
+                name: int(name[len(RUN_GROUP_PREFIX) :])
+                for name in run.classifier.groupindex
+            }
+            namespace[f"c{rule_index}"] = run.classifier.match
+            namespace[f"g{rule_index}"] = groups
+            lines.append(f"{indent}match = c{rule_index}({text})")
+            lines.append(f"{indent}if match is not None:")
+            lines.append(f"{indent}{INDENT}hit = g{rule_index}[match.lastgroup]")
+            lines.extend(_run_move_source(indent + INDENT, rule_index))
+
+    lines.append(f"{INDENT}return None, fields")
+    return lines
+
+
+def _run_move_source(indent: str, rule_index: int) -> list[str]:
+    """Return source lines moving a line by the rule found at `hit` in a run."""
+    return [
+        f"{indent}append, entry = t{rule_index}[hit]",
+        f"{indent}append(line_id)",
+        f"{indent}return entry, fields",
+    ]
+
+
+def _test_expression(
+    rule: Rule,
+    rule_index: int,
+    text: str,
+    namespace: dict[str, object],
+) -> str:
+    """Return expression testing whether text matches pattern of given rule."""
+    matcher = rule.source_matcher
+    literal = matcher.literal
+    with_newline = f"{literal}\n"
+
+    if matcher.kind == "literal":
+        return f"{literal!r} in {text}"
+    if matcher.kind == "prefix":
+        return f"{text}.startswith({literal!r})"
+    if matcher.kind == "suffix":
+        return f"{text}.endswith({(literal, with_newline)!r})"
+    if matcher.kind == "exact":
+        return f"({text} == {literal!r} or {text} == {with_newline!r})"
+    if matcher.kind == "equal":
+        return f"{text} == {literal!r}"
+
+    namespace[f"s{rule_index}"] = matcher.pattern.search
+    return f"s{rule_index}({text}) is not None"
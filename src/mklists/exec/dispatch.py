@@ -0,0 +1,850 @@
+"""Compiled dispatch of datalines through a validated rule chain.
+
+The reference dispatcher in `process_datalines` re-partitions the whole source
+list for every rule. This engine compiles the rule chain into a routing program
+and works in two phases:
+
+1. Route: each line is pushed through only those rules whose source is the list
+   the line currently belongs to. Where a line ends up depends only on the line
+   itself, so this phase records, per rule, which lines it moved.
+2. Order: list order is replayed rule by rule, visiting only rules that can have
+   an effect (see `RuleSchedule`). Sorting is deferred until a list is next read
+   as a source, or until the end, and lines appended to an already-sorted list
+   are merged into it rather than re-sorted along with it.
+
+Lines are held once, in a line table; both phases move only compact arrays of
+line IDs, and lists of lines are returned as `IndexedLines` views, whose strings
+are looked up only when read. The result is identical to that of the reference
+dispatcher, including lines that fan back from targets that later become sources.
+
+Because routing a line depends only on the line, phase 1 can be split across a
+process pool: each worker routes one contiguous chunk of the line table, and the
+per-rule batches of the chunks, concatenated in chunk order, are exactly those of
+serial routing.
+
+For profiling, phase 1 can instead be run one rule at a time, so that the time
+spent testing lines against each rule can be measured (see `RuleStats`).
+
+Because each line moves through rules in ascending order, the per-rule batches
+recorded by phase 1 are also a complete, compact log of where every line went;
+a `RoutingTrace` keeps them, at no cost to routing, and reconstructs the hops
+of a line only when asked.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import filterfalse
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from mklists.exec.external_sort import (
+    SpilledLines,
+    sort_in_chunks,
+    spill_sorted_runs,
+)
+from mklists.exec.linetable import IndexedLines, LineTable, line_id_array
+from mklists.rules import Rule, RuleRun, group_rule_runs
+from mklists.rules.load import RUN_GROUP_PREFIX
+
+if TYPE_CHECKING:
+    from mklists.exec.codegen import GeneratedRouter
+    from mklists.exec.route_cache import RouteCache
+
+PARALLEL_MIN_CHUNK_LINES = 50_000
+
+ListFlush = Callable[[str, Sequence[str]], None]
+
+
+@dataclass(frozen=True, slots=True)
+class RoutingProgram:
+    """Rule chain compiled into per-list routing tables.
+
+    Lists are identified by integer IDs (indexes into `listnames`). For each
+    rule that begins a run of rules with a combined classifier or an equality
+    index, `rule_runs` holds that run; for other rules it holds None. For each
+    list, `list_events` holds the indexes of the rules that can change the list
+    while it holds lines: those that take it as source, and those that sort it
+    as target.
+    """
+
+    rules: list[Rule]
+    listnames: list[str]
+    initial_list: int
+    source_ids: list[int]
+    target_ids: list[int]
+    source_events: list[list[int]]
+    list_events: list[list[int]]
+    rule_runs: list[RuleRun | None]
+
+
+@dataclass(frozen=True, slots=True)
+class RuleStats:
+    """Counters recorded for one rule while profiling a dispatch.
+
+    Attributes:
+        rule: Rule (with rule file and line number, if loaded from a file).
+        lines_examined: Number of lines tested against the rule.
+        lines_matched: Number of lines moved by the rule.
+        match_seconds: Time spent testing lines against the rule.
+        sort_seconds: Time spent sorting the target list, with the lines just
+            added to it, if the rule sorts it.
+    """
+
+    rule: Rule
+    lines_examined: int
+    lines_matched: int
+    match_seconds: float
+    sort_seconds: float
+
+    @property
+    def seconds(self) -> float:
+        """Total time spent on the rule."""
+        return self.match_seconds + self.sort_seconds
+
+
+@dataclass(slots=True)
+class DispatchStats:
+    """Counts recorded by a dispatch engine while applying a rule chain.
+
+    Attributes:
+        rules_skipped: Number of rules not applied because they could have no
+            effect: their source list was empty, and they either did not sort
+            their target list or it held fewer than two lines.
+        rule_stats: For each rule, counters recorded if rules were profiled.
+        trace: Routing trace, if routing was traced.
+    """
+
+    rules_skipped: int = 0
+    rule_stats: list[RuleStats] | None = None
+    trace: "RoutingTrace | None" = None
+
+
+@dataclass(frozen=True, slots=True)
+class RoutingTrace:
+    """Record of the lines moved by each rule, from which any line's path is rebuilt.
+
+    Attributes:
+        program: Routing program with which lines were routed.
+        lines: Datalines, indexed by line ID (None where released by a flush).
+        batches: For each rule, IDs of lines moved by that rule, in ascending
+            order.
+    """
+
+    program: RoutingProgram
+    lines: list[str | None]
+    batches: list[array]
+
+    def find(self, text: str) -> list[int]:
+        """Return IDs of lines that contain given text, in ascending order."""
+        return [
+            line_id
+            for line_id, line in enumerate(self.lines)
+            if line is not None and text in line
+        ]
+
+    def hops(self, line_id: int) -> list[tuple[int, str, str]]:
+        """Return (rule index, from-list, to-list) of each move of given line.
+
+        Note:
+            As in routing, only the rules that read the list the line is in are
+            looked at, each with a binary search of the lines it moved.
+        """
+        program = self.program
+        batches = self.batches
+        list_id = program.initial_list
+        rule_index = -1
+        hops = []
+
+        while True:
+            events = program.source_events[list_id]
+            for next_index in events[bisect_right(events, rule_index) :]:
+                batch = batches[next_index]
+                position = bisect_left(batch, line_id)
+                if position < len(batch) and batch[position] == line_id:
+                    break
+            else:
+                return hops
+            rule_index = next_index
+            list_id = program.target_ids[rule_index]
+            hops.append(
+                (
+                    rule_index,
+                    program.listnames[program.source_ids[rule_index]],
+                    program.listnames[list_id],
+                )
+            )
+
+    def final_list(self, line_id: int) -> str:
+        """Return name of list in which given line ends up."""
+        hops = self.hops(line_id)
+        if hops:
+            return hops[-1][2]
+        return self.program.listnames[self.program.initial_list]
+
+
+def compile_routing_program(rules: list[Rule]) -> RoutingProgram:
+    """Compile validated rule chain into a routing program.
+
+    Args:
+        rules: List of Rule objects, in order of application.
+
+    Returns:
+        RoutingProgram with list IDs, for each list the indexes of the rules that
+        take that list as their source, and runs of rules that can be tested
+        against a line with a single scan.
+    """
+    listnames: list[str] = []
+    list_ids: dict[str, int] = {}
+
+    def list_id(name: str) -> int:
+        if name not in list_ids:
+            list_ids[name] = len(listnames)
+            listnames.append(name)
+        return list_ids[name]
+
+    source_ids = [list_id(rule.source) for rule in rules]
+    target_ids = [list_id(rule.target) for rule in rules]
+
+    source_events: list[list[int]] = [[] for _ in listnames]
+    list_events: list[list[int]] = [[] for _ in listnames]
+    for rule_index, (source_id, target_id) in enumerate(zip(source_ids, target_ids)):
+        source_events[source_id].append(rule_index)
+        list_events[source_id].append(rule_index)
+        if rules[rule_index].target_sortkey is not None:
+            list_events[target_id].append(rule_index)
+
+    rule_runs: list[RuleRun | None] = [None] * len(rules)
+    for run in group_rule_runs(rules):
+        if run.classifier is not None or run.index is not None:
+            rule_runs[run.rule_indexes[0]] = run
+
+    return RoutingProgram(
+        rules=rules,
+        listnames=listnames,
+        initial_list=source_ids[0],
+        source_ids=source_ids,
+        target_ids=target_ids,
+        source_events=source_events,
+        list_events=list_events,
+        rule_runs=rule_runs,
+    )
+
+
+class RuleSchedule:
+    """Rules of a routing program that can have an effect, in order of application.
+
+    A rule can have an effect only if its source list holds lines, or if it
+    sorts a target list of at least two lines. Rather than test every rule, the
+    schedule follows the `list_events` of only those lists that hold lines, so
+    rules reading lists that stay empty, and whole subchains downstream of such
+    lists, are never visited. Iterating the schedule yields rule indexes in
+    ascending order; as each rule is applied, the caller reports the number of
+    lines it moved with `move`.
+    """
+
+    __slots__ = ("program", "counts", "applied", "_heap", "_active")
+
+    def __init__(self, program: RoutingProgram, line_count: int) -> None:
+        self.program = program
+        self.counts = [0] * len(program.listnames)
+        self.counts[program.initial_list] = line_count
+        self.applied = 0
+        self._heap: list[tuple[int, int, int]] = []
+        self._active = [False] * len(program.listnames)
+        if line_count:
+            self._activate(program.initial_list, 0)
+
+    @property
+    def skipped(self) -> int:
+        """Number of rules not (yet) yielded."""
+        return len(self.program.rules) - self.applied
+
+    def __iter__(self) -> Iterator[int]:
+        program = self.program
+        counts = self.counts
+        heap = self._heap
+        last_yielded = -1
+
+        while heap:
+            rule_index, list_id, position = heapq.heappop(heap)
+            events = program.list_events[list_id]
+            if counts[list_id] and position + 1 < len(events):
+                heapq.heappush(heap, (events[position + 1], list_id, position + 1))
+            else:
+                self._active[list_id] = False
+
+            # A rule may be reached through both its source and its target.
+            if rule_index == last_yielded:
+                continue
+            if counts[program.source_ids[rule_index]] or (
+                program.rules[rule_index].target_sortkey is not None
+                and counts[program.target_ids[rule_index]] > 1
+            ):
+                last_yielded = rule_index
+                self.applied += 1
+                yield rule_index
+
+    def move(self, rule_index: int, count: int) -> None:
+        """Record that given rule moved count lines from its source to its target."""
+        if not count:
+            return
+        program = self.program
+        target_id = program.target_ids[rule_index]
+        self.counts[program.source_ids[rule_index]] -= count
+        self.counts[target_id] += count
+        if not self._active[target_id]:
+            position = bisect_right(program.list_events[target_id], rule_index)
+            self._activate(target_id, position)
+
+    def _activate(self, list_id: int, position: int) -> None:
+        events = self.program.list_events[list_id]
+        if position < len(events):
+            heapq.heappush(self._heap, (events[position], list_id, position))
+            self._active[list_id] = True
+
+
+def dispatch_compiled(
+    rules: list[Rule],
+    datalines: list[str],
+    *,
+    workers: int = 1,
+    min_chunk_lines: int = PARALLEL_MIN_CHUNK_LINES,
+    router: "GeneratedRouter | None" = None,
+    last_uses: dict[str, int] | None = None,
+    flush: ListFlush | None = None,
+    sort_memory_limit: int | None = None,
+    spill_dir: Path | None = None,
+    stats: DispatchStats | None = None,
+    profile: bool = False,
+    trace: bool = False,
+    route_cache: "RouteCache | None" = None,
+) -> dict[str, IndexedLines | SpilledLines]:
+    """Apply rules with the compiled engine to map filenames to lists of datalines.
+
+    Args:
+        rules: Non-empty list of Rule objects.
+        datalines: Non-empty list of lines from data files.
+        workers: Maximum number of worker processes used to route datalines.
+        min_chunk_lines: Minimum number of datalines routed by each worker.
+        router: Routing function generated for these rules by `generate_router`,
+            used instead of interpreting the routing program (except in a pool).
+        last_uses: For each filename, index of the last rule that reads or
+            writes that list (required if flush is given).
+        flush: Function called with the filename and datalines of each list as
+            soon as the list is final; datalines are valid only during the call.
+        sort_memory_limit: If given, maximum number of characters of lines of a
+            sorted list to sort in memory; larger lists are sorted externally.
+        spill_dir: Directory for run files of external sorts (required if
+            sort_memory_limit is given), to be removed by the caller.
+        stats: If given, updated with counts recorded during dispatch.
+        profile: If True, record per-rule counters in stats (required).
+        trace: If True, record a routing trace in stats (required).
+        route_cache: Cache of routes of lines for these rules; only lines not
+            found in it are routed, and it is updated with their routes (not
+            used when profiling).
+
+    Returns:
+        Dictionary mapping filenames to sequences of data lines, leaving out
+        lists passed to flush.
+
+    Raises:
+        ValueError: If workers or min_chunk_lines is less than 1, or if profile
+            or trace is True but stats is not given.
+
+    Note:
+        Datalines are routed in a process pool only if there are enough of them
+        for at least two chunks of `min_chunk_lines`, so small datadirs never
+        pay the cost of starting a pool. Output depends neither on `workers` nor
+        on whether a generated router is given.
+
+        When profiling, lines are routed serially, one rule at a time, without a
+        generated router, and a list is sorted as soon as a rule asks for it to
+        be sorted, so that time can be attributed to rules; output is unchanged.
+
+        Once a flushed list has been passed to flush, its datalines are released
+        from the given list of datalines (replaced by None), so that memory is
+        held only by lists that later rules may still read or write. Lines of
+        lists sorted externally are likewise released once written to runs.
+    """
+    if workers < 1:
+        raise ValueError(f"Number of workers must be at least 1, not {workers}.")
+
+    if min_chunk_lines < 1:
+        raise ValueError(
+            f"Minimum chunk size must be at least 1 line, not {min_chunk_lines}."
+        )
+
+    if flush is not None and last_uses is None:
+        raise ValueError("Flushing finalized lists requires last uses of lists.")
+
+    if sort_memory_limit is not None and spill_dir is None:
+        raise ValueError("External sorting requires a directory for sorted runs.")
+
+    if profile and stats is None:
+        raise ValueError("Profiling rules requires stats in which to record them.")
+
+    if trace and stats is None:
+        raise ValueError("Tracing routing requires stats in which to record it.")
+
+    program = compile_routing_program(rules) if router is None else router.program
+    # Only routing rule by rule (when profiling) tests a line's fields more than
+    # once; sort texts, once computed, no longer need the fields.
+    table = LineTable(datalines, cache_fields=profile)
+
+    def route_lines(
+        lines: list[str], line_table: LineTable | None = None
+    ) -> list[array]:
+        chunk_count = min(workers, len(lines) // min_chunk_lines)
+        if chunk_count > 1:
+            return _route_datalines_in_pool(program, lines, chunk_count)
+        if router is not None:
+            return router.route(lines)
+        if line_table is None:
+            line_table = LineTable(lines, cache_fields=False)
+        return _route_datalines(program, line_table)
+
+    sort_seconds = None
+    if profile:
+        batches, examined, match_seconds = _route_datalines_by_rule(program, table)
+        sort_seconds = [0.0] * len(rules)
+    elif route_cache is not None:
+        batches = route_cache.route(datalines, len(rules), route_lines)
+    else:
+        batches = route_lines(datalines, table)
+    table.drop_fields()
+
+    def finish(list_order: "_ListOrder") -> array | SpilledLines:
+        if sort_memory_limit is not None:
+            spilled = list_order.spill(table, sort_memory_limit, spill_dir)
+            if spilled is not None:
+                return spilled
+        return list_order.materialize(table)
+
+    def view(final: array | SpilledLines) -> IndexedLines | SpilledLines:
+        if isinstance(final, SpilledLines):
+            return final
+        return IndexedLines(datalines, final)
+
+    schedule = RuleSchedule(program, len(datalines))
+    if flush is None:
+        ordered = _order_datalines(
+            program,
+            table,
+            batches,
+            finish,
+            schedule=schedule,
+            sort_seconds=sort_seconds,
+        )
+    else:
+        finals: list[list[int]] = [[] for _ in rules]
+        for list_id, listname in enumerate(program.listnames):
+            finals[last_uses[listname]].append(list_id)
+
+        def flush_list(list_id: int, final: array | SpilledLines) -> None:
+            flush(program.listnames[list_id], view(final))
+            if not isinstance(final, SpilledLines):
+                table.release(final)
+
+        ordered = _order_datalines(
+            program,
+            table,
+            batches,
+            finish,
+            finals,
+            flush_list,
+            schedule=schedule,
+            sort_seconds=sort_seconds,
+        )
+
+    if stats is not None:
+        stats.rules_skipped = schedule.skipped
+    if trace:
+        stats.trace = RoutingTrace(program=program, lines=datalines, batches=batches)
+    if profile:
+        stats.rule_stats = [
+            RuleStats(
+                rule=rule,
+                lines_examined=examined[rule_index],
+                lines_matched=len(batches[rule_index]),
+                match_seconds=match_seconds[rule_index],
+                sort_seconds=sort_seconds[rule_index],
+            )
+            for rule_index, rule in enumerate(rules)
+        ]
+
+    return {
+        listname: view(ordered[list_id])
+        for list_id, listname in enumerate(program.listnames)
+        if ordered[list_id] is not None
+    }
+
+
+def _route_datalines(program: RoutingProgram, table: LineTable) -> list[array]:
+    """Push each dataline through the rules that apply to it.
+
+    Args:
+        program: Compiled routing program.
+        table: Table of datalines.
+
+    Returns:
+        For each rule, IDs (indexes into line table) of lines moved by that rule,
+        in ascending order.
+    """
+    rules = program.rules
+    target_ids = program.target_ids
+    source_events = program.source_events
+    matchfields = [rule.source_matchfield for rule in rules]
+    searches = [rule.source_matcher.test for rule in rules]
+    rule_runs = program.rule_runs
+    prefix_length = len(RUN_GROUP_PREFIX)
+
+    batches = [line_id_array() for _ in rules]
+
+    for line_id, line in enumerate(table.lines):
+        fields: tuple[str, ...] | None = None
+        events = source_events[program.initial_list]
+        position = 0
+
+        while position < len(events):
+            rule_index = events[position]
+            matchfield = matchfields[rule_index]
+
+            if matchfield == 0:
+                text: str | None = line
+            elif matchfield < 0:
+                text = None
+            else:
+                if fields is None:
+                    fields = table.fields(line_id)
+                text = fields[matchfield - 1] if matchfield <= len(fields) else None
+
+            run = rule_runs[rule_index]
+            if text is None:
+                matched = None
+            elif run is None:
+                matched = rule_index if searches[rule_index](text) else None
+            elif run.index is not None:
+                # One lookup finds the first rule in the run that equals text.
+                found = run.index.get(text)
+                matched = run.rule_indexes[found] if found is not None else None
+            else:
+                # One scan finds the first rule in the run that matches, if any.
+                match = run.classifier.match(text)
+                matched = (
+                    run.rule_indexes[int(match.lastgroup[prefix_length:])]
+                    if match
+                    else None
+                )
+
+            if matched is None:
+                position += 1 if run is None else len(run.rule_indexes)
+            else:
+                batches[matched].append(line_id)
+                events = source_events[target_ids[matched]]
+                position = bisect_right(events, matched)
+
+    return batches
+
+
+def _route_datalines_in_pool(
+    program: RoutingProgram,
+    datalines: list[str],
+    chunk_count: int,
+) -> list[array]:
+    """Route contiguous chunks of datalines in worker processes.
+
+    Args:
+        program: Compiled routing program.
+        datalines: List of lines from data files.
+        chunk_count: Number of chunks (and of worker processes).
+
+    Returns:
+        For each rule, IDs of lines moved by that rule, in ascending order,
+        exactly as returned by `_route_datalines` for all datalines at once.
+    """
+    chunk_size = -(-len(datalines) // chunk_count)
+    starts = range(0, len(datalines), chunk_size)
+    chunks = [datalines[start : start + chunk_size] for start in starts]
+
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        chunk_batches = list(pool.map(_route_chunk, [program] * len(chunks), chunks))
+
+    batches = [line_id_array() for _ in program.rules]
+    for start, routed in zip(starts, chunk_batches):
+        for batch, chunk_batch in zip(batches, routed):
+            batch.extend(line_id_array(start + line_id for line_id in chunk_batch))
+
+    return batches
+
+
+def _route_chunk(program: RoutingProgram, lines: list[str]) -> list[array]:
+    """Route one chunk of datalines (in a worker process), with chunk-local IDs."""
+    return _route_datalines(program, LineTable(lines, cache_fields=False))
+
+
+def _route_datalines_by_rule(
+    program: RoutingProgram,
+    table: LineTable,
+) -> tuple[list[array], list[int], list[float]]:
+    """Apply each rule in turn to all lines in its source list, timing each rule.
+
+    Args:
+        program: Compiled routing program.
+        table: Table of datalines.
+
+    Returns:
+        For each rule: IDs of lines moved by that rule, in ascending order
+        (exactly as returned by `_route_datalines`), number of lines tested,
+        and seconds spent testing them.
+    """
+    members = [line_id_array() for _ in program.listnames]
+    members[program.initial_list] = line_id_array(range(len(table)))
+    batches = [line_id_array() for _ in program.rules]
+    examined = [0] * len(program.rules)
+    match_seconds = [0.0] * len(program.rules)
+    schedule = RuleSchedule(program, len(table))
+
+    for rule_index in schedule:
+        rule = program.rules[rule_index]
+        source_id = program.source_ids[rule_index]
+        target_id = program.target_ids[rule_index]
+        candidates = members[source_id]
+        if not candidates:
+            continue
+
+        start = perf_counter()
+        matched = _match_line_ids(table, rule, candidates)
+        match_seconds[rule_index] = perf_counter() - start
+
+        if matched:
+            moved = set(matched)
+            members[source_id] = line_id_array(
+                filterfalse(moved.__contains__, candidates)
+            )
+            members[target_id] = line_id_array(heapq.merge(members[target_id], matched))
+        batches[rule_index] = matched
+        examined[rule_index] = len(candidates)
+        schedule.move(rule_index, len(matched))
+
+    return batches, examined, match_seconds
+
+
+def _match_line_ids(table: LineTable, rule: Rule, line_ids: array) -> array:
+    """Return IDs, among those given, of lines that match given rule."""
+    matchfield = rule.source_matchfield
+    test = rule.source_matcher.test
+
+    if matchfield < 0:
+        return line_id_array()
+
+    if matchfield == 0:
+        lines = table.lines
+        return line_id_array(i for i in line_ids if test(lines[i]))
+
+    fields = table.fields
+    return line_id_array(
+        i
+        for i in line_ids
+        if len(line_fields := fields(i)) >= matchfield
+        and test(line_fields[matchfield - 1])
+    )
+
+
+def _order_datalines(
+    program: RoutingProgram,
+    table: LineTable,
+    batches: list[array],
+    finish: Callable[["_ListOrder"], array | SpilledLines] | None = None,
+    finals: list[list[int]] | None = None,
+    flush_list: Callable[[int, array | SpilledLines], None] | None = None,
+    *,
+    schedule: RuleSchedule | None = None,
+    sort_seconds: list[float] | None = None,
+) -> list[array | SpilledLines | None]:
+    """Replay list order given the lines moved by each rule.
+
+    Args:
+        program: Compiled routing program.
+        table: Table of datalines.
+        batches: For each rule, IDs of lines moved by that rule.
+        finish: Function returning final contents of a list from its order (by
+            default, line IDs in final order).
+        finals: For each rule, IDs of lists that no later rule reads or writes.
+        flush_list: Function called with list ID and final contents of each list
+            as soon as it is final (after the rule in `finals`, or before the next
+            rule applied if that rule is skipped).
+        schedule: Schedule of rules to apply (by default, a new one).
+        sort_seconds: If given, for each rule that sorts its target list, the
+            list is sorted at once and the time taken (with that of appending
+            lines to the list) is recorded here.
+
+    Returns:
+        For each list ID, final contents (None if passed to flush_list).
+    """
+    if finish is None:
+
+        def finish(list_order: _ListOrder) -> array:
+            return list_order.materialize(table)
+
+    if schedule is None:
+        schedule = RuleSchedule(program, len(table))
+
+    lists: list[_ListOrder | None] = [_ListOrder() for _ in program.listnames]
+    lists[program.initial_list].append(line_id_array(range(len(table))), None, table)
+    flushed_through = 0
+
+    def flush_finals(end: int) -> None:
+        nonlocal flushed_through
+        for rule_index in range(flushed_through, end):
+            for list_id in finals[rule_index]:
+                flush_list(list_id, finish(lists[list_id]))
+                lists[list_id] = None
+        flushed_through = end
+
+    for rule_index in schedule:
+        rule = program.rules[rule_index]
+        if flush_list is not None:
+            flush_finals(rule_index)
+
+        if batch := batches[rule_index]:
+            moved = set(batch)
+            source_lines = lists[program.source_ids[rule_index]].remove(moved, table)
+        else:
+            source_lines = line_id_array()
+
+        target = lists[program.target_ids[rule_index]]
+        if sort_seconds is not None and rule.target_sortkey is not None:
+            start = perf_counter()
+            target.append(source_lines, rule.target_sortkey, table)
+            target.materialize(table)
+            sort_seconds[rule_index] = perf_counter() - start
+        else:
+            target.append(source_lines, rule.target_sortkey, table)
+        schedule.move(rule_index, len(source_lines))
+
+        if flush_list is not None:
+            flush_finals(rule_index + 1)
+
+    if flush_list is not None:
+        flush_finals(len(program.rules))
+
+    return [None if ordered is None else finish(ordered) for ordered in lists]
+
+
+class _ListOrder:
+    """Order of line IDs in one list, with sorting deferred until it is read.
+
+    If `sortkey` is None, the list is the concatenation of `runs`. Otherwise the
+    list is the stable sort, on `sortkey`, of the concatenation of `runs` and
+    `pending`, where each of `runs` is already sorted on `sortkey`; the list can
+    therefore be produced by merging `runs` with `pending` once sorted.
+    """
+
+    __slots__ = ("runs", "pending", "sortkey")
+
+    def __init__(self) -> None:
+        self.runs: list[array] = []
+        self.pending = line_id_array()
+        self.sortkey: int | None = None
+
+    def append(
+        self,
+        line_ids: array,
+        sortkey: int | None,
+        table: LineTable,
+    ) -> None:
+        """Append line IDs, then (lazily) sort whole list if sortkey is given."""
+        if sortkey is None:
+            if not line_ids:
+                return
+            if self.sortkey is not None:
+                self.runs = [self.materialize(table)]
+                self.sortkey = None
+            self.runs.append(line_ids)
+            return
+
+        if self.sortkey == sortkey:
+            if self.pending:
+                self.pending.extend(line_ids)
+            elif line_ids:
+                self.runs.append(
+                    line_id_array(sorted(line_ids, key=table.keyfn(sortkey)))
+                )
+            return
+
+        self.pending = self.materialize(table) + line_ids
+        self.runs = []
+        self.sortkey = sortkey
+
+    def remove(self, line_ids: set[int], table: LineTable) -> array:
+        """Remove given line IDs, returning them in list order."""
+        current = self.materialize(table)
+        self.runs = [line_id_array(filterfalse(line_ids.__contains__, current))]
+        return line_id_array(filter(line_ids.__contains__, current))
+
+    def materialize(self, table: LineTable) -> array:
+        """Return line IDs in order, leaving list as a single sorted run."""
+        runs = self.runs
+        if self.sortkey is None:
+            if len(runs) == 1:
+                current = runs[0]
+            else:
+                current = line_id_array()
+                for run in runs:
+                    current.extend(run)
+        else:
+            keyfn = table.keyfn(self.sortkey)
+            if self.pending:
+                runs.append(line_id_array(sorted(self.pending, key=keyfn)))
+                self.pending = line_id_array()
+            if len(runs) == 1:
+                current = runs[0]
+            else:
+                current = line_id_array(heapq.merge(*runs, key=keyfn))
+
+        self.runs = [current]
+        return current
+
+    def spill(
+        self,
+        table: LineTable,
+        memory_limit: int,
+        spill_dir: Path,
+    ) -> SpilledLines | None:
+        """Sort list externally if it is sorted and larger than memory limit.
+
+        Args:
+            table: Table of datalines.
+            memory_limit: Maximum number of characters of lines to sort at once.
+            spill_dir: Directory in which to write sorted runs.
+
+        Returns:
+            SpilledLines (the list's lines having been released from the table),
+            or None if the list is not sorted or fits within memory_limit.
+        """
+        if self.sortkey is None:
+            return None
+
+        lines = table.lines
+        all_ids = [*self.runs, self.pending]
+        if sum(len(lines[i]) for ids in all_ids for i in ids) <= memory_limit:
+            return None
+
+        def sorted_runs() -> Iterator[Iterable[str]]:
+            # Runs already sorted are written as they are; pending lines, whose
+            # sorting was deferred, are sorted in chunks that fit memory_limit.
+            for run in self.runs:
+                yield map(lines.__getitem__, run)
+            pending = map(lines.__getitem__, self.pending)
+            yield from sort_in_chunks(pending, self.sortkey, memory_limit)
+
+        spilled = spill_sorted_runs(sorted_runs(), self.sortkey, spill_dir)
+        for ids in all_ids:
+            table.release(ids)
+        self.runs, self.pending = [], line_id_array()
+        return spilled
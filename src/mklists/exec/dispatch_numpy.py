@@ -0,0 +1,265 @@
+"""Vectorized dispatch of datalines for very large datadirs, using NumPy.
+
+NumPy is an optional dependency: if it cannot be imported, `numpy_available()`
+is False and the compiled engine in `dispatch` is used instead.
+
+List membership is held as an array of list IDs over the line table. Each rule
+computes a boolean match vector over only the lines currently in its source list
+(with vectorized string operations where the pattern is a literal) and moves the
+matching lines by assigning their list ID; rules are visited as scheduled by
+`RuleSchedule`, so rules whose source stays empty cost nothing. List order is
+held as an array of integer positions, updated with array operations when lines
+are appended to a list or a list is sorted, so final order is an argsort of
+positions; sorting uses integer ranks of each line's sort text, precomputed once
+per sort key.
+"""
+
+from array import array
+from collections.abc import Callable
+
+from mklists.exec.dispatch import (
+    DispatchStats,
+    RoutingProgram,
+    RuleSchedule,
+    compile_routing_program,
+)
+from mklists.exec.linetable import LINE_ID_TYPECODE, IndexedLines, LineTable
+from mklists.rules import Rule
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without NumPy
+    np = None
+
+VECTORIZED_MIN_LINES = 200_000
+
+
+def numpy_available() -> bool:
+    """Return True if NumPy (2.0 or later) can be used for vectorized dispatch."""
+    return np is not None and hasattr(np, "strings")
+
+
+def dispatch_vectorized(
+    rules: list[Rule],
+    datalines: list[str],
+    *,
+    stats: DispatchStats | None = None,
+) -> dict[str, IndexedLines]:
+    """Apply rules with the vectorized engine to map filenames to lists of datalines.
+
+    Args:
+        rules: Non-empty list of Rule objects.
+        datalines: Non-empty list of lines from data files.
+        stats: If given, updated with counts recorded during dispatch.
+
+    Returns:
+        Dictionary mapping filenames to sequences of data lines.
+
+    Raises:
+        RuntimeError: If NumPy is not available.
+    """
+    if not numpy_available():
+        raise RuntimeError("Vectorized dispatch requires NumPy 2.0 or later.")
+
+    program = compile_routing_program(rules)
+    table = LineTable(datalines, cache_fields=True)
+    batches = _route_vectorized(program, table)
+    table.drop_fields()
+    schedule = RuleSchedule(program, len(table))
+    ordered = _order_vectorized(program, table, batches, schedule)
+    if stats is not None:
+        stats.rules_skipped = schedule.skipped
+
+    return {
+        listname: IndexedLines(datalines, _line_id_array(ordered[list_id]))
+        for list_id, listname in enumerate(program.listnames)
+    }
+
+
+def _route_vectorized(program: RoutingProgram, table: LineTable) -> list["np.ndarray"]:
+    """Apply each rule as a mask over the lines currently in its source list.
+
+    Args:
+        program: Compiled routing program.
+        table: Table of datalines.
+
+    Returns:
+        For each rule, array of IDs of lines moved by that rule, in ascending order.
+    """
+    columns = _MatchColumns(table)
+    membership = np.full(len(table), program.initial_list, dtype=np.int32)
+    schedule = RuleSchedule(program, len(table))
+    batches = [np.empty(0, dtype=np.intp)] * len(program.rules)
+
+    for rule_index in schedule:
+        source_id = program.source_ids[rule_index]
+        if not schedule.counts[source_id]:
+            continue
+        in_source = np.flatnonzero(membership == source_id)
+        in_source = in_source[
+            columns.match_vector(program.rules[rule_index], in_source)
+        ]
+        membership[in_source] = program.target_ids[rule_index]
+        batches[rule_index] = in_source
+        schedule.move(rule_index, in_source.size)
+
+    return batches
+
+
+def _order_vectorized(
+    program: RoutingProgram,
+    table: LineTable,
+    batches: list["np.ndarray"],
+    schedule: RuleSchedule,
+) -> list["np.ndarray"]:
+    """Replay list order with integer positions, given lines moved by each rule.
+
+    Args:
+        program: Compiled routing program.
+        table: Table of datalines.
+        batches: For each rule, array of IDs of lines moved by that rule.
+        schedule: New schedule of rules to apply.
+
+    Returns:
+        For each list ID, array of line IDs in final order.
+
+    Note:
+        Within a list, lines are ordered by position. Lines appended to a list,
+        and all lines of a list that is sorted, are given positions after every
+        position yet assigned, so they follow lines already in the list.
+    """
+    count = len(table)
+    membership = np.full(count, program.initial_list, dtype=np.int32)
+    positions = np.arange(count, dtype=np.int64)
+    next_position = count
+    sort_ranks: dict[int, np.ndarray] = {}
+
+    for rule_index in schedule:
+        rule = program.rules[rule_index]
+        target_id = program.target_ids[rule_index]
+        batch = batches[rule_index]
+        schedule.move(rule_index, batch.size)
+        if batch.size:
+            batch = batch[np.argsort(positions[batch], kind="stable")]
+            membership[batch] = target_id
+            positions[batch] = np.arange(next_position, next_position + batch.size)
+            next_position += batch.size
+
+        if rule.target_sortkey is not None:
+            members = np.flatnonzero(membership == target_id)
+            if rule.target_sortkey not in sort_ranks:
+                sort_ranks[rule.target_sortkey] = _sort_ranks(
+                    table, rule.target_sortkey
+                )
+            ranks = sort_ranks[rule.target_sortkey]
+            members = members[np.lexsort((positions[members], ranks[members]))]
+            positions[members] = np.arange(next_position, next_position + members.size)
+            next_position += members.size
+
+    ordered = []
+    for list_id in range(len(program.listnames)):
+        members = np.flatnonzero(membership == list_id)
+        ordered.append(members[np.argsort(positions[members], kind="stable")])
+
+    return ordered
+
+
+def _line_id_array(line_ids: "np.ndarray") -> array:
+    """Return NumPy array of line IDs as a compact array of line IDs."""
+    result = array(LINE_ID_TYPECODE)
+    result.frombytes(line_ids.astype(np.dtype(LINE_ID_TYPECODE)).tobytes())
+    return result
+
+
+def _sort_ranks(table: LineTable, onebased_sortkey: int) -> "np.ndarray":
+    """Return rank of each line's sort text among those of all lines."""
+    keyfn = table.keyfn(onebased_sortkey)
+    texts = np.array([keyfn(i) for i in range(len(table))], dtype=object)
+    _, ranks = np.unique(texts, return_inverse=True)
+    return ranks.reshape(-1)
+
+
+class _MatchColumns:
+    """Texts tested by rules, as NumPy string arrays built once per match field."""
+
+    def __init__(self, table: LineTable) -> None:
+        self._table = table
+        # NumPy string operations mishandle NUL, so leave such texts to Python.
+        self._vectorizable = not any("\x00" in line for line in table.lines)
+        self._texts: dict[int, list[str]] = {}
+        self._arrays: dict[int, np.ndarray] = {}
+        self._has_field: dict[int, np.ndarray] = {}
+
+    def match_vector(self, rule: Rule, line_ids: "np.ndarray") -> "np.ndarray":
+        """Return boolean vector: does each given line match given rule?"""
+        matchfield = rule.source_matchfield
+        if matchfield < 0:
+            return np.zeros(line_ids.size, dtype=bool)
+
+        texts = self._column(matchfield)
+        matcher = rule.source_matcher
+        vector_op = _VECTOR_OPS.get(matcher.kind) if self._vectorizable else None
+        if vector_op is not None:
+            if matchfield not in self._arrays:
+                self._arrays[matchfield] = np.array(
+                    texts, dtype=np.dtypes.StringDType()
+                )
+            result = vector_op(self._arrays[matchfield][line_ids], matcher.literal)
+        else:
+            test = matcher.test
+            result = np.fromiter(
+                (bool(test(texts[i])) for i in line_ids.tolist()),
+                dtype=bool,
+                count=line_ids.size,
+            )
+
+        if matchfield > 0:
+            result &= self._has_field[matchfield][line_ids]
+        return result
+
+    def _column(self, matchfield: int) -> list[str]:
+        """Return text of given field for every line ("" where field is missing)."""
+        if matchfield not in self._texts:
+            table = self._table
+            if matchfield == 0:
+                self._texts[0] = table.lines
+            else:
+                fields = [table.fields(i) for i in range(len(table))]
+                self._texts[matchfield] = [
+                    f[matchfield - 1] if matchfield <= len(f) else "" for f in fields
+                ]
+                self._has_field[matchfield] = np.array(
+                    [matchfield <= len(f) for f in fields], dtype=bool
+                )
+        return self._texts[matchfield]
+
+
+def _literal_op(texts: "np.ndarray", literal: str) -> "np.ndarray":
+    return np.strings.find(texts, literal) >= 0
+
+
+def _prefix_op(texts: "np.ndarray", literal: str) -> "np.ndarray":
+    return np.strings.startswith(texts, literal)
+
+
+def _suffix_op(texts: "np.ndarray", literal: str) -> "np.ndarray":
+    return np.strings.endswith(texts, literal) | np.strings.endswith(
+        texts, f"{literal}\n"
+    )
+
+
+def _exact_op(texts: "np.ndarray", literal: str) -> "np.ndarray":
+    return (texts == literal) | (texts == f"{literal}\n")
+
+
+def _equal_op(texts: "np.ndarray", literal: str) -> "np.ndarray":
+    return texts == literal
+
+
+_VECTOR_OPS: dict[str, Callable[["np.ndarray", str], "np.ndarray"]] = {
+    "literal": _literal_op,
+    "prefix": _prefix_op,
+    "suffix": _suffix_op,
+    "exact": _exact_op,
+    "equal": _equal_op,
+}
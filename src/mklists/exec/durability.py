@@ -0,0 +1,40 @@
+"""Flushing of written files and directories to disk, as configured.
+
+The `fsync` performance setting chooses between cost and durability:
+
+- "none": data is written back by the operating system in its own time, so a
+  power failure may lose recent writes (an interrupted run is still recovered).
+- "dir": each directory is synced once after a batch of files is written,
+  renamed or deleted in it, so that renames and deletions survive a crash.
+- "file": in addition, each file is synced before it is closed or renamed into
+  place, so that its content does too.
+"""
+
+import os
+from pathlib import Path
+from typing import BinaryIO, TextIO
+
+
+def sync_file(f: BinaryIO | TextIO, fsync: str) -> None:
+    """Flush open file to disk if fsync is "file"."""
+    if fsync == "file":
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def sync_path(path: Path, fsync: str) -> None:
+    """Flush file already written and closed (such as a copy) if fsync is "file"."""
+    if fsync == "file":
+        with path.open("rb") as f:
+            os.fsync(f.fileno())
+
+
+def sync_dir(dirpath: Path, fsync: str) -> None:
+    """Flush renames, creations and deletions in directory unless fsync is "none"."""
+    if fsync == "none":
+        return
+    fd = os.open(dirpath, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
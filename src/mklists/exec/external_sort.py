@@ -0,0 +1,114 @@
+"""External merge sort of datalines that are too many to sort in memory.
+
+Lines are sorted in chunks that fit a memory limit, each sorted chunk is written
+as a run to a temporary file, and the runs are merged only when the result is
+read, typically while it is written to its datafile. Sort keys have the same
+semantics as in `_sort_datalines` (field N through end of line).
+"""
+
+import heapq
+import tempfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from mklists.exec.linetable import line_sort_text_fn
+
+
+class SpilledLines(Iterable[str]):
+    """Sorted datalines held as sorted runs in files, merged on iteration.
+
+    Merging is stable: among lines with equal sort text, lines from earlier runs
+    come first, so runs written in list order give a stable sort.
+    """
+
+    __slots__ = ("run_paths", "onebased_sortkey", "count")
+
+    def __init__(
+        self, run_paths: list[Path], onebased_sortkey: int, count: int
+    ) -> None:
+        self.run_paths = run_paths
+        self.onebased_sortkey = onebased_sortkey
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        files = [path.open(encoding="utf-8", newline="\n") for path in self.run_paths]
+        try:
+            runs = [(line[:-1] for line in f) for f in files]
+            yield from heapq.merge(*runs, key=line_sort_text_fn(self.onebased_sortkey))
+        finally:
+            for f in files:
+                f.close()
+
+    def unlink(self) -> None:
+        """Delete run files."""
+        for path in self.run_paths:
+            path.unlink(missing_ok=True)
+
+
+def spill_sorted_runs(
+    runs: Iterable[Iterable[str]],
+    onebased_sortkey: int,
+    spill_dir: Path,
+) -> SpilledLines:
+    """Write runs, each already sorted on given sort key, to temporary files.
+
+    Args:
+        runs: Runs of lines, each sorted on onebased_sortkey, in list order.
+        onebased_sortkey: Sort key (one-based field number, as in Awk).
+        spill_dir: Directory in which to write run files.
+
+    Returns:
+        SpilledLines merging the runs.
+    """
+    run_paths: list[Path] = []
+    count = 0
+
+    for run in runs:
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            newline="\n",
+            dir=spill_dir,
+            prefix=".mklists-run-",
+            delete=False,
+        ) as f:
+            run_paths.append(Path(f.name))
+            for line in run:
+                f.write(f"{line}\n")
+                count += 1
+
+    return SpilledLines(run_paths, onebased_sortkey, count)
+
+
+def sort_in_chunks(
+    datalines: Iterable[str],
+    onebased_sortkey: int,
+    memory_limit: int,
+) -> Iterator[list[str]]:
+    """Yield consecutive chunks of at most memory_limit characters, each sorted.
+
+    Args:
+        datalines: Lines to sort.
+        onebased_sortkey: Sort key (one-based field number, as in Awk).
+        memory_limit: Maximum number of characters of lines in a chunk (a chunk
+            holds at least one line, however long).
+
+    Yields:
+        Each chunk of lines, sorted on onebased_sortkey.
+    """
+    keyfn = line_sort_text_fn(onebased_sortkey)
+    chunk: list[str] = []
+    size = 0
+
+    for line in datalines:
+        if chunk and size + len(line) > memory_limit:
+            yield sorted(chunk, key=keyfn)
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line)
+
+    if chunk:
+        yield sorted(chunk, key=keyfn)
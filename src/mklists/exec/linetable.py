@@ -0,0 +1,199 @@
+"""Table of datalines shared by the matching and sorting stages of dispatch.
+
+Lists of lines are represented during dispatch as compact arrays of line IDs
+(indexes into the table), so lines are never copied from list to list; strings
+are looked up only when an `IndexedLines` view is iterated, as when written out.
+"""
+
+import sys
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing import overload
+
+LINE_ID_TYPECODE = "I"
+
+
+def line_id_array(ids: Iterable[int] = ()) -> array:
+    """Return compact array of given line IDs."""
+    return array(LINE_ID_TYPECODE, ids)
+
+
+def line_sort_text_fn(onebased_sortkey: int) -> Callable[[str], str]:
+    """Return function mapping a line to its sort text for given sort key.
+
+    Note:
+        Semantics are those of `_sort_datalines` in `process_datalines`, as for
+        `LineTable.keyfn`, but nothing is cached.
+    """
+    if onebased_sortkey == 0:
+        return str.__str__
+
+    zerobased = onebased_sortkey - 1
+
+    def sort_text(line: str) -> str:
+        return " ".join(line.split()[zerobased:])
+
+    return sort_text
+
+
+class LineTable:
+    """Datalines, indexed by line ID, each split into fields at most once.
+
+    Rule matching on field N and sorting from field N through end of line both
+    need the whitespace-delimited fields of a line. If `cache_fields` is True,
+    fields are stored as a tuple the first time they are needed, so no line costs
+    more than one tuple of fields and lines only ever matched or sorted as a whole
+    cost nothing. If False (enough for routing line by line, since routing a line
+    needs its fields only while that line is being routed), nothing is stored;
+    `drop_fields` empties the cache once routing is done.
+
+    Sort text is cached only for sort keys actually sorted on, at most once per
+    line, and a sort text equal to its line is stored as the line itself, so
+    sorting single-spaced lines from field 1 costs one reference per line.
+    """
+
+    __slots__ = ("lines", "cache_fields", "_fields", "_sort_texts")
+
+    def __init__(self, lines: list[str], *, cache_fields: bool = True) -> None:
+        self.lines = lines
+        self.cache_fields = cache_fields
+        self._fields: list[tuple[str, ...] | None] = (
+            [None] * len(lines) if cache_fields else []
+        )
+        self._sort_texts: dict[int, list[str | None]] = {}
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def fields(self, line_id: int) -> tuple[str, ...]:
+        """Return whitespace-delimited fields of given line."""
+        if not self.cache_fields:
+            return tuple(self.lines[line_id].split())
+
+        fields = self._fields[line_id]
+        if fields is None:
+            fields = self._fields[line_id] = tuple(self.lines[line_id].split())
+        return fields
+
+    def drop_fields(self) -> None:
+        """Empty the cache of fields and stop caching them."""
+        self.cache_fields = False
+        self._fields = []
+
+    def keyfn(self, onebased_sortkey: int) -> Callable[[int], str]:
+        """Return function mapping a line ID to its sort text for given sort key.
+
+        Args:
+            onebased_sortkey: Sort key (one-based field number, as in Awk).
+
+        Returns:
+            Function mapping line ID to the text on which that line is sorted.
+
+        Note:
+            Semantics are those of `_sort_datalines` in `process_datalines`:
+            `0` sorts on the whole line, `N` on field N through end of line, and
+            lines with fewer than N fields sort first (on the empty string).
+        """
+        lines = self.lines
+        if onebased_sortkey == 0:
+            return lines.__getitem__
+
+        zerobased = onebased_sortkey - 1
+        texts = self._sort_texts.setdefault(onebased_sortkey, [None] * len(lines))
+        fields_of = self.fields
+
+        def sort_text(line_id: int) -> str:
+            text = texts[line_id]
+            if text is None:
+                text = " ".join(fields_of(line_id)[zerobased:])
+                if text == lines[line_id]:
+                    text = lines[line_id]
+                texts[line_id] = text
+            return text
+
+        return sort_text
+
+    def release(self, line_ids: Iterable[int]) -> None:
+        """Drop given lines, and anything cached for them, from the table.
+
+        Note:
+            Lines are replaced by None in the list of lines given to the table,
+            so they must never be read again.
+        """
+        lines = self.lines
+        cached = ([self._fields] if self.cache_fields else []) + list(
+            self._sort_texts.values()
+        )
+        for line_id in line_ids:
+            lines[line_id] = None
+            for values in cached:
+                values[line_id] = None
+
+    def cache_nbytes(self) -> int:
+        """Return approximate bytes held by cached fields and sort texts.
+
+        Note:
+            Field strings are counted in full even where they are shared, so
+            this is an upper bound on the overhead over the lines themselves;
+            sort texts that are the lines themselves are not counted.
+        """
+        lines = self.lines
+        nbytes = sys.getsizeof(self._fields)
+        for fields in self._fields:
+            if fields is not None:
+                nbytes += sys.getsizeof(fields)
+                nbytes += sum(sys.getsizeof(field) for field in fields)
+
+        for texts in self._sort_texts.values():
+            nbytes += sys.getsizeof(texts)
+            nbytes += sum(
+                sys.getsizeof(text)
+                for line, text in zip(lines, texts)
+                if text is not None and text is not line
+            )
+
+        return nbytes
+
+
+class IndexedLines(Sequence[str]):
+    """Read-only sequence of datalines, given as line IDs into a list of lines.
+
+    Compares equal to any sequence of the same strings in the same order, so it
+    can stand wherever a list of datalines is read.
+    """
+
+    __slots__ = ("lines", "line_ids")
+    __hash__ = None  # type: ignore[assignment]
+
+    def __init__(self, lines: list[str], line_ids: array) -> None:
+        self.lines = lines
+        self.line_ids = line_ids
+
+    def __len__(self) -> int:
+        return len(self.line_ids)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self.lines[i] for i in self.line_ids[index]]
+        return self.lines[self.line_ids[index]]
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self.lines.__getitem__, self.line_ids)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, IndexedLines):
+            other = list(other)
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            mine == theirs for mine, theirs in zip(self, other)
+        )
+
+    def __repr__(self) -> str:
+        return f"IndexedLines({list(self)!r})"
@@ -4,12 +4,16 @@ import re
 import shutil
 from pathlib import Path
 
+from mklists.exec.durability import sync_dir, sync_file
+from mklists.exec.snapshot import take_dir_snapshot
 from mklists.logging import logger
 
 URL_RE = re.compile(r"((?:https?|file)://[^\s<>()]*[^\s<>().,;:!?)])([.,;:!?)]?)")
 
 
-def linkify_md_datadirs(datadirs: list[Path], linkify_md_dir: Path) -> None:
+def linkify_md_datadirs(
+    datadirs: list[Path], linkify_md_dir: Path, fsync: str = "dir"
+) -> None:
     """Mirror datadirs to linkify_md_dir with URL-linkified .md files.
 
     Each visible data file is written as <filename>.md — HTML-in-Markdown
@@ -20,15 +24,20 @@ def linkify_md_datadirs(datadirs: list[Path], linkify_md_dir: Path) -> None:
     Args:
         datadirs: List of datadir paths.
         linkify_md_dir: Root of mirror directory tree for .md output.
+        fsync: Durability policy ("none", "dir" or "file").
 
     Returns:
         None, after mirroring datadirs under linkify_md_dir.
     """
     logger.info(f"Linkify to {linkify_md_dir}")
-    _mirror_datadirs(datadirs=datadirs, output_dir=linkify_md_dir, suffix=".md")
+    _mirror_datadirs(
+        datadirs=datadirs, output_dir=linkify_md_dir, suffix=".md", fsync=fsync
+    )
 
 
-def linkify_html_datadirs(datadirs: list[Path], linkify_html_dir: Path) -> None:
+def linkify_html_datadirs(
+    datadirs: list[Path], linkify_html_dir: Path, fsync: str = "dir"
+) -> None:
     """Mirror datadirs to linkify_html_dir with URL-linkified .html files.
 
     Each visible data file is written as <filename>.html — a <pre> block with
@@ -38,15 +47,20 @@ def linkify_html_datadirs(datadirs: list[Path], linkify_html_dir: Path) -> None:
     Args:
         datadirs: List of datadir paths.
         linkify_html_dir: Root of mirror directory tree for .html output.
+        fsync: Durability policy ("none", "dir" or "file").
 
     Returns:
         None, after mirroring datadirs under linkify_html_dir.
     """
     logger.info(f"Linkify to {linkify_html_dir}")
-    _mirror_datadirs(datadirs=datadirs, output_dir=linkify_html_dir, suffix=".html")
+    _mirror_datadirs(
+        datadirs=datadirs, output_dir=linkify_html_dir, suffix=".html", fsync=fsync
+    )
 
 
-def _mirror_datadirs(datadirs: list[Path], output_dir: Path, suffix: str) -> None:
+def _mirror_datadirs(
+    datadirs: list[Path], output_dir: Path, suffix: str, fsync: str = "dir"
+) -> None:
     """Write URL-linkified copies of all datafiles under output_dir.
 
     Supported layouts (no deeper nesting):
@@ -61,6 +75,7 @@ def _mirror_datadirs(datadirs: list[Path], output_dir: Path, suffix: str) -> Non
         datadirs: List of datadir paths.
         output_dir: Root of mirror directory tree.
         suffix: File extension to append to each mirrored filename (.md or .html).
+        fsync: Durability policy ("none", "dir" or "file").
 
     Returns:
         None, after mirroring datadirs under output_dir with linkified datafiles.
@@ -76,14 +91,20 @@ def _mirror_datadirs(datadirs: list[Path], output_dir: Path, suffix: str) -> Non
         mirror_dir = output_dir / rel
         mirror_dir.mkdir(parents=True, exist_ok=True)
 
-        for datafile in sorted(datadir.iterdir()):
-            if datafile.name.startswith(".") or not datafile.is_file():
-                continue
+        for datafile in take_dir_snapshot(datadir).datafiles():
             text = datafile.read_text(encoding="utf-8")
             content = _linkify_lines(text)
-            (mirror_dir / (datafile.name + suffix)).write_text(
-                content, encoding="utf-8"
-            )
+            with (mirror_dir / (datafile.name + suffix)).open(
+                "w", encoding="utf-8"
+            ) as f:
+                f.write(content)
+                sync_file(f, fsync)
+        sync_dir(mirror_dir, fsync)
+
+    # In the flat layout, output_dir is the mirror dir, already synced.
+    if len(datadirs) > 1:
+        sync_dir(output_dir, fsync)
+    sync_dir(output_dir.parent, fsync)
 
 
 def _linkify_lines(text: str) -> str:
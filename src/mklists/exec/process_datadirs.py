@@ -1,57 +1,211 @@
 """Process Datadirs."""
 
-from operator import attrgetter
+from contextlib import nullcontext
 from pathlib import Path
-from mklists.config.model import SafetyConfig
+import tempfile
+from mklists.config.model import PerformanceConfig, SafetyConfig
 from mklists.plan.model import DatadirPlan
+from mklists.exec.codegen import GeneratedRouter
+from mklists.exec.dispatch import DispatchStats, RoutingTrace
 from mklists.exec.process_datalines import dispatch_datalines_to_targets
-from mklists.exec.safety import run_safety_checks
+from mklists.exec.reconcile import (
+    DatafileReconciler,
+    DatafileState,
+    datafile_state,
+)
+from mklists.exec.route_cache import (
+    ROUTE_CACHE_FILE_NAME,
+    RouteCache,
+    rulechain_fingerprint,
+)
+from mklists.exec.safety import (
+    check_datafile_bytes,
+    datafile_bytes,
+    run_safety_checks,
+)
+from mklists.exec.snapshot import DirSnapshot, take_dir_snapshot
+from mklists.logging import logger
 
 
 def process_datadir(
     *,
     datadir_plan: DatadirPlan,
     safety: SafetyConfig,
-) -> None:
+    performance: PerformanceConfig | None = None,
+    profile_rules: bool = False,
+    dir_snapshot: DirSnapshot | None = None,
+    router: GeneratedRouter | None = None,
+) -> DispatchStats:
     """
     Args:
         datadir_plan: Execution plan for one datadir, including resolved rules.
         safety: Safety configuration for filename validation.
+        performance: Performance settings (defaults if None).
+        profile_rules: If True, record counters and timings for each rule.
+        dir_snapshot: Snapshot of datadir taken earlier in the pass (taken if None),
+            from which safety checks and the list of datafiles are made.
+        router: Routing function generated for the plan's rules, if any (see
+            `mklists.exec.codegen`).
 
     Returns:
-        None, after safety check, reading data, applying rules, backup, re-writing.
+        Counts recorded while applying rules (with per-rule counters if
+        profile_rules is True), after safety check, reading data, applying
+        rules, backup, re-writing.
+
+    Note:
+        Only datafiles whose content changes are written: new lists are
+        compared with datafiles as read (by size, then digest), and datafiles
+        whose lists are now empty are deleted. The numbers of datafiles
+        created, changed, deleted and left unchanged are logged. New content
+        is staged and then committed all at once (see `DatafileReconciler`),
+        so an error or interrupt while applying rules leaves datafiles as
+        they were.
+
+        If the plan records the last use of each list, each list is written as
+        soon as no later rule can change it, and its lines are then released.
+
+        If a sort memory limit is set, sorted lists larger than the limit are
+        sorted in runs written to a hidden temporary directory in the datadir,
+        which is removed once all lists have been written.
+
+        If a route cache size is set, routes of lines are cached in a hidden
+        file in the datadir, so that only new or changed lines are routed.
+
+        If more than one dispatch worker is allowed, datalines (or those not
+        found in the route cache) are routed in a pool of worker processes,
+        in chunks of at least the minimum chunk size.
+
+        The number of rules skipped because their source list was empty (and
+        they could have no effect) is logged.
     """
-    run_safety_checks(datadir_plan.datadir, safety)
+    if performance is None:
+        performance = PerformanceConfig()
 
     rules = datadir_plan.rules
-
-    datafiles: list[Path] = list(_find_datafiles(datadir_plan.datadir))
-    datalines: list[str] = _read_datafiles(datafiles)
-    datalines_dict = dispatch_datalines_to_targets(rules, datalines)
-    _delete_datafiles(datafiles=datafiles)
-    _write_datafiles(datadir=datadir_plan.datadir, datalines_dict=datalines_dict)
-
-
-def _delete_datafiles(datafiles: list[Path]) -> None:
-    """Delete data files.
+    datadir = datadir_plan.datadir
+    if dir_snapshot is None:
+        dir_snapshot = take_dir_snapshot(datadir)
+
+    run_safety_checks(datadir, safety, check_contents=False, dir_snapshot=dir_snapshot)
+
+    datafiles: list[Path] = _find_datafiles(datadir, dir_snapshot=dir_snapshot)
+    datafile_states: dict[str, DatafileState] = {}
+    datalines: list[str] = _read_datafiles(
+        datafiles,
+        datafile_states=datafile_states,
+        mmap_threshold=performance.mmap_threshold,
+    )
+    reconciler = DatafileReconciler(
+        datadir,
+        datafile_states,
+        fsync=performance.fsync,
+        buffer_size=performance.write_buffer_size,
+    )
+
+    last_uses = datadir_plan.list_last_uses or None
+    sort_memory_limit = performance.sort_memory_limit
+    if sort_memory_limit is None:
+        spill_context = nullcontext(None)
+    else:
+        spill_context = tempfile.TemporaryDirectory(
+            dir=datadir, prefix=".mklists-sort-"
+        )
+
+    route_cache = None
+    if performance.route_cache_entries is not None and not profile_rules:
+        route_cache = RouteCache.load(
+            datadir / ROUTE_CACHE_FILE_NAME,
+            rulechain_fingerprint(datadir_plan.rulefiles_used),
+            performance.route_cache_entries,
+        )
+
+    stats = DispatchStats()
+    try:
+        with spill_context as spill_dir:
+            datalines_dict = dispatch_datalines_to_targets(
+                rules,
+                datalines,
+                workers=performance.dispatch_workers,
+                min_chunk_lines=performance.min_chunk_lines,
+                router=router,
+                last_uses=last_uses,
+                flush=reconciler.write if last_uses else None,
+                sort_memory_limit=sort_memory_limit,
+                spill_dir=None if spill_dir is None else Path(spill_dir),
+                stats=stats,
+                profile=profile_rules,
+                route_cache=route_cache,
+            )
+            reconciler.write_all(datalines_dict)
+    except BaseException:
+        reconciler.abort()
+        raise
+    counts = reconciler.finish()
+    logger.info(
+        f"Datafiles: {counts.created} created, {counts.changed} changed, "
+        f"{counts.deleted} deleted, {counts.unchanged} unchanged"
+    )
+
+    if route_cache is not None:
+        route_cache.save(datadir / ROUTE_CACHE_FILE_NAME)
+        logger.info(
+            f"Routed {route_cache.misses} of {len(datalines)} lines "
+            f"({route_cache.hits} from route cache)"
+        )
+
+    if stats.rules_skipped:
+        logger.info(
+            f"Skipped {stats.rules_skipped} of {len(rules)} rules with empty sources"
+        )
+
+    return stats
+
+
+def trace_datadir(
+    *,
+    datadir_plan: DatadirPlan,
+    safety: SafetyConfig,
+) -> RoutingTrace:
+    """Route datalines of a datadir with tracing, without changing any datafile.
 
     Args:
-        datafiles: List of data files.
+        datadir_plan: Execution plan for one datadir, including resolved rules.
+        safety: Safety configuration for filename validation.
 
     Returns:
-        None, after deleting files.
+        RoutingTrace from which the rules each dataline passes through, and the
+        list in which it ends up, can be looked up.
     """
-    for datafile in datafiles:
-        datafile.unlink()
+    dir_snapshot = take_dir_snapshot(datadir_plan.datadir)
+    run_safety_checks(
+        datadir_plan.datadir, safety, check_contents=False, dir_snapshot=dir_snapshot
+    )
+
+    datafiles = _find_datafiles(datadir_plan.datadir, dir_snapshot=dir_snapshot)
+    datalines = _read_datafiles(datafiles)
+    stats = DispatchStats()
+    dispatch_datalines_to_targets(
+        datadir_plan.rules,
+        datalines,
+        stats=stats,
+        trace=True,
+    )
+
+    return stats.trace
 
 
-def _find_datafiles(datadir: Path) -> list[Path]:
-    """Yields names of datafiles in given data directory as Path objects.
+def _find_datafiles(
+    datadir: Path,
+    *,
+    dir_snapshot: DirSnapshot | None = None,
+) -> list[Path]:
+    """Return datafiles in given data directory as Path objects.
 
     Args:
         datadir: Path of data directory.
+        dir_snapshot: Snapshot of datadir (taken if None).
 
-    Yields:
+    Returns:
         List of datafiles (absolute pathnames).
 
     Note:
@@ -62,73 +216,43 @@ def _find_datafiles(datadir: Path) -> list[Path]:
 
         This function:
         - Assumes a data directory that has been validated.
-        - Yields pathnames of all visible regular files.
-        - Yields files in sorted order.
+        - Returns pathnames of all visible regular files.
+        - Returns files in sorted order.
         - Does not recurse into subdirectories.
     """
-    datafiles: list[Path] = []
-
-    for entry in datadir.iterdir():
-        is_visible = not entry.name.startswith(".")
-        is_file = entry.is_file()
+    if dir_snapshot is None:
+        dir_snapshot = take_dir_snapshot(datadir)
 
-        if is_visible and is_file:
-            datafiles.append(entry)
+    return dir_snapshot.datafiles()
 
-    return sorted(datafiles, key=attrgetter("name"))
 
-
-def _read_datafiles(datafiles: list[Path]) -> list[str]:
-    """Read datafiles and build list of their lines.
+def _read_datafiles(
+    datafiles: list[Path],
+    *,
+    datafile_states: dict[str, DatafileState] | None = None,
+    mmap_threshold: int | None = None,
+) -> list[str]:
+    """Read datafiles, checking their contents, and build list of their lines.
 
     Args:
         datafiles: List of datafiles.
+        datafile_states: If given, the state (size and digest) of each datafile
+            is recorded here, by filename.
+        mmap_threshold: Size (in bytes) from which datafiles are memory-mapped
+            rather than read in one call; None (the default) to always read.
 
     Return:
         Flat list of datalines from all datafiles.
+
+    Raises:
+        SafetyError: If the contents of a datafile violate safety rules.
     """
     datalines: list[str] = []
 
     for datafile in datafiles:
-        with datafile.open(encoding="utf-8") as f:
-            datalines.extend(line.rstrip("\n") for line in f)
+        with datafile_bytes(datafile, mmap_threshold) as data:
+            datalines.extend(check_datafile_bytes(datafile, data))
+            if datafile_states is not None:
+                datafile_states[datafile.name] = datafile_state(data)
 
     return datalines
-
-
-def _write_datafiles(
-    *,
-    datadir: Path,
-    datalines_dict: dict[str, list[str]],
-) -> None:
-    """Writes datafiles into datadir based on datalines_dict.
-
-    Args:
-        datadir: Path of data directory.
-        datalines_dict: Mapping of filenames to lists of datalines.
-
-    Returns:
-        None, after writing files to datadir.
-
-    Note:
-        - Files are written only if there is at least one dataline.
-        - Each dataline is written with a trailing newline.
-        - Hidden files in datadir are left untouched.
-
-    Assumptions:
-        - Datadir exists.
-        - Datadir contains no non-hidden files.
-        - Keys of datalines_dict are filenames (no path separators).
-        - Values are lists of lines WITHOUT trailing newlines.
-    """
-    for filename in sorted(datalines_dict):
-        datalines = datalines_dict[filename]
-
-        # Do not create empty files
-        if not datalines:
-            continue
-
-        filepath = datadir / filename
-        with filepath.open("w", encoding="utf-8") as f:
-            for line in datalines:
-                f.write(f"{line}\n")
@@ -9,30 +9,197 @@ with fan-out behavior and routing semantics.
 """
 
 import re
-from typing import Pattern
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Pattern
 from mklists.errors import RulesNotFoundError, DataNotFoundError
+from mklists.exec.dispatch import (
+    PARALLEL_MIN_CHUNK_LINES,
+    DispatchStats,
+    ListFlush,
+    dispatch_compiled,
+)
+from mklists.exec.external_sort import SpilledLines
+from mklists.exec.dispatch_numpy import (
+    VECTORIZED_MIN_LINES,
+    dispatch_vectorized,
+    numpy_available,
+)
 from mklists.rules import Rule
 
+if TYPE_CHECKING:
+    from mklists.exec.codegen import GeneratedRouter
+    from mklists.exec.route_cache import RouteCache
+
+ENGINE_AUTO = "auto"
+ENGINE_COMPILED = "compiled"
+ENGINE_NUMPY = "numpy"
+ENGINE_REFERENCE = "reference"
+DISPATCH_ENGINES = (ENGINE_AUTO, ENGINE_COMPILED, ENGINE_NUMPY, ENGINE_REFERENCE)
+
 
 def dispatch_datalines_to_targets(
     rules: list[Rule],
     datalines: list[str],
-) -> dict[str, list[str]]:
+    *,
+    engine: str = ENGINE_AUTO,
+    workers: int = 1,
+    min_chunk_lines: int = PARALLEL_MIN_CHUNK_LINES,
+    router: "GeneratedRouter | None" = None,
+    last_uses: dict[str, int] | None = None,
+    flush: ListFlush | None = None,
+    sort_memory_limit: int | None = None,
+    spill_dir: Path | None = None,
+    stats: DispatchStats | None = None,
+    profile: bool = False,
+    trace: bool = False,
+    route_cache: "RouteCache | None" = None,
+) -> dict[str, Sequence[str] | SpilledLines]:
     """Applies rules to build dictionary mapping filenames to lists of datalines.
 
     Args:
         rules: List of Rule objects.
         datalines: List of lines from data files.
+        engine: Dispatch engine: "auto" (default), "compiled", "numpy" or
+            "reference".
+        workers: Maximum number of worker processes used by the compiled engine
+            to route datalines (default 1: no process pool).
+        min_chunk_lines: Minimum number of datalines routed by each worker.
+        router: Routing function generated for these rules, used by the
+            compiled engine (see `mklists.exec.codegen`).
+        last_uses: For each filename, index of the last rule that reads or
+            writes that list (required if flush is given).
+        flush: Function called with the filename and datalines of each list once
+            the list is final, in order of last use; datalines are valid only
+            during the call.
+        sort_memory_limit: If given, maximum number of characters of lines of a
+            final sorted list to sort in memory; larger lists are sorted on disk
+            (compiled engine only).
+        spill_dir: Directory for sorted runs of external sorts (required if
+            sort_memory_limit is given), to be removed by the caller.
+        stats: If given, updated with counts recorded during dispatch (such as
+            the number of rules skipped because they could have no effect).
+        profile: If True, record per-rule counters and timings in stats
+            (required), using the compiled engine.
+        trace: If True, record in stats (required) a `RoutingTrace` from which
+            the rules each line passed through can be looked up, using the
+            compiled engine.
+        route_cache: Cache of routes of lines for these rules, used by the
+            compiled engine to route only lines not found in it.
 
     Returns:
-        Dictionary mapping filenames to lists of data lines.
+        Dictionary mapping filenames to sequences of data lines (lists from the
+        reference engine, otherwise `IndexedLines` views of the datalines),
+        leaving out lists passed to flush. Lists sorted externally are
+        SpilledLines, which merge sorted runs from disk when iterated.
+
+    Raises:
+        ValueError: If engine is not one of DISPATCH_ENGINES, if flush is given
+            without last_uses, if sort_memory_limit is given without spill_dir,
+            if profile or trace is given for the numpy or reference engine, or
+            if the compiled engine is given workers or min_chunk_lines less
+            than 1.
+        RuntimeError: If engine is "numpy" but NumPy is not available.
+
+    Note:
+        All engines produce identical output. The reference engine applies each
+        rule to the whole of its source list in turn and is kept as the
+        specification against which the others are tested. The "auto" engine
+        uses the NumPy engine if NumPy is importable, there are at least
+        VECTORIZED_MIN_LINES datalines, only one worker is allowed, rules are
+        neither profiled nor traced, no route cache is given and no sort
+        memory limit is given, and otherwise the compiled engine.
+
+        The compiled engine passes each list to flush as soon as the rule that
+        last uses it has been applied, then releases its datalines; the other
+        engines pass all lists to flush after the last rule. Flushing early
+        matters little below VECTORIZED_MIN_LINES datalines, and above it the
+        NumPy engine holds each list compactly as line IDs until it is flushed.
     """
+    if engine not in DISPATCH_ENGINES:
+        raise ValueError(f"Unknown dispatch engine {engine!r}.")
+
+    if flush is not None and last_uses is None:
+        raise ValueError("Flushing finalized lists requires last uses of lists.")
+
+    if sort_memory_limit is not None and spill_dir is None:
+        raise ValueError("External sorting requires a directory for sorted runs.")
+
+    if profile and engine not in (ENGINE_AUTO, ENGINE_COMPILED):
+        raise ValueError(f"Rules cannot be profiled with the {engine} engine.")
+
+    if trace and engine not in (ENGINE_AUTO, ENGINE_COMPILED):
+        raise ValueError(f"Routing cannot be traced with the {engine} engine.")
+
     if not rules:
         raise RulesNotFoundError("No rules specified.")
 
     if not datalines:
         raise DataNotFoundError("No data specified.")
 
+    if engine == ENGINE_AUTO:
+        if (
+            not profile
+            and not trace
+            and route_cache is None
+            and sort_memory_limit is None
+            and workers == 1
+            and numpy_available()
+            and len(datalines) >= VECTORIZED_MIN_LINES
+        ):
+            engine = ENGINE_NUMPY
+        else:
+            engine = ENGINE_COMPILED
+
+    if engine == ENGINE_COMPILED:
+        return dispatch_compiled(
+            rules,
+            datalines,
+            workers=workers,
+            min_chunk_lines=min_chunk_lines,
+            router=router,
+            last_uses=last_uses,
+            flush=flush,
+            sort_memory_limit=sort_memory_limit,
+            spill_dir=spill_dir,
+            stats=stats,
+            profile=profile,
+            trace=trace,
+            route_cache=route_cache,
+        )
+
+    if engine == ENGINE_NUMPY:
+        lines_dict = dispatch_vectorized(rules, datalines, stats=stats)
+    else:
+        lines_dict = _dispatch_reference(rules, datalines, stats=stats)
+
+    if flush is not None:
+        for listname in sorted(lines_dict, key=last_uses.__getitem__):
+            flush(listname, lines_dict.pop(listname))
+
+    return lines_dict
+
+
+def _dispatch_reference(
+    rules: list[Rule],
+    datalines: list[str],
+    *,
+    stats: DispatchStats | None = None,
+) -> dict[str, list[str]]:
+    """Apply rules one at a time, re-partitioning each rule's source list.
+
+    Args:
+        rules: Non-empty list of Rule objects.
+        datalines: Non-empty list of lines from data files.
+        stats: If given, updated with counts recorded during dispatch.
+
+    Returns:
+        Dictionary mapping filenames to lists of data lines.
+
+    Note:
+        A rule whose source list is empty is skipped unless it sorts a target
+        list of at least two lines, as it could have no effect.
+    """
     all_keys = set()
     for rule in rules:
         all_keys.add(rule.source)
@@ -41,8 +208,15 @@ def dispatch_datalines_to_targets(
     lines_dict: dict[str, list[str]] = {key: [] for key in all_keys}
     # Before any rules are applied, all data belongs to the initial source.
     lines_dict[rules[0].source] = datalines
+    rules_skipped = 0
 
     for rule in rules:
+        if not lines_dict[rule.source] and (
+            rule.target_sortkey is None or len(lines_dict[rule.target]) < 2
+        ):
+            rules_skipped += 1
+            continue
+
         matched = []
         unmatched = []
         for line in lines_dict[rule.source]:
@@ -65,6 +239,9 @@ def dispatch_datalines_to_targets(
             onebased_sortkey=sortkey,
         )
 
+    if stats is not None:
+        stats.rules_skipped = rules_skipped
+
     return lines_dict
 
 
@@ -107,7 +284,10 @@ def _dataline_matches_pattern(
     return False
 
 
-def _sort_datalines(datalines: list[str], onebased_sortkey: int | None) -> list[str]:
+def _sort_datalines(
+    datalines: list[str],
+    onebased_sortkey: int | None,
+) -> list[str]:
     """Return datalines sorted from a one-based field index through end of line.
 
     Args:
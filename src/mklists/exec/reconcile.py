@@ -0,0 +1,330 @@
+"""Bring the datafiles of a datadir in line with new lists, writing only changes.
+
+Rewriting every datafile on every run, even when nothing has changed, updates
+the modification time of every file, which makes file synchronization services
+upload them all again. Instead, the size and digest of each datafile are
+recorded when it is read, and the content of each new list is compared with
+them while it is encoded, first by size (stopping as soon as the content is
+longer) and then by digest. Content is encoded, compared and written in
+chunks of about a fixed size (small enough to stay in cache), joined from
+batches of lines whose number is adjusted to the length of lines as they come,
+so a million-line list is written in a few hundred calls. Only files whose
+content changes are written, files for new lists are created, and datafiles for
+which there is no longer a list are deleted.
+
+Datafiles are not rewritten in place, so that a crash or interrupt cannot leave
+a datadir half-written. New content is staged in a hidden directory in the
+datadir (on the same filesystem), and once all lists are written, a journal
+naming the files to be replaced and deleted is put in place. This is the point
+of commit: the staged files are then renamed over the datafiles, datafiles are
+deleted, the directory is synced (as the fsync setting allows; see
+`mklists.exec.durability`), and the journal and staging directory are removed.
+On the next run, `recover_datadir` rolls an interrupted commit forward if its
+journal exists, and otherwise discards anything left staged.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from itertools import chain, islice
+from pathlib import Path
+
+from mklists.errors import SafetyError
+from mklists.exec.durability import sync_dir, sync_file
+
+WRITE_BUFFER_SIZE = 64 * 1024
+STAGING_DIR_NAME = ".mklists-staging"
+JOURNAL_FILE_NAME = ".mklists-journal"
+JOURNAL_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class DatafileState:
+    """Size and digest of the content of a datafile.
+
+    Attributes:
+        size: Size of content in bytes.
+        digest: SHA-256 digest of content.
+    """
+
+    size: int
+    digest: bytes
+
+
+@dataclass(slots=True)
+class ReconcileCounts:
+    """Numbers of datafiles created, changed, left unchanged and deleted.
+
+    Attributes:
+        created: Files written for lists that had no datafile.
+        changed: Existing files rewritten because their content changed.
+        unchanged: Existing files left untouched because their content is the same.
+        deleted: Existing files deleted because their list is now empty.
+    """
+
+    created: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+
+def datafile_state(data: bytes | mmap.mmap) -> DatafileState:
+    """Return state of datafile with given content."""
+    return DatafileState(len(data), hashlib.sha256(data).digest())
+
+
+class DatafileReconciler:
+    """Writes lists to datafiles of a datadir, touching only files that change.
+
+    Lists may be written in any order (for example, each as soon as no later
+    rule can change it), and are staged; `finish` then commits them, deleting
+    datafiles for which no list was written, or `abort` discards them.
+
+    Attributes:
+        datadir: Path of data directory.
+        old_states: State of each datafile (by name) when it was read.
+        counts: Numbers of datafiles created, changed, unchanged and deleted.
+        fsync: Durability policy ("none", "dir" or "file").
+        buffer_size: Approximate size (in characters) of chunks written.
+    """
+
+    __slots__ = (
+        "datadir",
+        "old_states",
+        "counts",
+        "fsync",
+        "buffer_size",
+        "_written",
+        "_staged",
+    )
+
+    def __init__(
+        self,
+        datadir: Path,
+        old_states: dict[str, DatafileState],
+        fsync: str = "dir",
+        buffer_size: int = WRITE_BUFFER_SIZE,
+    ) -> None:
+        self.datadir = datadir
+        self.old_states = old_states
+        self.fsync = fsync
+        self.buffer_size = buffer_size
+        self.counts = ReconcileCounts()
+        self._written: set[str] = set()
+        self._staged: list[str] = []
+
+    def write(self, filename: str, datalines: Iterable[str]) -> None:
+        """Stage lines for datafile, unless there are none or the file has them.
+
+        Args:
+            filename: Name of datafile (no path separators).
+            datalines: Lines WITHOUT trailing newlines (a sized iterable).
+        """
+        # Do not create empty files
+        if not datalines:
+            return
+
+        self._written.add(filename)
+        old_state = self.old_states.get(filename)
+        chunks: Iterator[bytes] = _encoded_chunks(datalines, self.buffer_size)
+        if old_state is not None:
+            compared, unchanged = _compare_with_state(chunks, old_state)
+            if unchanged:
+                self.counts.unchanged += 1
+                return
+            chunks = chain(compared, chunks)
+
+        staging_dir = self.datadir / STAGING_DIR_NAME
+        if not self._staged:
+            staging_dir.mkdir(exist_ok=True)
+        with (staging_dir / filename).open("wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            sync_file(f, self.fsync)
+        self._staged.append(filename)
+
+        if old_state is None:
+            self.counts.created += 1
+        else:
+            self.counts.changed += 1
+
+    def write_all(self, datalines_dict: dict[str, Iterable[str]]) -> None:
+        """Write each list of datalines_dict, in order of filename."""
+        for filename in sorted(datalines_dict):
+            self.write(filename, datalines_dict[filename])
+
+    def finish(self) -> ReconcileCounts:
+        """Commit staged lists, deleting datafiles for which no list was written.
+
+        Returns:
+            Numbers of datafiles created, changed, unchanged and deleted.
+        """
+        deleted = sorted(self.old_states.keys() - self._written)
+        self.counts.deleted += len(deleted)
+        if self._staged or deleted:
+            _commit(self.datadir, sorted(self._staged), deleted, self.fsync)
+        return self.counts
+
+    def abort(self) -> None:
+        """Discard staged lists, leaving datafiles as they were."""
+        if self._staged:
+            shutil.rmtree(self.datadir / STAGING_DIR_NAME, ignore_errors=True)
+            self._staged = []
+
+
+def recover_datadir(datadir: Path, fsync: str = "dir") -> str | None:
+    """Complete or discard a rewrite of datadir that was interrupted.
+
+    Args:
+        datadir: Path of data directory.
+        fsync: Durability policy ("none", "dir" or "file").
+
+    Returns:
+        "rolled forward" if a committed rewrite was completed, "rolled back"
+        if staged lists were discarded, or None if there was nothing to do.
+
+    Raises:
+        SafetyError: If the journal of a committed rewrite cannot be read (the
+            datadir is then left as it is, for inspection).
+
+    Note:
+        A journal interrupted while being written, before it was renamed into
+        place, is a temporary file that commits nothing, and is deleted.
+    """
+    journal_file = datadir / JOURNAL_FILE_NAME
+    staging_dir = datadir / STAGING_DIR_NAME
+    unfinished_journals = list(datadir.glob(f"{JOURNAL_FILE_NAME}-*"))
+    for unfinished_journal in unfinished_journals:
+        unfinished_journal.unlink()
+    if journal_file.exists():
+        replaced, deleted = _read_journal(journal_file)
+        _apply(datadir, replaced, deleted, fsync)
+        return "rolled forward"
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+        return "rolled back"
+    if unfinished_journals:
+        return "rolled back"
+    return None
+
+
+def _commit(datadir: Path, replaced: list[str], deleted: list[str], fsync: str) -> None:
+    """Put journal in place, then apply it.
+
+    Note:
+        Unless fsync is "none", the journal's directory entry is synced before
+        any datafile is replaced, so that a rewrite applied in part is never
+        left without its journal; if fsync is "file", staged files and the
+        journal itself have been synced too.
+    """
+    document = {
+        "format": JOURNAL_FORMAT_VERSION,
+        "replace": replaced,
+        "delete": deleted,
+    }
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=datadir, prefix=f"{JOURNAL_FILE_NAME}-", delete=False
+    ) as f:
+        json.dump(document, f)
+        sync_file(f, fsync)
+    os.replace(f.name, datadir / JOURNAL_FILE_NAME)
+    sync_dir(datadir, fsync)
+    _apply(datadir, replaced, deleted, fsync)
+
+
+def _apply(datadir: Path, replaced: list[str], deleted: list[str], fsync: str) -> None:
+    """Move staged files into place and delete files, as named in the journal.
+
+    Note:
+        Steps already taken (by an interrupted commit) are skipped, so this can
+        be repeated until it completes.
+    """
+    staging_dir = datadir / STAGING_DIR_NAME
+    for filename in replaced:
+        staged = staging_dir / filename
+        if staged.exists():
+            os.replace(staged, datadir / filename)
+    for filename in deleted:
+        (datadir / filename).unlink(missing_ok=True)
+    sync_dir(datadir, fsync)
+    (datadir / JOURNAL_FILE_NAME).unlink()
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def _read_journal(journal_file: Path) -> tuple[list[str], list[str]]:
+    try:
+        document = json.loads(journal_file.read_bytes())
+        if document["format"] != JOURNAL_FORMAT_VERSION:
+            raise ValueError(f"format {document['format']!r}")
+        replaced, deleted = document["replace"], document["delete"]
+        for filename in chain(replaced, deleted):
+            if not isinstance(filename, str) or Path(filename).name != filename:
+                raise ValueError(f"filename {filename!r}")
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        raise SafetyError(f"Cannot read journal {journal_file}: {exc}") from exc
+    return replaced, deleted
+
+
+def _compare_with_state(
+    chunks: Iterator[bytes], state: DatafileState
+) -> tuple[list[bytes], bool]:
+    """Compare content, given in chunks, with the content of a datafile.
+
+    Args:
+        chunks: Content, in chunks (consumed only as far as needed).
+        state: State of content of datafile.
+
+    Returns:
+        Chunks consumed (so that content can still be written without being
+        encoded again), and True if content has the size and then the digest
+        of the datafile's content.
+
+    Note:
+        Chunks are consumed only until their size exceeds the size of the
+        datafile, so at most about that many bytes are held.
+    """
+    compared: list[bytes] = []
+    size = 0
+    digest = hashlib.sha256()
+
+    for chunk in chunks:
+        compared.append(chunk)
+        size += len(chunk)
+        if size > state.size:
+            return compared, False
+        digest.update(chunk)
+
+    return compared, size == state.size and digest.digest() == state.digest
+
+
+def _text_chunks(datalines: Iterable[str], buffer_size: int) -> Iterator[str]:
+    """Yield content of lines, each with a trailing newline, in chunks.
+
+    Args:
+        datalines: Lines WITHOUT trailing newlines.
+        buffer_size: Approximate size of chunks, in characters.
+
+    Note:
+        The first batch is a few lines; each later batch is sized from the
+        mean length of the lines of the previous batch, so chunks stay near
+        buffer_size however long lines are (but lines are never split).
+    """
+    lines = iter(datalines)
+    batch_lines = 16
+    while batch := list(islice(lines, batch_lines)):
+        # Joining with an empty last line adds the trailing newline in place.
+        batch.append("")
+        chunk = "\n".join(batch)
+        yield chunk
+        batch_lines = max(1, batch_lines * buffer_size // len(chunk))
+
+
+def _encoded_chunks(datalines: Iterable[str], buffer_size: int) -> Iterator[bytes]:
+    """Yield content of lines, encoded as UTF-8, in chunks."""
+    for chunk in _text_chunks(datalines, buffer_size):
+        yield chunk.encode("utf-8")
@@ -0,0 +1,237 @@
+"""Persisted cache of the routes taken by datalines through a rule chain.
+
+Where a line is routed depends only on the line and the rule chain, and between
+consecutive runs most lines are unchanged. A route cache maps a digest of each
+line to its route: the indexes of the rules that move the line, in order. The
+per-rule batches needed to replay list order are rebuilt from the routes of
+cached lines, so only new or changed lines are routed.
+
+The cache is stored in a hidden file in the datadir, keyed by a fingerprint of
+the rule files, and so is discarded as soon as any rule file changes. Its size
+is capped: lines not seen for the longest are evicted first.
+
+File format: a JSON header line, then the digests of all entries (least
+recently used first), the index of each entry's route in a table of distinct
+routes, and the routes themselves as offsets into a flat array of rule indexes.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import sys
+import tempfile
+from array import array
+from collections.abc import Callable
+from itertools import islice
+from pathlib import Path
+
+from mklists.exec.linetable import LINE_ID_TYPECODE, line_id_array
+
+ROUTE_CACHE_FILE_NAME = ".mklists-route-cache"
+ROUTE_CACHE_FORMAT_VERSION = 1
+LINE_DIGEST_SIZE = 16
+
+Route = tuple[int, ...]
+
+
+def rulechain_fingerprint(rulefiles: list[Path]) -> str:
+    """Return fingerprint of the contents of given rule files, in order.
+
+    Args:
+        rulefiles: Rule files from which a datadir's rule chain was loaded.
+
+    Returns:
+        Hex digest that changes if any rule file (or the cache format) changes.
+    """
+    digest = hashlib.sha256(f"mklists routes {ROUTE_CACHE_FORMAT_VERSION}".encode())
+    for rulefile in rulefiles:
+        data = rulefile.read_bytes()
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def line_digest(line: str) -> bytes:
+    """Return digest by which given line is looked up in a route cache."""
+    return hashlib.blake2b(
+        line.encode("utf-8", "surrogatepass"), digest_size=LINE_DIGEST_SIZE
+    ).digest()
+
+
+class RouteCache:
+    """Map from line digests to routes, in order of last use.
+
+    Attributes:
+        fingerprint: Fingerprint of the rule chain for which routes are valid.
+        max_entries: Maximum number of entries kept when the cache is saved.
+        routes: Route of each line digest, least recently used first.
+        hits: Number of lines found in the cache by `route`.
+        misses: Number of lines routed by `route` because not found.
+    """
+
+    __slots__ = ("fingerprint", "max_entries", "routes", "hits", "misses")
+
+    def __init__(
+        self,
+        fingerprint: str,
+        max_entries: int,
+        routes: dict[bytes, Route] | None = None,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError(
+                f"Route cache must hold at least 1 entry, not {max_entries}."
+            )
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.routes = {} if routes is None else routes
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: Path, fingerprint: str, max_entries: int) -> "RouteCache":
+        """Load cache from file, or return an empty cache.
+
+        Args:
+            path: Pathname of cache file.
+            fingerprint: Fingerprint of the current rule chain.
+            max_entries: Maximum number of entries.
+
+        Returns:
+            Cache read from path, or an empty cache if the file is missing,
+            unreadable, or was written for another rule chain.
+        """
+        try:
+            with path.open("rb") as f:
+                header = json.loads(f.readline())
+                if (
+                    header.get("format") != ROUTE_CACHE_FORMAT_VERSION
+                    or header.get("fingerprint") != fingerprint
+                    or header.get("byteorder") != sys.byteorder
+                ):
+                    return cls(fingerprint, max_entries)
+                digests = _read_exact(f, header["entries"] * LINE_DIGEST_SIZE)
+                route_ids = _read_array(f, header["entries"])
+                offsets = _read_array(f, header["routes"] + 1)
+                rule_indexes = _read_array(f, header["hops"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return cls(fingerprint, max_entries)
+
+        distinct = [
+            tuple(rule_indexes[start:end]) for start, end in zip(offsets, offsets[1:])
+        ]
+        routes = {
+            digests[i : i + LINE_DIGEST_SIZE]: distinct[route_id]
+            for i, route_id in zip(range(0, len(digests), LINE_DIGEST_SIZE), route_ids)
+        }
+        return cls(fingerprint, max_entries, routes)
+
+    def save(self, path: Path) -> None:
+        """Write cache (its most recently used entries, up to max_entries) to file.
+
+        Note:
+            The file is written under a temporary name and then renamed, so an
+            interrupted save leaves the previous cache (or none) in place.
+        """
+        excess = len(self.routes) - self.max_entries
+        if excess > 0:
+            self.routes = dict(islice(self.routes.items(), excess, None))
+
+        route_indexes: dict[Route, int] = {}
+        route_ids = array(LINE_ID_TYPECODE)
+        for route in self.routes.values():
+            route_ids.append(route_indexes.setdefault(route, len(route_indexes)))
+        offsets = array(LINE_ID_TYPECODE, [0])
+        rule_indexes = array(LINE_ID_TYPECODE)
+        for route in route_indexes:
+            rule_indexes.extend(route)
+            offsets.append(len(rule_indexes))
+
+        header = {
+            "format": ROUTE_CACHE_FORMAT_VERSION,
+            "fingerprint": self.fingerprint,
+            "byteorder": sys.byteorder,
+            "entries": len(self.routes),
+            "routes": len(route_indexes),
+            "hops": len(rule_indexes),
+        }
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=path.parent, prefix=f"{path.name}-", delete=False
+        ) as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            f.write(b"".join(self.routes))
+            route_ids.tofile(f)
+            offsets.tofile(f)
+            rule_indexes.tofile(f)
+        os.replace(f.name, path)
+
+    def route(
+        self,
+        datalines: list[str],
+        rule_count: int,
+        route_lines: Callable[[list[str]], list[array]],
+    ) -> list[array]:
+        """Return lines moved by each rule, routing only lines not in the cache.
+
+        Args:
+            datalines: List of lines from data files.
+            rule_count: Number of rules in rule chain.
+            route_lines: Function routing a list of lines, returning for each
+                rule the ascending IDs (indexes into that list) of lines it moved.
+
+        Returns:
+            For each rule, IDs of lines moved by that rule, in ascending order,
+            exactly as `route_lines(datalines)` would return them. Entries for
+            the given lines become the most recently used.
+        """
+        routes = self.routes
+        digests = [line_digest(line) for line in datalines]
+        batches = [line_id_array() for _ in range(rule_count)]
+        missed: list[int] = []
+
+        for line_id, digest in enumerate(digests):
+            route = routes.get(digest)
+            if route is None:
+                missed.append(line_id)
+            else:
+                for rule_index in route:
+                    batches[rule_index].append(line_id)
+
+        if missed:
+            missed_routes: list[list[int]] = [[] for _ in missed]
+            missed_batches = route_lines([datalines[i] for i in missed])
+            for rule_index, missed_batch in enumerate(missed_batches):
+                if not missed_batch:
+                    continue
+                for local_id in missed_batch:
+                    missed_routes[local_id].append(rule_index)
+                line_ids = line_id_array(missed[i] for i in missed_batch)
+                batches[rule_index] = line_id_array(
+                    heapq.merge(batches[rule_index], line_ids)
+                )
+            distinct: dict[Route, Route] = {}
+            for line_id, route in zip(missed, missed_routes):
+                route = tuple(route)
+                routes[digests[line_id]] = distinct.setdefault(route, route)
+
+        self.hits += len(datalines) - len(missed)
+        self.misses += len(missed)
+
+        # Re-insert entries of given lines so that they are the most recent.
+        for digest in digests:
+            routes[digest] = routes.pop(digest)
+
+        return batches
+
+
+def _read_exact(f, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Route cache file is truncated.")
+    return data
+
+
+def _read_array(f, count: int) -> array:
+    values = array(LINE_ID_TYPECODE)
+    values.frombytes(_read_exact(f, count * values.itemsize))
+    return values
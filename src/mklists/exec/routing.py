@@ -4,6 +4,7 @@ import shutil
 from datetime import UTC, datetime
 from pathlib import Path
 
+from mklists.exec.snapshot import take_dir_snapshot
 from mklists.logging import logger
 
 
@@ -16,16 +17,21 @@ def redistribute_datafiles(
     Args:
         datadirs:
         routing_dict:
-        routing_enabled:
 
     Returns:
         None, after moving files with special names to directories outside datadir.
+
+    Note:
+        Each datadir is listed once, rather than checked for each special name.
     """
     for datadir in datadirs:
+        # Datadirs have just been rewritten, so are listed afresh.
+        dir_snapshot = take_dir_snapshot(datadir)
+
         for filename, dest_dir in routing_dict.items():
             source = datadir / filename
 
-            if not source.exists():
+            if filename not in dir_snapshot:
                 continue
 
             if not dest_dir.exists():
@@ -0,0 +1,123 @@
+"""Reports of per-rule counters and timings recorded while profiling a run.
+
+Counters are recorded by the compiled dispatch engine (see `RuleStats`) for each
+datadir in each pass. Reports list the costliest rules of each datadir, by
+rule file and line number, for reading at the console, or all rules as JSON for
+tracking regressions between runs.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from mklists.exec.dispatch import RuleStats
+
+RULE_STATS_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class DatadirRuleStats:
+    """Per-rule counters recorded while processing one datadir in one pass.
+
+    Attributes:
+        datadir: Path of datadir.
+        pass_number: Number of pass (counting from 1).
+        rules_skipped: Number of rules skipped because they could have no effect.
+        rule_stats: Counters for each rule, in order of application.
+    """
+
+    datadir: Path
+    pass_number: int
+    rules_skipped: int
+    rule_stats: list[RuleStats]
+
+
+def costliest_rules(rule_stats: list[RuleStats], top: int) -> list[RuleStats]:
+    """Return counters of (at most) the top rules by total time, costliest first.
+
+    Args:
+        rule_stats: Counters for each rule, in order of application.
+        top: Maximum number of rules to return.
+
+    Returns:
+        Counters of costliest rules; among rules of equal cost, earlier first.
+    """
+    return sorted(rule_stats, key=lambda stats: -stats.seconds)[:top]
+
+
+def format_rule_stats(datadir_rule_stats: DatadirRuleStats, top: int) -> list[str]:
+    """Return lines of a table of the costliest rules of one datadir.
+
+    Args:
+        datadir_rule_stats: Counters recorded for one datadir in one pass.
+        top: Maximum number of rules to list.
+
+    Returns:
+        Heading line, column headings and one line per rule.
+    """
+    rule_stats = datadir_rule_stats.rule_stats
+    total = sum(stats.seconds for stats in rule_stats)
+    lines = [
+        f"Rule stats for {datadir_rule_stats.datadir} "
+        f"(pass {datadir_rule_stats.pass_number}): "
+        f"{len(rule_stats)} rules, {datadir_rule_stats.rules_skipped} skipped, "
+        f"{total:.6f}s",
+        f"  {'seconds':>9} {'match':>9} {'sort':>9} {'examined':>9} "
+        f"{'matched':>9}  rule",
+    ]
+    for stats in costliest_rules(rule_stats, top):
+        lines.append(
+            f"  {stats.seconds:9.6f} {stats.match_seconds:9.6f} "
+            f"{stats.sort_seconds:9.6f} {stats.lines_examined:9d} "
+            f"{stats.lines_matched:9d}  {_rule_location(stats)}"
+        )
+    return lines
+
+
+def rule_stats_to_json(datadir_rule_stats: list[DatadirRuleStats]) -> str:
+    """Return counters of all rules of all datadirs as a JSON document.
+
+    Args:
+        datadir_rule_stats: Counters recorded for each datadir in each pass.
+
+    Returns:
+        JSON text of an object with the format version and, for each datadir
+        and pass, the counters of each rule in order of application.
+    """
+    document = {
+        "version": RULE_STATS_FORMAT_VERSION,
+        "datadirs": [
+            {
+                "datadir": str(entry.datadir),
+                "pass": entry.pass_number,
+                "rules_skipped": entry.rules_skipped,
+                "rules": [_rule_stats_dict(stats) for stats in entry.rule_stats],
+            }
+            for entry in datadir_rule_stats
+        ],
+    }
+    return json.dumps(document, indent=2)
+
+
+def _rule_stats_dict(stats: RuleStats) -> dict[str, object]:
+    rule = stats.rule
+    return {
+        "rulefile": None if rule.rulefile is None else str(rule.rulefile),
+        "lineno": rule.lineno,
+        "source": rule.source,
+        "target": rule.target,
+        "pattern": rule.source_matchpattern.pattern,
+        "lines_examined": stats.lines_examined,
+        "lines_matched": stats.lines_matched,
+        "match_seconds": stats.match_seconds,
+        "sort_seconds": stats.sort_seconds,
+    }
+
+
+def _rule_location(stats: RuleStats) -> str:
+    """Return rule file and line number of rule, with its source and target."""
+    rule = stats.rule
+    lists = f"{rule.source} -> {rule.target}"
+    if rule.rulefile is None:
+        return lists
+    return f"{rule.rulefile}:{rule.lineno} ({lists})"
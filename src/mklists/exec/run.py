@@ -1,5 +1,10 @@
 """Orchestration of a Mklists execution run."""
 
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
 
 from mklists.errors import DataNotFoundError
@@ -8,53 +13,144 @@ from mklists.exec.backups import (
     init_snapshot_dir,
     prune_backupdirs,
 )
+from mklists.exec.codegen import GeneratedRouter, generate_router
+from mklists.exec.dispatch import DispatchStats
 from mklists.exec.linkify import linkify_html_datadirs, linkify_md_datadirs
 from mklists.exec.process_datadirs import process_datadir
+from mklists.exec.reconcile import recover_datadir
 from mklists.exec.routing import redistribute_datafiles
-from mklists.logging import logger
-from mklists.plan.model import RunPlan
+from mklists.exec.rule_stats import DatadirRuleStats
+from mklists.exec.snapshot import DirSnapshot, take_dir_snapshot
+from mklists.exec.state import (
+    DatadirState,
+    RunState,
+    check_datadir_state,
+    files_digest,
+    has_racy_files,
+    load_run_state,
+    record_datadir_state,
+    save_run_state,
+)
+from mklists.logging import hold_logs, logger, replay_logs
+from mklists.plan.model import DatadirPlan, RunPlan
+from mklists.rules import Rule
 
 
-def run_mklists(run_plan: RunPlan) -> list[Path]:
+def run_mklists(
+    run_plan: RunPlan,
+    *,
+    rule_stats: list[DatadirRuleStats] | None = None,
+) -> list[Path]:
     """Execute a prepared run plan.
 
     Args:
         run_plan: Execution plan for a Mklists run.
+        rule_stats: If given, rules are profiled, and counters recorded for each
+            datadir in each pass are appended to this list.
 
     Returns:
         List of datadir paths that were skipped because they contained no data.
+
+    Note:
+        If the plan has a state file, the state of each datadir is recorded
+        there after the run. In each pass, datadirs that are exactly as the
+        last run left them are skipped, and if all datadirs are, the run stops
+        before backup (unless rules are being profiled).
+
+        A rewrite of a datadir interrupted in an earlier run is first rolled
+        forward (if it was committed) or back.
+
+        The routing function of each distinct rule chain is generated when the
+        first datadir with that chain is processed, and reused for other
+        datadirs with the same rules and in later passes.
     """
     datadirs = [ctx.datadir for ctx in run_plan.datadir_plans]
     empty_datadirs: list[Path] = []
+    routers: dict[tuple[Rule, ...], GeneratedRouter | None] = {}
+
+    for datadir in datadirs:
+        recovery = recover_datadir(datadir, run_plan.performance.fsync)
+        if recovery is not None:
+            logger.info(f"Interrupted rewrite of {datadir} {recovery}")
+
+    previous_state = None
+    config_digest = ""
+    rules_digests: dict[Path, str] = {}
+    if run_plan.state is not None:
+        previous_state = load_run_state(run_plan.state.state_file)
+        config_digest = files_digest(run_plan.state.configfiles)
+        rules_digests = {
+            plan.datadir: files_digest(plan.rulefiles_used)
+            for plan in run_plan.datadir_plans
+        }
+        if previous_state is not None and previous_state.config_digest != config_digest:
+            previous_state = None
 
     total_passes = len(run_plan.pass_plans)
     for pass_number, pass_plan in enumerate(run_plan.pass_plans, start=1):
+        # Each datadir is listed once per pass, for backup and processing.
+        listed_ns = time.time_ns()
+        dir_snapshots = {datadir: take_dir_snapshot(datadir) for datadir in datadirs}
+
+        unchanged: dict[Path, DatadirState] = {}
+        if previous_state is not None and rule_stats is None:
+            unchanged = _find_unchanged_datadirs(
+                run_plan=run_plan,
+                previous_state=previous_state,
+                dir_snapshots=dir_snapshots,
+                rules_digests=rules_digests,
+            )
+        if pass_number == 1 and datadirs and len(unchanged) == len(datadirs):
+            logger.info("No datadir has changed since the last run")
+            _refresh_run_state(
+                run_plan=run_plan,
+                previous_state=previous_state,
+                unchanged=unchanged,
+                listed_ns=listed_ns,
+            )
+            return empty_datadirs
+
         if pass_plan.snapshot_dir is not None:
 
             init_snapshot_dir(
                 snapshot_dir=pass_plan.snapshot_dir,
                 snapshot_datatree_configfiles=pass_plan.snapshot_datatree_configfiles,
+                fsync=run_plan.performance.fsync,
             )
 
             backup_datadirs(
                 datadirs=datadirs,
                 snapshot_dir=pass_plan.snapshot_dir,
+                dir_snapshots=dir_snapshots,
+                fsync=run_plan.performance.fsync,
             )
 
-        for datadir_plan in run_plan.datadir_plans:
-            logger.info(str(datadir_plan.datadir))
-            try:
-                process_datadir(
-                    datadir_plan=datadir_plan,
-                    safety=run_plan.safety,
-                )
-            except DataNotFoundError as exc:
+        processed = _process_datadirs(
+            run_plan=run_plan,
+            unchanged=unchanged,
+            dir_snapshots=dir_snapshots,
+            profile_rules=rule_stats is not None,
+            routers=routers,
+        )
+        for datadir_plan, stats in processed:
+            if isinstance(stats, DataNotFoundError):
                 if run_plan.is_datatree_root:
                     empty_datadirs.append(datadir_plan.datadir)
                 else:
                     raise DataNotFoundError(
                         f"No data found in {datadir_plan.datadir}"
-                    ) from exc
+                    ) from stats
+                continue
+
+            if rule_stats is not None:
+                rule_stats.append(
+                    DatadirRuleStats(
+                        datadir=datadir_plan.datadir,
+                        pass_number=pass_number,
+                        rules_skipped=stats.rules_skipped,
+                        rule_stats=stats.rule_stats,
+                    )
+                )
 
         if run_plan.routing_dict:
             redistribute_datafiles(
@@ -73,14 +169,221 @@ def run_mklists(run_plan: RunPlan) -> list[Path]:
     if run_plan.linkify_md_dir or run_plan.linkify_html_dir:
         _run_linkify(run_plan=run_plan, datadirs=datadirs)
 
+    if run_plan.state is not None:
+        _record_run_state(
+            run_plan=run_plan,
+            previous_state=previous_state,
+            config_digest=config_digest,
+            rules_digests=rules_digests,
+        )
+
     return empty_datadirs
 
 
+def _process_datadirs(
+    *,
+    run_plan: RunPlan,
+    unchanged: dict[Path, DatadirState],
+    dir_snapshots: dict[Path, DirSnapshot],
+    profile_rules: bool,
+    routers: dict[tuple[Rule, ...], GeneratedRouter | None],
+) -> list[tuple[DatadirPlan, DispatchStats | DataNotFoundError]]:
+    """Process each datadir of the plan that has changed, in one pass.
+
+    Args:
+        routers: Routing function generated for each rule chain of datadirs
+            already processed in the run, to which those generated in this pass
+            are added.
+
+    Returns:
+        Each datadir plan processed, in order, with the counts recorded while
+        processing it, or the error raised if the datadir had no data.
+
+    Note:
+        With more than one job (see `PerformanceConfig.jobs`), datadirs are
+        processed concurrently in a pool of threads. The logs of each datadir
+        are held and replayed in plan order, so they read as if datadirs had
+        been processed one after another. If processing a datadir fails, no
+        datadir not yet started is started, datadirs being processed are
+        finished (each is rewritten all at once or not at all), and then the
+        first error, in plan order, is raised.
+    """
+    to_process = [
+        datadir_plan
+        for datadir_plan in run_plan.datadir_plans
+        if datadir_plan.datadir not in unchanged
+    ]
+
+    routers_lock = threading.Lock()
+
+    def process(datadir_plan: DatadirPlan) -> DispatchStats | DataNotFoundError:
+        logger.info(str(datadir_plan.datadir))
+        datadir = datadir_plan.datadir
+        rules = tuple(datadir_plan.rules)
+        with routers_lock:
+            if rules not in routers:
+                routers[rules] = generate_router(datadir_plan.rules) if rules else None
+        try:
+            return process_datadir(
+                datadir_plan=datadir_plan,
+                safety=run_plan.safety,
+                performance=run_plan.performance,
+                profile_rules=profile_rules,
+                dir_snapshot=dir_snapshots[datadir],
+                router=routers[rules],
+            )
+        except DataNotFoundError as exc:
+            return exc
+
+    jobs = min(run_plan.performance.jobs, len(to_process))
+    if jobs <= 1:
+        processed = []
+        for datadir_plan in run_plan.datadir_plans:
+            if datadir_plan.datadir in unchanged:
+                logger.info(f"{datadir_plan.datadir} unchanged since the last run")
+                continue
+            processed.append((datadir_plan, process(datadir_plan)))
+        return processed
+
+    failed = threading.Event()
+
+    def process_holding_logs(
+        datadir_plan: DatadirPlan,
+    ) -> tuple[list[logging.LogRecord], DispatchStats | Exception | None]:
+        with hold_logs() as records:
+            if failed.is_set():
+                return records, None
+            try:
+                return records, process(datadir_plan)
+            except Exception as exc:
+                failed.set()
+                return records, exc
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="mklists") as pool:
+        try:
+            futures = {
+                datadir_plan.datadir: pool.submit(process_holding_logs, datadir_plan)
+                for datadir_plan in to_process
+            }
+            results = {datadir: future.result() for datadir, future in futures.items()}
+        finally:
+            failed.set()
+
+    processed = []
+    first_error = None
+    for datadir_plan in run_plan.datadir_plans:
+        if datadir_plan.datadir in unchanged:
+            logger.info(f"{datadir_plan.datadir} unchanged since the last run")
+            continue
+        records, outcome = results[datadir_plan.datadir]
+        replay_logs(records)
+        if outcome is None:
+            continue
+        if isinstance(outcome, Exception) and not isinstance(
+            outcome, DataNotFoundError
+        ):
+            first_error = first_error or outcome
+            continue
+        processed.append((datadir_plan, outcome))
+
+    if first_error is not None:
+        raise first_error
+    return processed
+
+
+def _find_unchanged_datadirs(
+    *,
+    run_plan: RunPlan,
+    previous_state: RunState,
+    dir_snapshots: dict[Path, DirSnapshot],
+    rules_digests: dict[Path, str],
+) -> dict[Path, DatadirState]:
+    """Return current state of each datadir that is as the last run left it.
+
+    Note:
+        A datadir holding a file to be routed elsewhere is never unchanged (it
+        was left there because its destination was not found).
+    """
+    unchanged: dict[Path, DatadirState] = {}
+    for datadir_plan in run_plan.datadir_plans:
+        datadir = datadir_plan.datadir
+        recorded = previous_state.datadirs.get(datadir)
+        dir_snapshot = dir_snapshots[datadir]
+        if recorded is None or any(
+            name in dir_snapshot for name in run_plan.routing_dict
+        ):
+            continue
+        current = check_datadir_state(dir_snapshot, recorded, rules_digests[datadir])
+        if current is not None:
+            unchanged[datadir] = current
+    return unchanged
+
+
+def _refresh_run_state(
+    *,
+    run_plan: RunPlan,
+    previous_state: RunState,
+    unchanged: dict[Path, DatadirState],
+    listed_ns: int,
+) -> None:
+    """Save state of unchanged datadirs if files were touched or recently changed.
+
+    Note:
+        Files touched since the last run, or changed just before its state was
+        recorded, had to be read to be known unchanged; saving their state as
+        of this run means they need not be read again.
+    """
+    if all(
+        current == previous_state.datadirs[datadir] and not has_racy_files(current)
+        for datadir, current in unchanged.items()
+    ):
+        return
+
+    datadir_states = dict(previous_state.datadirs)
+    for datadir, current in unchanged.items():
+        datadir_states[datadir] = replace(current, recorded_ns=listed_ns)
+    save_run_state(
+        run_plan.state.state_file,
+        RunState(config_digest=previous_state.config_digest, datadirs=datadir_states),
+        run_plan.performance.fsync,
+    )
+
+
+def _record_run_state(
+    *,
+    run_plan: RunPlan,
+    previous_state: RunState | None,
+    config_digest: str,
+    rules_digests: dict[Path, str],
+) -> None:
+    """Record state of datadirs after the run (keeping that of datadirs not in it)."""
+    datadir_states = {} if previous_state is None else dict(previous_state.datadirs)
+    for datadir_plan in run_plan.datadir_plans:
+        datadir = datadir_plan.datadir
+        recorded_ns = time.time_ns()
+        datadir_states[datadir] = record_datadir_state(
+            take_dir_snapshot(datadir),
+            rules_digests[datadir],
+            recorded_ns,
+            previous=datadir_states.get(datadir),
+        )
+    save_run_state(
+        run_plan.state.state_file,
+        RunState(config_digest=config_digest, datadirs=datadir_states),
+        run_plan.performance.fsync,
+    )
+
+
 def _run_linkify(*, run_plan: RunPlan, datadirs: list[Path]) -> None:
     if not run_plan.is_datatree_root:
         logger.info("Skip linkify because run directory is not datatree root")
         return
+    fsync = run_plan.performance.fsync
     if run_plan.linkify_md_dir:
-        linkify_md_datadirs(datadirs=datadirs, linkify_md_dir=run_plan.linkify_md_dir)
+        linkify_md_datadirs(
+            datadirs=datadirs, linkify_md_dir=run_plan.linkify_md_dir, fsync=fsync
+        )
     if run_plan.linkify_html_dir:
-        linkify_html_datadirs(datadirs=datadirs, linkify_html_dir=run_plan.linkify_html_dir)
+        linkify_html_datadirs(
+            datadirs=datadirs, linkify_html_dir=run_plan.linkify_html_dir, fsync=fsync
+        )
@@ -1,20 +1,35 @@
 """Validate that a given data directory satisfies mklists safety constraints."""
 
-import stat
+import mmap
+import os
+import re
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
 from mklists.config.model import SafetyConfig
 from mklists.errors import SafetyError
+from mklists.exec.snapshot import DirSnapshot, take_dir_snapshot
 
 _BINARY_SCAN_BYTES = 8192
+_BLANK_LINE = re.compile(r"\n[^\S\n]*\n")
 
 
-def run_safety_checks(datadir: Path, safety_cfg: SafetyConfig) -> None:
+def run_safety_checks(
+    datadir: Path,
+    safety_cfg: SafetyConfig,
+    *,
+    check_contents: bool = True,
+    dir_snapshot: DirSnapshot | None = None,
+) -> None:
     """Run safety checks.
 
     Args:
         datadir: Path of data directory.
         safety_cfg: Normalized safety configuration object.
+        check_contents: If False, skip checks of file contents (for callers
+            that read datafiles with `read_checked_datafile`).
+        dir_snapshot: Snapshot of datadir (taken if None).
 
     Returns:
         None, unless safety exceptions are raised.
@@ -25,33 +40,138 @@ def run_safety_checks(datadir: Path, safety_cfg: SafetyConfig) -> None:
         - Filenames are valid.
         - Files do not have binary content or blank lines.
     """
-    for entry in datadir.iterdir():
-        if entry.name.startswith("."):
-            continue
-        _check_is_regular_file(entry)
-        _check_is_valid_name(entry, safety_cfg)
-        _check_file_contents(entry)
+    if dir_snapshot is None:
+        dir_snapshot = take_dir_snapshot(datadir)
 
+    for entry in dir_snapshot.visible_entries():
+        pathname = datadir / entry.name
+        _check_entry_is_regular_file(entry)
+        _check_is_valid_name(pathname, safety_cfg)
+        if check_contents:
+            _check_file_contents(pathname)
 
-def _check_is_regular_file(pathname: Path) -> None:
-    """Verify that given pathname refers to a regular file based on its metadata.
+
+def read_checked_datafile(
+    pathname: Path, mmap_threshold: int | None = None
+) -> list[str]:
+    """Read datafile in one pass, checking its contents, and return its lines.
 
     Args:
-        pathname: Pathname to be checked.
+        pathname: Path to file.
+        mmap_threshold: Size from which the file is mapped (see `datafile_bytes`).
+
+    Returns:
+        Lines of file, without line endings (LF, CRLF or CR).
 
     Raises:
-        SafetyError: If pathname is anything other than a regular file.
+        SafetyError: If content safety rules are violated.
+    """
+    with datafile_bytes(pathname, mmap_threshold) as data:
+        return check_datafile_bytes(pathname, data)
+
+
+@contextmanager
+def datafile_bytes(
+    pathname: Path, mmap_threshold: int | None = None
+) -> Iterator[bytes | mmap.mmap]:
+    """Open datafile and provide its contents as bytes, read or mapped.
+
+    Args:
+        pathname: Path to file.
+        mmap_threshold: Size (in bytes) from which the file is memory-mapped
+            rather than read in one call; None (the default) to always read.
+
+    Yields:
+        Contents of file: bytes, or a read-only mapping valid until exit.
+
+    Note:
+        A mapped file is decoded straight from the page cache, without first
+        being copied into a bytes object as large as the file. Mklists never
+        rewrites datafiles in place (new content is renamed over them), but
+        another program may: if a mapped file is truncated while it is being
+        decoded (as by a file synchronization tool), reading past its new end
+        kills the process with SIGBUS, which cannot be caught. Mapping is
+        therefore only done when asked for.
     """
+    with pathname.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if mmap_threshold is None or size == 0 or size < mmap_threshold:
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def check_datafile_bytes(pathname: Path, data: bytes | mmap.mmap) -> list[str]:
+    """Check contents of datafile, already read or mapped, and return its lines.
+
+    Args:
+        pathname: Path to file (for error messages).
+        data: Contents of file.
+
+    Returns:
+        Lines of file, without line endings (LF, CRLF or CR).
+
+    Raises:
+        SafetyError: If content safety rules are violated.
+
+    Note:
+        Checks, in order:
+        - must not appear to be binary (no NUL bytes in the first 8 KB).
+        - must be valid UTF-8.
+        - must contain no blank or whitespace-only lines.
+    """
+    if data.find(b"\x00", 0, _BINARY_SCAN_BYTES) != -1:
+        raise SafetyError(f"{pathname}: appears to be binary")
+
     try:
-        st = pathname.lstat()
+        text = str(data, "utf-8")
+    except UnicodeDecodeError as e:
+        raise SafetyError(f"{pathname}: is not valid UTF-8: {e}") from e
+
+    if not text:
+        return []
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    if text.endswith("\n"):
+        text = text[:-1]
+
+    # Every line, the first and last included, lies between two newlines.
+    blank = _BLANK_LINE.search(f"\n{text}\n")
+    if blank is not None:
+        lineno = text.count("\n", 0, blank.start()) + 1
+        raise SafetyError(
+            f"{pathname}: has blank or whitespace-only line at line {lineno}"
+        )
+
+    return text.split("\n")
+
+
+def _check_entry_is_regular_file(entry: os.DirEntry) -> None:
+    """Verify that given directory entry is a regular file based on its type.
+
+    Args:
+        entry: Entry listed by `os.scandir`.
+
+    Raises:
+        SafetyError: If entry is anything other than a regular file.
+
+    Note:
+        The type of the entry is usually known from the directory listing, so
+        no stat call is needed.
+    """
+    try:
+        is_symlink = entry.is_symlink()
+        is_regular = entry.is_file(follow_symlinks=False)
     except OSError as e:
-        raise SafetyError(f"{pathname}: cannot stat: {e}") from e
+        raise SafetyError(f"{entry.path}: cannot stat: {e}") from e
 
-    if stat.S_ISLNK(st.st_mode):
-        raise SafetyError(f"{pathname}: is a symlink")
+    if is_symlink:
+        raise SafetyError(f"{entry.path}: is a symlink")
 
-    if not stat.S_ISREG(st.st_mode):
-        raise SafetyError(f"{pathname}: is not a regular file")
+    if not is_regular:
+        raise SafetyError(f"{entry.path}: is not a regular file")
 
 
 def _check_is_valid_name(pathname: Path, safety: SafetyConfig) -> None:
@@ -88,21 +208,6 @@ def _check_file_contents(pathname: Path) -> None:
         SafetyError: If content safety rules are violated.
 
     Note:
-        File is read in two passes:
-        - must not appear to be binary (no NUL bytes).
-        - must contain no blank or whitespace-only lines.
+        See `read_checked_datafile`, which also returns the lines that it reads.
     """
-    with pathname.open("rb") as f:
-        chunk = f.read(_BINARY_SCAN_BYTES)
-        if b"\x00" in chunk:
-            raise SafetyError(f"{pathname}: appears to be binary")
-
-    try:
-        with pathname.open("rt", encoding="utf-8", errors="strict") as f:
-            for lineno, line in enumerate(f, start=1):
-                if line.strip() == "":
-                    raise SafetyError(
-                        f"{pathname}: has blank or whitespace-only line at line {lineno}"
-                    )
-    except UnicodeDecodeError as e:
-        raise SafetyError(f"{pathname}: is not valid UTF-8: {e}") from e
+    read_checked_datafile(pathname)
@@ -0,0 +1,69 @@
+"""Snapshot of the entries of a directory, listed once with `os.scandir`.
+
+Listing a directory with `Path.iterdir` and then calling `is_file`, `lstat` or
+`exists` on each entry costs one metadata call per entry, which on network
+filesystems dominates wall time. `os.scandir` returns the type of each entry
+with the listing itself (on most filesystems) and caches any stat result once
+fetched, so one snapshot answers every question about a datadir that the
+phases of a pass ask before the datadir is rewritten.
+
+A snapshot is not updated when the directory changes: take a new one after
+writing to the directory.
+"""
+
+import os
+from dataclasses import dataclass
+from operator import attrgetter
+from pathlib import Path
+
+
+@dataclass(frozen=True, slots=True)
+class DirSnapshot:
+    """Entries of a directory as listed at one moment.
+
+    Attributes:
+        dirpath: Path of directory.
+        entries: Entry for each name in directory, in sorted order of name.
+    """
+
+    dirpath: Path
+    entries: dict[str, os.DirEntry]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def visible_entries(self) -> list[os.DirEntry]:
+        """Return entries whose names do not start with ".", in order of name."""
+        return [
+            entry for name, entry in self.entries.items() if not name.startswith(".")
+        ]
+
+    def datafiles(self) -> list[Path]:
+        """Return paths of visible files, in order of name.
+
+        Note:
+            As with `Path.is_file`, a symlink to a file counts as a file (safety
+            checks reject symlinks in datadirs before datafiles are read).
+        """
+        return [
+            self.dirpath / entry.name
+            for entry in self.visible_entries()
+            if entry.is_file()
+        ]
+
+
+def take_dir_snapshot(dirpath: Path) -> DirSnapshot:
+    """List entries of given directory.
+
+    Args:
+        dirpath: Path of directory.
+
+    Returns:
+        DirSnapshot of the directory.
+    """
+    with os.scandir(dirpath) as it:
+        entries = sorted(it, key=attrgetter("name"))
+
+    return DirSnapshot(
+        dirpath=dirpath, entries={entry.name: entry for entry in entries}
+    )
@@ -0,0 +1,283 @@
+"""State of the datadirs of a datatree as left by a successful run.
+
+Most scheduled runs find nothing changed. After a run, the size, modification
+time and digest of every datafile of each datadir, and a digest of the rule
+files of the datadir, are recorded in a hidden file at the config root, along
+with a digest of the config file. The next run compares each datadir with its
+recorded state before processing it: a datadir whose datafiles and rules are
+exactly as the last run left them is already as its rules would leave it, so
+it is skipped, and if every datadir is unchanged the run does nothing at all.
+
+A datafile whose size and modification time are as recorded is taken to be
+unchanged without being read, unless its modification time was so close to the
+time of recording that a later change could have left it the same (filesystem
+timestamps being coarse); such files, and files that were merely touched, are
+compared by digest.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from mklists.exec.durability import sync_dir, sync_file
+from mklists.exec.snapshot import DirSnapshot
+
+STATE_FORMAT_VERSION = 1
+RACY_WINDOW_NS = 2_000_000_000
+
+
+@dataclass(frozen=True, slots=True)
+class FileState:
+    """Size, modification time and digest of a datafile.
+
+    Attributes:
+        size: Size in bytes.
+        mtime_ns: Modification time in nanoseconds.
+        digest: Hex SHA-256 digest of content.
+    """
+
+    size: int
+    mtime_ns: int
+    digest: str
+
+
+@dataclass(frozen=True, slots=True)
+class DatadirState:
+    """State of one datadir as recorded after a run.
+
+    Attributes:
+        rules_digest: Digest of the rule files used for the datadir.
+        recorded_ns: Time (in nanoseconds) just before the datadir was listed.
+        files: State of each datafile, by filename.
+    """
+
+    rules_digest: str
+    recorded_ns: int
+    files: dict[str, FileState]
+
+
+@dataclass(frozen=True, slots=True)
+class RunState:
+    """State of datadirs as recorded after a run.
+
+    Attributes:
+        config_digest: Digest of the config file used for the run.
+        datadirs: State of each datadir, by path.
+    """
+
+    config_digest: str
+    datadirs: dict[Path, DatadirState]
+
+
+def files_digest(paths: list[Path]) -> str:
+    """Return digest of the contents of given files, in order.
+
+    Args:
+        paths: Files (such as rule or config files) to digest.
+
+    Returns:
+        Hex digest that changes if any file (or the state format) changes.
+    """
+    digest = hashlib.sha256(f"mklists state {STATE_FORMAT_VERSION}".encode())
+    for path in paths:
+        data = path.read_bytes()
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def check_datadir_state(
+    dir_snapshot: DirSnapshot,
+    recorded: DatadirState,
+    rules_digest: str,
+) -> DatadirState | None:
+    """Return current state of datadir if it is as recorded, or None.
+
+    Args:
+        dir_snapshot: Snapshot of datadir.
+        recorded: State of datadir recorded after the last run.
+        rules_digest: Digest of the rule files of the datadir.
+
+    Returns:
+        State of datadir (with current modification times, so that it equals
+        the recorded state unless files were touched) if rules are unchanged,
+        the datadir holds the same datafiles, and each datafile has the same
+        content; otherwise None.
+
+    Note:
+        A datadir recorded with no datafiles is never taken to be unchanged,
+        so that processing it reports that it has no data.
+    """
+    if rules_digest != recorded.rules_digest or not recorded.files:
+        return None
+
+    entries = dir_snapshot.visible_entries()
+    if len(entries) != len(recorded.files):
+        return None
+
+    files: dict[str, FileState] = {}
+    for entry in entries:
+        file_state = recorded.files.get(entry.name)
+        if file_state is None or not entry.is_file(follow_symlinks=False):
+            return None
+        st = entry.stat(follow_symlinks=False)
+        if st.st_size != file_state.size:
+            return None
+        if _is_trusted(file_state, st.st_mtime_ns, recorded.recorded_ns):
+            files[entry.name] = file_state
+            continue
+        if _digest_file(Path(entry.path)) != file_state.digest:
+            return None
+        files[entry.name] = FileState(st.st_size, st.st_mtime_ns, file_state.digest)
+
+    return DatadirState(rules_digest, recorded.recorded_ns, files)
+
+
+def record_datadir_state(
+    dir_snapshot: DirSnapshot,
+    rules_digest: str,
+    recorded_ns: int,
+    previous: DatadirState | None = None,
+) -> DatadirState:
+    """Return state of datadir, reading only datafiles changed since previous.
+
+    Args:
+        dir_snapshot: Snapshot of datadir, taken after recorded_ns.
+        rules_digest: Digest of the rule files of the datadir.
+        recorded_ns: Time (in nanoseconds) just before the snapshot was taken.
+        previous: State recorded after an earlier run, whose digests are reused
+            for files with the same size and modification time.
+
+    Returns:
+        State of the datadir's datafiles (visible regular files).
+    """
+    files: dict[str, FileState] = {}
+    for entry in dir_snapshot.visible_entries():
+        if not entry.is_file(follow_symlinks=False):
+            continue
+        st = entry.stat(follow_symlinks=False)
+        file_state = None if previous is None else previous.files.get(entry.name)
+        if (
+            file_state is None
+            or file_state.size != st.st_size
+            or not _is_trusted(file_state, st.st_mtime_ns, previous.recorded_ns)
+        ):
+            file_state = FileState(
+                st.st_size, st.st_mtime_ns, _digest_file(Path(entry.path))
+            )
+        files[entry.name] = file_state
+
+    return DatadirState(rules_digest, recorded_ns, files)
+
+
+def has_racy_files(datadir_state: DatadirState) -> bool:
+    """Return True if some datafile must be read to be known unchanged."""
+    return any(
+        not _is_trusted(file_state, file_state.mtime_ns, datadir_state.recorded_ns)
+        for file_state in datadir_state.files.values()
+    )
+
+
+def load_run_state(path: Path) -> RunState | None:
+    """Load state recorded after a run, or return None.
+
+    Args:
+        path: Pathname of state file.
+
+    Returns:
+        RunState read from path, or None if the file is missing, unreadable or
+        in another format.
+    """
+    try:
+        document = json.loads(path.read_bytes())
+        if document["format"] != STATE_FORMAT_VERSION:
+            return None
+        return RunState(
+            config_digest=document["config"],
+            datadirs={
+                path.parent / name: _datadir_state_from_json(datadir)
+                for name, datadir in document["datadirs"].items()
+            },
+        )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def save_run_state(path: Path, run_state: RunState, fsync: str = "dir") -> None:
+    """Write state recorded after a run to file.
+
+    Args:
+        path: Pathname of state file; datadirs are recorded relative to its
+            directory where possible, so the tree can be moved.
+        run_state: State to write.
+        fsync: Durability policy ("none", "dir" or "file").
+
+    Note:
+        The file is written under a temporary name and then renamed, so an
+        interrupted save leaves the previous state (or none) in place. The
+        file is given the mode of a file created with `open` (as by the umask),
+        rather than the owner-only mode of temporary files.
+    """
+    document = {
+        "format": STATE_FORMAT_VERSION,
+        "config": run_state.config_digest,
+        "datadirs": {
+            _relative_name(datadir, path.parent): {
+                "rules": datadir_state.rules_digest,
+                "recorded_ns": datadir_state.recorded_ns,
+                "files": {
+                    filename: [file_state.size, file_state.mtime_ns, file_state.digest]
+                    for filename, file_state in datadir_state.files.items()
+                },
+            }
+            for datadir, datadir_state in run_state.datadirs.items()
+        },
+    }
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f"{path.name}-", delete=False
+    ) as f:
+        json.dump(document, f, indent=1, sort_keys=True)
+        f.write("\n")
+        os.chmod(f.fileno(), _umask_mode())
+        sync_file(f, fsync)
+    os.replace(f.name, path)
+    sync_dir(path.parent, fsync)
+
+
+def _umask_mode() -> int:
+    """Return mode given by the umask to a new file opened for writing."""
+    # The umask can only be read by setting it; runs save state only after
+    # all datadirs are processed, when no other thread is creating files.
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _datadir_state_from_json(datadir: dict) -> DatadirState:
+    return DatadirState(
+        rules_digest=datadir["rules"],
+        recorded_ns=datadir["recorded_ns"],
+        files={
+            filename: FileState(size, mtime_ns, digest)
+            for filename, (size, mtime_ns, digest) in datadir["files"].items()
+        },
+    )
+
+
+def _is_trusted(file_state: FileState, mtime_ns: int, recorded_ns: int) -> bool:
+    """Return True if a file with given mtime can be taken to be as recorded."""
+    return mtime_ns == file_state.mtime_ns and mtime_ns + RACY_WINDOW_NS < recorded_ns
+
+
+def _digest_file(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _relative_name(datadir: Path, rootdir: Path) -> str:
+    if datadir.is_relative_to(rootdir):
+        return datadir.relative_to(rootdir).as_posix()
+    return str(datadir)
@@ -8,7 +8,8 @@ from mklists.errors import InitError
 EXAMPLE_RULES = """\
 # Rule format: matchfield|pattern|source|target|sortkey
 #   matchfield: 0 = whole line, 1+ = whitespace-delimited field
-#   pattern:    regular expression
+#               (append "=", as in 1=, to test for equality with pattern as text)
+#   pattern:    regular expression (or, with "=", exact text)
 #   source:     file lines are read from
 #   target:     file lines are moved to
 #   sortkey:    field to sort target by (blank = no sort)
@@ -16,6 +17,9 @@ EXAMPLE_RULES = """\
 # Example: move any line containing "TODO" from notes.txt to todo.txt
 # 0|TODO|notes.txt|todo.txt|
 #
+# Example: move lines whose first field is exactly "@phone" to phone.txt
+# 1=|@phone|notes.txt|phone.txt|
+#
 # Example: identity rule — keep all lines in place
 # 0|.|input.txt|output.txt|
 """
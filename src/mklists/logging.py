@@ -2,11 +2,63 @@
 
 import logging
 import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
 logger = logging.getLogger("mklists")
 
 
+class _HeldRecords(logging.Filter):
+    """Hold back records logged by threads that are holding their logs."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._local = threading.local()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        records = getattr(self._local, "records", None)
+        if records is None:
+            return True
+        records.append(record)
+        return False
+
+    @contextmanager
+    def hold(self) -> Iterator[list[logging.LogRecord]]:
+        self._local.records = records = []
+        try:
+            yield records
+        finally:
+            del self._local.records
+
+
+_held_records = _HeldRecords()
+logger.addFilter(_held_records)
+
+
+@contextmanager
+def hold_logs() -> Iterator[list[logging.LogRecord]]:
+    """Hold back records logged by the current thread, to be replayed later.
+
+    Yields:
+        List to which records logged (by this thread, to the mklists logger)
+        are appended instead of being handled; see `replay_logs`.
+
+    Note:
+        Work done concurrently holds its logs, so that they can be replayed in
+        a fixed order rather than interleaved as they happen.
+    """
+    with _held_records.hold() as records:
+        yield records
+
+
+def replay_logs(records: list[logging.LogRecord]) -> None:
+    """Handle records held back by `hold_logs`, in order."""
+    for record in records:
+        logger.handle(record)
+
+
 def init_logger(
     *,
     logfile: Path | None,
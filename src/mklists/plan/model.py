@@ -1,18 +1,24 @@
 """Resolved features for executing a Mklists run."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from mklists.config.model import SafetyConfig
+from mklists.config.model import PerformanceConfig, SafetyConfig
 from mklists.rules.model import Rule
 
 
 @dataclass(frozen=True, slots=True)
 class DatadirPlan:
-    """Execution plan for one datadir."""
+    """Execution plan for one datadir.
+
+    `list_last_uses` maps each list (filename) named in `rules` to the index
+    of the last rule that reads or writes it, after which the list is final and
+    can be written out.
+    """
 
     datadir: Path
     rules: list[Rule]
     rulefiles_used: list[Path]
+    list_last_uses: dict[str, int] = field(default_factory=dict)
 
 
 @dataclass(frozen=True, slots=True)
@@ -39,6 +45,18 @@ class BackupPlan:
     backup_depth: int
 
 
+@dataclass(frozen=True, slots=True)
+class StatePlan:
+    """Where the state of datadirs after a run is recorded, and what it covers.
+
+    `configfiles` are the config files whose contents, if changed, mean that
+    no datadir can be taken to be unchanged since the last run.
+    """
+
+    state_file: Path
+    configfiles: list[Path]
+
+
 @dataclass(frozen=True, slots=True)
 class RunPlan:
     """Execution plan for one Mklists run."""
@@ -52,3 +70,5 @@ class RunPlan:
     is_datatree_root: bool
     safety: SafetyConfig
     backup: BackupPlan | None
+    performance: PerformanceConfig = field(default_factory=PerformanceConfig)
+    state: StatePlan | None = None
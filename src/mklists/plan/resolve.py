@@ -9,9 +9,11 @@ from mklists.plan.model import (
     PassPlan,
     RunPlan,
     SkippedDatadir,
+    StatePlan,
 )
+from mklists.rules import Rule
 from mklists.rules.load import load_rules_for_datadir
-from mklists.structure.markers import DATATREE_RULEFILE_NAME
+from mklists.structure.markers import DATATREE_RULEFILE_NAME, STATE_FILE_NAME
 from mklists.structure.model import StructuralContext
 
 
@@ -57,6 +59,14 @@ def resolve_run_plan(
     else:
         backup = None
 
+    if config.performance.skip_unchanged:
+        state = StatePlan(
+            state_file=config.config_rootdir / STATE_FILE_NAME,
+            configfiles=[f for f in [config.configfile_used] if f is not None],
+        )
+    else:
+        state = None
+
     return RunPlan(
         pass_plans=pass_plans,
         datadir_plans=datadir_plans,
@@ -67,6 +77,8 @@ def resolve_run_plan(
         is_datatree_root=structural_context.startdir_context.is_datatree_root,
         safety=config.safety,
         backup=backup,
+        performance=config.performance,
+        state=state,
     )
 
 
@@ -119,12 +131,35 @@ def _resolve_datadir_plans(
                     datadir=datadir_ctx.datadir,
                     rules=rules,
                     rulefiles_used=rulefiles_used,
+                    list_last_uses=_resolve_list_last_uses(rules),
                 )
             )
 
     return datadir_plans, skipped_datadirs
 
 
+def _resolve_list_last_uses(rules: list[Rule]) -> dict[str, int]:
+    """Map each list named in rule chain to index of last rule that uses it.
+
+    Args:
+        rules: List of Rule objects, in order of application.
+
+    Returns:
+        Dictionary mapping each source or target filename to the index of the
+        last rule that reads lines from it or writes lines to it.
+
+    Note:
+        After that rule has been applied, the contents of the list are final, so
+        the list can be written to disk and its lines released.
+    """
+    last_uses: dict[str, int] = {}
+    for rule_index, rule in enumerate(rules):
+        last_uses[rule.source] = rule_index
+        last_uses[rule.target] = rule_index
+
+    return last_uses
+
+
 def _resolve_pass_plans(
     *,
     structural_context: StructuralContext,
@@ -1,4 +1,12 @@
 """Convenience exports for structural types, resolvers, and marker names."""
 
-from mklists.rules.model import Rule
-from mklists.rules.load import load_rules_for_datadir
+from mklists.rules.load import group_rule_runs, load_rules_for_datadir
+from mklists.rules.model import ExactRule, Rule, RuleRun
+
+__all__ = [
+    "ExactRule",
+    "Rule",
+    "RuleRun",
+    "group_rule_runs",
+    "load_rules_for_datadir",
+]
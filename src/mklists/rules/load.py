@@ -4,10 +4,12 @@ import re
 from pathlib import Path
 from typing import Iterable, Pattern
 from mklists.errors import RuleError, FilenameError
-from mklists.rules.model import Rule
+from mklists.rules.model import ExactRule, Rule, RuleRun
 
+EXACT_SUFFIX = "="
 FIELD_COUNT = 5
 PIPE = "|"
+RUN_GROUP_PREFIX = "r"
 
 
 def load_rules_for_datadir(rulefiles: list[Path]) -> list[Rule]:
@@ -41,6 +43,107 @@ def load_rules_for_datadir(rulefiles: list[Path]) -> list[Rule]:
     return [rule for _, rule in all_rules_with_source]
 
 
+def group_rule_runs(rules: list[Rule]) -> list[RuleRun]:
+    """Group rule chain into runs of rules that can classify a line in one scan.
+
+    Args:
+        rules: Validated rule chain.
+
+    Returns:
+        List of RuleRun objects, covering every rule exactly once, in order of
+        first rule.
+
+    Note:
+        A run ends when the next rule on its source list tests a different match
+        field, when a rule adds lines to its source list, when rules switch
+        between testing for equality and testing a pattern, or at a rule whose
+        pattern cannot be combined with others (see `_combine_patterns`). Runs
+        of two or more rules carry an index (equality rules) or a combined
+        classifier pattern (all other rules).
+    """
+    runs: list[list[int]] = []
+    open_runs: dict[str, list[int]] = {}
+
+    def is_equality(rule: Rule) -> bool:
+        return rule.source_matcher.kind == "equal"
+
+    for rule_index, rule in enumerate(rules):
+        open_runs.pop(rule.target, None)
+        current = open_runs.get(rule.source)
+        if (
+            current is not None
+            and rules[current[0]].source_matchfield == rule.source_matchfield
+            and is_equality(rules[current[0]]) == is_equality(rule)
+            and _is_combinable(rule.source_matchpattern)
+        ):
+            current.append(rule_index)
+            continue
+
+        current = [rule_index]
+        runs.append(current)
+        if _is_combinable(rule.source_matchpattern):
+            open_runs[rule.source] = current
+        else:
+            open_runs.pop(rule.source, None)
+
+    rule_runs: list[RuleRun] = []
+    for run in runs:
+        first_rule = rules[run[0]]
+        classifier = None
+        index = None
+        if len(run) > 1 and is_equality(first_rule):
+            index = {}
+            for position, rule_index in enumerate(run):
+                value = rules[rule_index].source_matcher.literal
+                index.setdefault(value, position)
+        elif len(run) > 1:
+            classifier = _combine_patterns([rules[i].source_matchpattern for i in run])
+
+        rule_runs.append(
+            RuleRun(
+                source=first_rule.source,
+                source_matchfield=first_rule.source_matchfield,
+                rule_indexes=tuple(run),
+                classifier=classifier,
+                index=index,
+            )
+        )
+
+    return rule_runs
+
+
+def _combine_patterns(patterns: list[Pattern[str]]) -> Pattern[str]:
+    """Combine patterns into one that reports the first pattern found in a text.
+
+    Args:
+        patterns: Patterns for which `_is_combinable` is True.
+
+    Returns:
+        Pattern to be applied with `match()`. On success, `lastgroup` is
+        `RUN_GROUP_PREFIX` followed by the index of the first pattern in the list
+        for which `search()` would succeed.
+
+    Note:
+        Each alternative is a lookahead that searches the whole text, so the
+        alternatives are tried in list order rather than by leftmost match.
+    """
+    alternatives = [
+        rf"(?=[\s\S]*?(?:{pattern.pattern}))(?P<{RUN_GROUP_PREFIX}{index}>)"
+        for index, pattern in enumerate(patterns)
+    ]
+    return re.compile("|".join(alternatives))
+
+
+def _is_combinable(pattern: Pattern[str]) -> bool:
+    """Return True if pattern can be embedded in a combined pattern.
+
+    Note:
+        Patterns with groups (whose numbering would shift) or with global
+        inline flags (which must come first in a pattern) are not combinable.
+    """
+    return pattern.groups == 0 and pattern.flags == re.UNICODE
+
+
 def _compile_pattern(text: str) -> Pattern[str]:
     """Successfully compile regex pattern.
 
@@ -53,6 +156,10 @@ def _compile_pattern(text: str) -> Pattern[str]:
     Raises:
         RuleError: Regular expression text does not correctly compile.
 
+    Note:
+        Rules built from the compiled pattern derive a Matcher from it (see
+        `compile_matcher`), which tests literal, prefix and suffix patterns
+        with string methods instead of the regex.
     """
     try:
         return re.compile(text)
@@ -69,11 +176,25 @@ def _iter_rulelines(rulefile: Path) -> Iterable[str]:
     Yields:
         Non-blank, non-comment lines, with whitespace stripped, from rule file.
     """
-    for raw in rulefile.read_text().splitlines():
+    for _, line in _iter_numbered_rulelines(rulefile):
+        yield line
+
+
+def _iter_numbered_rulelines(rulefile: Path) -> Iterable[tuple[int, str]]:
+    """Yield non-blank, non-comment lines in rule file, with their line numbers.
+
+    Args:
+        rulefile: Pathname of rule file.
+
+    Yields:
+        Tuples of one-based line number and line, with leading whitespace
+        stripped, for each non-blank, non-comment line in rule file.
+    """
+    for lineno, raw in enumerate(rulefile.read_text().splitlines(), start=1):
         line = raw.lstrip()
         if not line or line.startswith("#"):
             continue
-        yield line
+        yield lineno, line
 
 
 def _load_rules_from_rulefile(rulefile: Path) -> list[Rule]:
@@ -83,26 +204,33 @@ def _load_rules_from_rulefile(rulefile: Path) -> list[Rule]:
         rulefile: Path object for rule file.
 
     Returns:
-        List of Rule objects.
+        List of Rule objects, each recording rule file and line number.
 
     Note:
         Validation of rule lists is handled by another function.
     """
     rules: list[Rule] = []
 
-    for line in _iter_rulelines(rulefile):
+    for lineno, line in _iter_numbered_rulelines(rulefile):
         ruleline_fields = _split_ruleline_into_fields(line)
-        rule = _parse_rule(ruleline_fields)
+        rule = _parse_rule(ruleline_fields, rulefile=rulefile, lineno=lineno)
         rules.append(rule)
 
     return rules
 
 
-def _parse_rule(ruleline_fields: list[str]) -> Rule:
+def _parse_rule(
+    ruleline_fields: list[str],
+    *,
+    rulefile: Path | None = None,
+    lineno: int | None = None,
+) -> Rule:
     """Convert list of raw rule line fields into validated Rule object.
 
     Args:
         ruleline_fields: List of fields extracted from one raw rule line.
+        rulefile: Rule file from which rule line was read, if any.
+        lineno: Line number of rule line in rule file, if any.
 
     Returns:
         Rule object initialized with normalized rule line components.
@@ -115,10 +243,13 @@ def _parse_rule(ruleline_fields: list[str]) -> Rule:
 
         1. Source match field:
            Integer specifying which field of input line is tested against
-           regex in field 2.
+           regex in field 2. With `=` appended (e.g. `1=`), the field is instead
+           tested for equality with field 2 as plain text, and an ExactRule
+           is returned.
 
         2. Match pattern:
-           Regular expression applied to text in source match field.
+           Regular expression applied to text in source match field (or, for
+           an exact rule, the text that the match field must equal).
 
         3. Source list:
            Name of list from which matching lines are removed.
@@ -137,6 +268,15 @@ def _parse_rule(ruleline_fields: list[str]) -> Rule:
     ):
         raise RuleError("Required rule fields must not be empty.")
 
+    raw_matchfield = raw_matchfield.strip()
+    is_exact = raw_matchfield.endswith(EXACT_SUFFIX)
+    if is_exact:
+        raw_matchfield = raw_matchfield.removesuffix(EXACT_SUFFIX)
+        raw_pattern = raw_pattern.strip()
+        raw_pattern_regex = rf"\A{re.escape(raw_pattern)}\Z"
+    else:
+        raw_pattern_regex = raw_pattern
+
     try:
         source_matchfield = int(raw_matchfield)
     except ValueError as e:
@@ -156,7 +296,7 @@ def _parse_rule(ruleline_fields: list[str]) -> Rule:
         if target_sortkey < 0:
             raise RuleError("Target sort field must be a positive integer.")
 
-    source_matchpattern = _compile_pattern(raw_pattern)
+    source_matchpattern = _compile_pattern(raw_pattern_regex)
     source = raw_source.strip()
     target = raw_target.strip()
 
@@ -167,12 +307,26 @@ def _parse_rule(ruleline_fields: list[str]) -> Rule:
     _validate_filename(source)
     _validate_filename(target)
 
+    if is_exact:
+        return ExactRule(
+            source_matchfield=source_matchfield,
+            source_matchpattern=source_matchpattern,
+            source=source,
+            target=target,
+            target_sortkey=target_sortkey,
+            source_matchvalue=raw_pattern,
+            rulefile=rulefile,
+            lineno=lineno,
+        )
+
     return Rule(
         source_matchfield=source_matchfield,
         source_matchpattern=source_matchpattern,
         source=source,
         target=target,
         target_sortkey=target_sortkey,
+        rulefile=rulefile,
+        lineno=lineno,
     )
 
 
@@ -0,0 +1,116 @@
+"""Fast matchers for rule patterns that are plain literals."""
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Pattern
+
+MATCHER_KINDS = ("literal", "prefix", "suffix", "exact", "equal", "regex")
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]|()")
+
+
+@dataclass(frozen=True, slots=True)
+class Matcher:
+    """Test for whether a text matches a rule pattern, as `pattern.search` would.
+
+    Attributes:
+        kind: One of MATCHER_KINDS.
+        literal: Text tested for (None if kind is "regex").
+        pattern: Compiled regex from which the matcher was derived.
+        test: Function returning a truthy value if given text matches.
+    """
+
+    kind: str
+    literal: str | None
+    pattern: Pattern[str]
+    test: Callable[[str], object] = field(repr=False, compare=False)
+
+    def __reduce__(self) -> tuple[object, ...]:
+        # The test function may be a closure, so pickle as the pattern it came from.
+        return (compile_matcher, (self.pattern,))
+
+
+def compile_matcher(pattern: Pattern[str]) -> Matcher:
+    """Derive fastest equivalent matcher from compiled regex.
+
+    Args:
+        pattern: Compiled regular expression.
+
+    Returns:
+        Matcher that uses `in`, `str.startswith`, `str.endswith` or `==` for
+        literal, `^literal`, `literal$`, `^literal$` and `\\Aliteral\\Z` patterns,
+        and otherwise the `search` method of the compiled regex.
+
+    Note:
+        As in Python regexes (without MULTILINE), `$` also matches just before a
+        newline at the end of a text; `\\Z` does not.
+    """
+    text = pattern.pattern
+    if (
+        text.startswith(r"\A")
+        and text.endswith(r"\Z")
+        and not _is_escaped(text, len(text) - 2)
+    ):
+        literal = _unescape_literal(text[2:-2]) if pattern.flags == re.UNICODE else None
+        if literal is not None:
+            return Matcher(
+                kind="equal", literal=literal, pattern=pattern, test=literal.__eq__
+            )
+
+    anchored_start = text.startswith("^")
+    body = text[1:] if anchored_start else text
+    anchored_end = body.endswith("$") and not _is_escaped(body, len(body) - 1)
+    if anchored_end:
+        body = body[:-1]
+
+    literal = _unescape_literal(body) if pattern.flags == re.UNICODE else None
+    if literal is None:
+        kind, test = "regex", pattern.search
+    elif anchored_start and anchored_end:
+        kind, test = "exact", (literal, f"{literal}\n").__contains__
+    elif anchored_start:
+        kind, test = "prefix", lambda s: s.startswith(literal)
+    elif anchored_end:
+        suffixes = (literal, f"{literal}\n")
+        kind, test = "suffix", lambda s: s.endswith(suffixes)
+    else:
+        kind, test = "literal", lambda s: literal in s
+
+    return Matcher(kind=kind, literal=literal, pattern=pattern, test=test)
+
+
+def _is_escaped(text: str, index: int) -> bool:
+    """Return True if character at index is preceded by an odd number of backslashes."""
+    backslashes = len(text[:index]) - len(text[:index].rstrip("\\"))
+    return backslashes % 2 == 1
+
+
+def _unescape_literal(text: str) -> str | None:
+    """Return text matched literally by regex text, or None if not a literal.
+
+    Note:
+        Backslash followed by ASCII punctuation (as written by `re.escape`)
+        stands for that character; any other escape, such as `\\d`, makes the
+        regex a non-literal.
+    """
+    chars: list[str] = []
+    escaped = False
+
+    for char in text:
+        if escaped:
+            if char.isascii() and not char.isalnum() and char.isprintable():
+                chars.append(char)
+                escaped = False
+                continue
+            return None
+        if char == "\\":
+            escaped = True
+        elif char in REGEX_METACHARACTERS:
+            return None
+        else:
+            chars.append(char)
+
+    if escaped:
+        return None
+
+    return "".join(chars)
@@ -1,15 +1,61 @@
 """Load and validate transformation rules for a given data directory."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
 from typing import Pattern
 
+from mklists.rules.matcher import Matcher, compile_matcher
+
 
 @dataclass(frozen=True)
 class Rule:
-    """Immutable data structure for one validated rule."""
+    """Immutable data structure for one validated rule.
+
+    The source matcher is derived from the match pattern; for literal patterns it
+    avoids the regex engine. The rule file and line number from which a rule was
+    loaded, if any, are kept for reporting but play no part in comparisons.
+    """
 
     source_matchfield: int
     source_matchpattern: Pattern[str]
     source: str
     target: str
     target_sortkey: int | None
+    rulefile: Path | None = field(default=None, compare=False, kw_only=True)
+    lineno: int | None = field(default=None, compare=False, kw_only=True)
+
+    @cached_property
+    def source_matcher(self) -> Matcher:
+        """Matcher equivalent to searching with the source match pattern."""
+        return compile_matcher(self.source_matchpattern)
+
+
+@dataclass(frozen=True)
+class ExactRule(Rule):
+    """Rule that tests whether the match field equals a string.
+
+    The match pattern is the equivalent anchored regex, so an ExactRule can be
+    applied wherever a Rule can; dispatchers may instead look up the match field
+    in a hash index built from consecutive exact rules.
+    """
+
+    source_matchvalue: str
+
+
+@dataclass(frozen=True, slots=True)
+class RuleRun:
+    """Consecutive rules that read one source list and test the same match field.
+
+    No rule between the first and last rule of a run adds lines to the source
+    list, so every line tested by the run is tested by its rules in order, and
+    the first rule that matches wins. A run of two or more rules is tested either
+    with a combined classifier pattern or, if all of its rules test for equality,
+    with an index mapping each tested value to the position of its first rule.
+    """
+
+    source: str
+    source_matchfield: int
+    rule_indexes: tuple[int, ...]
+    classifier: Pattern[str] | None
+    index: dict[str, int] | None = None
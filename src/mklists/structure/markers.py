@@ -9,9 +9,13 @@ root or Datadir:
 A Datadir is marked as self-contained if `.mklistsrc` is present. A self-contained
 Datadir is processed without reference to datatree-level rules or configuration, even
 if a Datatree root exists.
+
+The hidden state file `.mklists-state`, kept next to the config file in use, marks
+nothing: it records the state of datadirs as left by the last run.
 """
 
 DATADIR_CONFIGFILE_NAME = ".mklistsrc"
 DATADIR_RULEFILE_NAME = ".rules"
 DATATREE_CONFIGFILE_NAME = "mklists.yaml"
 DATATREE_RULEFILE_NAME = "mklists.rules"
+STATE_FILE_NAME = ".mklists-state"
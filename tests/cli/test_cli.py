@@ -1,5 +1,6 @@
 """Tests for CLI entry point."""
 
+import json
 from click.testing import CliRunner
 from mklists.cli import cli
 from mklists.init.datadir import EXAMPLE_RULES
@@ -168,3 +169,91 @@ def test_run_exits_with_error_on_invalid_dir(tmp_path):
     """mklists run exits with code 1 when given a directory with no mklists markers."""
     result = CliRunner().invoke(cli, ["run", "-C", str(tmp_path)])
     assert result.exit_code == 1
+
+
+def test_run_dump_router_prints_generated_source_without_running(tmp_path):
+    """mklists run --dump-router prints routing source and leaves data alone."""
+    (tmp_path / ".rules").write_text("0|^h|input.txt|output.txt|\n")
+    (tmp_path / "input.txt").write_text("hello\n")
+
+    result = CliRunner().invoke(cli, ["run", "-C", str(tmp_path), "--dump-router"])
+    assert result.exit_code == 0
+    assert "def route(lines):" in result.output
+    assert "line.startswith('h')" in result.output
+    assert not (tmp_path / "output.txt").exists()
+
+
+def test_run_rule_stats_prints_costliest_rules(tmp_path):
+    """mklists run --rule-stats prints a table of rules of each datadir."""
+    (tmp_path / ".rules").write_text("0|^h|input.txt|output.txt|\n0|x|input.txt|x.txt|\n")
+    (tmp_path / "input.txt").write_text("hello\nbye\n")
+
+    result = CliRunner().invoke(
+        cli, ["run", "-C", str(tmp_path), "--rule-stats", "--rule-stats-top", "1"]
+    )
+    assert result.exit_code == 0
+    assert f"Rule stats for {tmp_path} (pass 1): 2 rules" in result.output
+    assert result.output.count(f"{tmp_path / '.rules'}:") == 1
+    assert (tmp_path / "output.txt").read_text() == "hello\n"
+
+
+def test_run_rule_stats_json_writes_counters(tmp_path):
+    """mklists run --rule-stats-json writes counters of all rules as JSON."""
+    (tmp_path / ".rules").write_text("0|^h|input.txt|output.txt|\n")
+    (tmp_path / "input.txt").write_text("hello\nbye\n")
+    json_path = tmp_path.parent / f"{tmp_path.name}-stats.json"
+
+    result = CliRunner().invoke(
+        cli, ["run", "-C", str(tmp_path), "--rule-stats-json", str(json_path)]
+    )
+    assert result.exit_code == 0
+    document = json.loads(json_path.read_text())
+    [rule] = document["datadirs"][0]["rules"]
+    assert (rule["lineno"], rule["lines_examined"], rule["lines_matched"]) == (1, 2, 1)
+
+
+def test_run_jobs_processes_datadirs_concurrently(tmp_path):
+    """mklists run --jobs processes the datadirs of a datatree, logging in order."""
+    (tmp_path / "mklists.yaml").write_text("verbose: true\n")
+    (tmp_path / "mklists.rules").write_text("")
+    for name in ["a", "b", "c"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / ".rules").write_text("0|^h|input.txt|output.txt|\n")
+        (tmp_path / name / "input.txt").write_text(f"hello {name}\nbye\n")
+
+    result = CliRunner().invoke(cli, ["run", "-C", str(tmp_path), "--jobs", "3"])
+    assert result.exit_code == 0, result.output
+    for name in ["a", "b", "c"]:
+        assert (tmp_path / name / "output.txt").read_text() == f"hello {name}\n"
+    logged = [str(tmp_path / name) for name in ["a", "b", "c"]]
+    assert [line for line in result.output.splitlines() if line in logged] == logged
+
+
+def test_run_jobs_must_be_positive(tmp_path):
+    """mklists run --jobs 0 is a usage error."""
+    result = CliRunner().invoke(cli, ["run", "-C", str(tmp_path), "--jobs", "0"])
+    assert result.exit_code == 2
+
+
+def test_explain_prints_path_of_matching_lines(tmp_path):
+    """mklists explain prints rules passed by each matching line, changing nothing."""
+    (tmp_path / ".rules").write_text("0|^h|input.txt|output.txt|\n1|i|output.txt|i.txt|\n")
+    (tmp_path / "input.txt").write_text("hello\nhi\nbye\n")
+
+    result = CliRunner().invoke(cli, ["explain", "-C", str(tmp_path), "hi"])
+    assert result.exit_code == 0
+    assert f"rule 0 ({tmp_path / '.rules'}:1): input.txt -> output.txt" in result.output
+    assert f"rule 1 ({tmp_path / '.rules'}:2): output.txt -> i.txt" in result.output
+    assert "ends in i.txt" in result.output
+    assert "hello" not in result.output
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".rules", "input.txt"]
+
+
+def test_explain_reports_no_matching_line(tmp_path):
+    """mklists explain says so if no line contains the text."""
+    (tmp_path / ".rules").write_text("0|^h|input.txt|output.txt|\n")
+    (tmp_path / "input.txt").write_text("hello\n")
+
+    result = CliRunner().invoke(cli, ["explain", "-C", str(tmp_path), "zzz"])
+    assert result.exit_code == 0
+    assert "No line contains 'zzz'" in result.output
@@ -0,0 +1,167 @@
+"""Tests for _make_performance_config in $MKLMKL/config/resolve.py"""
+
+import pytest
+from mklists.config.resolve import _make_performance_config
+
+
+def _config_dict(
+    sort_memory_limit_mb=None,
+    route_cache_entries=None,
+    skip_unchanged=False,
+    fsync="dir",
+    write_buffer_kb=64,
+    mmap_threshold_mb=None,
+    jobs=1,
+    dispatch_workers=1,
+    min_chunk_lines=50000,
+):
+    return {
+        "performance": {
+            "sort_memory_limit_mb": sort_memory_limit_mb,
+            "route_cache_entries": route_cache_entries,
+            "skip_unchanged": skip_unchanged,
+            "fsync": fsync,
+            "write_buffer_kb": write_buffer_kb,
+            "mmap_threshold_mb": mmap_threshold_mb,
+            "jobs": jobs,
+            "dispatch_workers": dispatch_workers,
+            "min_chunk_lines": min_chunk_lines,
+        }
+    }
+
+
+def test_make_performance_config_null_means_no_limit():
+    """Null sort_memory_limit_mb means lists are always sorted in memory."""
+    cfg = _make_performance_config(config_dict=_config_dict())
+
+    assert cfg.sort_memory_limit is None
+
+
+@pytest.mark.parametrize(
+    "megabytes, characters",
+    [(1, 2**20), (256, 256 * 2**20), (0.5, 2**19)],
+)
+def test_make_performance_config_converts_megabytes(megabytes, characters):
+    """sort_memory_limit_mb is converted to a limit in characters."""
+    cfg = _make_performance_config(config_dict=_config_dict(megabytes))
+
+    assert cfg.sort_memory_limit == characters
+
+
+@pytest.mark.parametrize("value", [0, -1, True, "64", [64]])
+def test_make_performance_config_invalid_limit_raises(value):
+    """Non-positive or non-numeric sort_memory_limit_mb raises ValueError."""
+    with pytest.raises(ValueError, match="sort_memory_limit_mb"):
+        _make_performance_config(config_dict=_config_dict(value))
+
+
+def test_make_performance_config_route_cache_entries():
+    """route_cache_entries is kept as given; null disables the route cache."""
+    assert (
+        _make_performance_config(config_dict=_config_dict()).route_cache_entries is None
+    )
+
+    cfg = _make_performance_config(config_dict=_config_dict(route_cache_entries=1000))
+
+    assert cfg.route_cache_entries == 1000
+
+
+@pytest.mark.parametrize("value", [0, -5, 1.5, True, "100"])
+def test_make_performance_config_invalid_route_cache_entries_raises(value):
+    """Non-positive or non-integer route_cache_entries raises ValueError."""
+    with pytest.raises(ValueError, match="route_cache_entries"):
+        _make_performance_config(config_dict=_config_dict(route_cache_entries=value))
+
+
+def test_make_performance_config_skip_unchanged():
+    """skip_unchanged is off by default and kept as given."""
+    assert not _make_performance_config(config_dict=_config_dict()).skip_unchanged
+
+    cfg = _make_performance_config(config_dict=_config_dict(skip_unchanged=True))
+
+    assert cfg.skip_unchanged
+
+
+@pytest.mark.parametrize("value", [None, 1, "yes"])
+def test_make_performance_config_invalid_skip_unchanged_raises(value):
+    """Non-boolean skip_unchanged raises ValueError."""
+    with pytest.raises(ValueError, match="skip_unchanged"):
+        _make_performance_config(config_dict=_config_dict(skip_unchanged=value))
+
+
+@pytest.mark.parametrize("value", ["none", "dir", "file"])
+def test_make_performance_config_fsync(value):
+    """fsync is kept as given."""
+    assert _make_performance_config(config_dict=_config_dict(fsync=value)).fsync == (
+        value
+    )
+
+
+@pytest.mark.parametrize("value", ["always", None, True, ""])
+def test_make_performance_config_invalid_fsync_raises(value):
+    """fsync other than none, dir or file raises ValueError."""
+    with pytest.raises(ValueError, match="fsync"):
+        _make_performance_config(config_dict=_config_dict(fsync=value))
+
+
+def test_make_performance_config_write_buffer_kb():
+    """write_buffer_kb is converted to a buffer size in characters."""
+    cfg = _make_performance_config(config_dict=_config_dict(write_buffer_kb=256))
+
+    assert cfg.write_buffer_size == 256 * 1024
+
+
+@pytest.mark.parametrize("value", [0, -1, True, 1.5, "64", None])
+def test_make_performance_config_invalid_write_buffer_kb_raises(value):
+    """Non-positive or non-integer write_buffer_kb raises ValueError."""
+    with pytest.raises(ValueError, match="write_buffer_kb"):
+        _make_performance_config(config_dict=_config_dict(write_buffer_kb=value))
+
+
+@pytest.mark.parametrize(
+    "megabytes, threshold", [(None, None), (16, 16 * 2**20), (0.5, 2**19)]
+)
+def test_make_performance_config_mmap_threshold_mb(megabytes, threshold):
+    """mmap_threshold_mb is converted to bytes; null means files are always read."""
+    cfg = _make_performance_config(
+        config_dict=_config_dict(mmap_threshold_mb=megabytes)
+    )
+
+    assert cfg.mmap_threshold == threshold
+
+
+@pytest.mark.parametrize("value", [0, -1, True, "16"])
+def test_make_performance_config_invalid_mmap_threshold_mb_raises(value):
+    """Non-positive or non-numeric mmap_threshold_mb raises ValueError."""
+    with pytest.raises(ValueError, match="mmap_threshold_mb"):
+        _make_performance_config(config_dict=_config_dict(mmap_threshold_mb=value))
+
+
+def test_make_performance_config_jobs():
+    """jobs is kept as given."""
+    assert _make_performance_config(config_dict=_config_dict(jobs=4)).jobs == 4
+
+
+@pytest.mark.parametrize("value", [0, -1, True, 1.5, "4", None])
+def test_make_performance_config_invalid_jobs_raises(value):
+    """Non-positive or non-integer jobs raises ValueError."""
+    with pytest.raises(ValueError, match="jobs"):
+        _make_performance_config(config_dict=_config_dict(jobs=value))
+
+
+def test_make_performance_config_dispatch_workers_and_min_chunk_lines():
+    """dispatch_workers and min_chunk_lines are kept as given."""
+    cfg = _make_performance_config(
+        config_dict=_config_dict(dispatch_workers=4, min_chunk_lines=1000)
+    )
+
+    assert cfg.dispatch_workers == 4
+    assert cfg.min_chunk_lines == 1000
+
+
+@pytest.mark.parametrize("key", ["dispatch_workers", "min_chunk_lines"])
+@pytest.mark.parametrize("value", [0, -1, True, 1.5, "4", None])
+def test_make_performance_config_invalid_dispatch_pool_settings_raise(key, value):
+    """Non-positive or non-integer dispatch_workers or min_chunk_lines raises."""
+    with pytest.raises(ValueError, match=key):
+        _make_performance_config(config_dict=_config_dict(**{key: value}))
@@ -2,6 +2,7 @@
 
 import pytest
 from mklists.exec.backups import backup_datadirs, init_snapshot_dir
+from mklists.exec.snapshot import take_dir_snapshot
 
 
 def test_write_backup_copies_all_datadirs(tmp_path):
@@ -75,3 +76,28 @@ def test_integration_with_init_snapshot_dir(tmp_path):
 
     assert (snapshot_dir / "a" / "a.txt").read_text() == "A"
     assert (snapshot_dir / "b" / "b.txt").read_text() == "B"
+
+
+def test_write_backup_copies_entries_listed_in_dir_snapshot(tmp_path):
+    """Hidden files and subdirectories listed in a snapshot are copied."""
+    snapshot_dir = tmp_path / "backups" / "pass01"
+    snapshot_dir.mkdir(parents=True)
+    datadir = tmp_path / "datatree" / "a"
+    (datadir / ".sub").mkdir(parents=True)
+    (datadir / ".rules").write_text("R")
+    (datadir / ".sub" / "x.txt").write_text("X")
+    (datadir / "a.txt").write_text("A")
+    dir_snapshots = {datadir: take_dir_snapshot(datadir)}
+
+    backup_datadirs(
+        datadirs=[datadir],
+        snapshot_dir=snapshot_dir,
+        dir_snapshots=dir_snapshots,
+    )
+
+    assert sorted(p.name for p in (snapshot_dir / "a").iterdir()) == [
+        ".rules",
+        ".sub",
+        "a.txt",
+    ]
+    assert (snapshot_dir / "a" / ".sub" / "x.txt").read_text() == "X"
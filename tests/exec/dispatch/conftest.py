@@ -0,0 +1,108 @@
+"""Shared fixtures for $MKLMKL/exec dispatch tests
+
+Engines are checked against the reference engine on random rule chains and
+datalines; the generators for both live here so every engine is exercised on
+cases drawn the same way, as does the helper with which tests write rules.
+"""
+
+import random
+import re
+import pytest
+from mklists.rules import Rule
+from mklists.rules.load import _parse_rule
+
+WORDS = ["NOW", "LATER", "alpha", "beta", "gamma", "@phone", "@home", "x", "y", "it's"]
+PATTERNS = [
+    "^NOW",
+    "LATER",
+    "a",
+    "^@",
+    "^x$",
+    "e",
+    "e$",
+    r"\Abeta\Z",
+    ".",
+    "^b",
+    "ph|ho",
+    "(a)(l)",
+    "(?i)now",
+    "it's",
+    "^zzz",
+]
+LISTNAMES = ["lines", "now", "later", "phone", "home", "archive"]
+
+
+def _rule(source, target, pattern=".", field=0, sortkey=None) -> Rule:
+    """Return rule moving lines whose given field matches pattern."""
+    return Rule(
+        source_matchfield=field,
+        source_matchpattern=re.compile(pattern),
+        source=source,
+        target=target,
+        target_sortkey=sortkey,
+    )
+
+
+def _random_rulechain(
+    rng: random.Random,
+    length: int,
+    exact_share: float = 0.0,
+    fields=(0, 1, 2, 3),
+    sortkeys=(None, None, 0, 1, 2, 3),
+    patterns=PATTERNS,
+    words=WORDS,
+) -> list[Rule]:
+    """Return valid rule chain in which targets may later become sources.
+
+    Exact rules are drawn only for non-negative fields, as a negative field
+    matches no line and cannot be written in an exact rule.
+    """
+    seen = ["lines"]
+    rules = []
+    for _ in range(length):
+        source = rng.choice(seen)
+        target = rng.choice([name for name in LISTNAMES if name != source])
+        field = rng.choice(fields)
+        sortkey = rng.choice(sortkeys)
+        if rng.random() < exact_share and field >= 0:
+            value = rng.choice(words)
+            sortfield = "" if sortkey is None else str(sortkey)
+            rules.append(_parse_rule([f"{field}=", value, source, target, sortfield]))
+        else:
+            rules.append(_rule(source, target, rng.choice(patterns), field, sortkey))
+        if target not in seen:
+            seen.append(target)
+    return rules
+
+
+def _random_datalines(
+    rng: random.Random,
+    count: int,
+    words=WORDS,
+    max_words: int = 4,
+    newlines: bool = False,
+) -> list[str]:
+    """Return datalines of one to max_words words, some newline-terminated."""
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(1, max_words)))
+        + (rng.choice(["", "", "\n"]) if newlines else "")
+        for _ in range(count)
+    ]
+
+
+@pytest.fixture
+def make_rule():
+    """Return function making a rule from source, target, pattern, field, sortkey."""
+    return _rule
+
+
+@pytest.fixture
+def random_rulechain():
+    """Return generator of random rule chains."""
+    return _random_rulechain
+
+
+@pytest.fixture
+def random_datalines():
+    """Return generator of random datalines."""
+    return _random_datalines
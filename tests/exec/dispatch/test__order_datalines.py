@@ -0,0 +1,66 @@
+"""Tests $MKLMKL/exec/dispatch.py"""
+
+from mklists.exec.dispatch import (
+    _order_datalines,
+    _route_datalines,
+    compile_routing_program,
+)
+from mklists.exec.linetable import LineTable
+
+
+def _order(rules, datalines):
+    program = compile_routing_program(rules)
+    table = LineTable(datalines)
+    batches = _route_datalines(program, table)
+    ordered = _order_datalines(program, table, batches)
+    return {
+        name: [datalines[i] for i in ordered[list_id]]
+        for list_id, name in enumerate(program.listnames)
+    }
+
+
+class _CountingStr(str):
+    """String that records each call to split()."""
+
+    calls: list[str] = []
+
+    def split(self, *args, **kwargs):
+        _CountingStr.calls.append(str(self))
+        return super().split(*args, **kwargs)
+
+
+def test_order_datalines_splits_each_line_at_most_once(make_rule):
+    """Matching and sorting by field share one split per line across all rules."""
+    _CountingStr.calls = []
+    letters = "edcba"
+    rules = [
+        make_rule("lines", "out", pattern=f"^{c}", field=1, sortkey=2) for c in letters
+    ]
+    datalines = [_CountingStr(f"{c} {n}") for n in range(3) for c in letters]
+
+    result = _order(rules, datalines)
+
+    assert sorted(_CountingStr.calls) == sorted(datalines)
+    assert result["out"] == sorted(datalines, key=lambda line: line.split()[1])
+
+
+def test_order_datalines_merges_appended_lines_after_equal_keys(make_rule):
+    """Lines appended to a sorted list follow existing lines with equal sort text."""
+    rules = [
+        make_rule("lines", "out", pattern="^old", sortkey=2),
+        make_rule("lines", "out", pattern="^new", sortkey=2),
+    ]
+    datalines = ["new b", "old b", "new a", "old a"]
+
+    assert _order(rules, datalines)["out"] == ["old a", "new a", "old b", "new b"]
+
+
+def test_order_datalines_resorts_when_sort_key_changes(make_rule):
+    """Appending with a different sort key re-sorts the whole list."""
+    rules = [
+        make_rule("lines", "out", pattern="^x", sortkey=2),
+        make_rule("lines", "out", pattern="^y", sortkey=0),
+    ]
+    datalines = ["y 1", "x 3", "x 2"]
+
+    assert _order(rules, datalines)["out"] == ["x 2", "x 3", "y 1"]
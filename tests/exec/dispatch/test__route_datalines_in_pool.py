@@ -0,0 +1,75 @@
+"""Tests $MKLMKL/exec/dispatch.py
+
+Routing in a process pool must give exactly the batches of serial routing.
+"""
+
+import random
+import pytest
+from mklists.exec.dispatch import (
+    _route_datalines,
+    _route_datalines_in_pool,
+    compile_routing_program,
+    dispatch_compiled,
+)
+from mklists.exec.linetable import LineTable
+from mklists.rules.load import _parse_rule
+
+WORDS = ["NOW", "LATER", "alpha", "beta", "@phone", "@home", "x"]
+
+
+@pytest.fixture
+def rulechain(make_rule):
+    """Return rule chain of regex and exact rules, some moving lines back."""
+    return [
+        make_rule("lines", "now", "^NOW", 1, 0),
+        make_rule("lines", "later", "LATER", 0, 2),
+        _parse_rule(["1=", "@phone", "lines", "phone", ""]),
+        _parse_rule(["1=", "@home", "lines", "home", "1"]),
+        make_rule("now", "lines", "x", 2),
+        make_rule("lines", "archive", "(a)(l)", 0, 0),
+    ]
+
+
+def _datalines(count: int) -> list[str]:
+    rng = random.Random(count)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("chunk_count", [2, 3, 7])
+def test_route_datalines_in_pool_matches_serial_routing(chunk_count, rulechain):
+    """Batches routed in chunks are identical to batches routed serially."""
+    program = compile_routing_program(rulechain)
+    datalines = _datalines(200)
+    serial = _route_datalines(program, LineTable(datalines))
+
+    assert _route_datalines_in_pool(program, datalines, chunk_count) == serial
+
+
+def test_dispatch_compiled_with_workers_matches_serial_dispatch(rulechain):
+    """Output does not depend on number of workers."""
+    datalines = _datalines(300)
+
+    assert dispatch_compiled(
+        rulechain, datalines, workers=4, min_chunk_lines=50
+    ) == dispatch_compiled(rulechain, datalines)
+
+
+def test_dispatch_compiled_small_datadir_does_not_start_pool(mocker, rulechain):
+    """Fewer than two chunks' worth of lines are routed without a process pool."""
+    in_pool = mocker.patch("mklists.exec.dispatch._route_datalines_in_pool")
+    dispatch_compiled(rulechain, _datalines(99), workers=4, min_chunk_lines=50)
+    in_pool.assert_not_called()
+
+
+@pytest.mark.parametrize("workers, min_chunk_lines", [(0, 10), (2, 0)])
+def test_dispatch_compiled_rejects_invalid_pool_settings(
+    workers, min_chunk_lines, rulechain
+):
+    """Number of workers and minimum chunk size must be positive."""
+    with pytest.raises(ValueError):
+        dispatch_compiled(
+            rulechain, ["x"], workers=workers, min_chunk_lines=min_chunk_lines
+        )
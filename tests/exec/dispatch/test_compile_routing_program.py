@@ -0,0 +1,32 @@
+"""Tests $MKLMKL/exec/dispatch.py"""
+
+from mklists.exec.dispatch import compile_routing_program
+
+
+def test_compile_routing_program_assigns_list_ids_in_order_of_appearance(make_rule):
+    """List IDs follow the order in which lists first appear in the rule chain."""
+    program = compile_routing_program(
+        [
+            make_rule("lines", "now"),
+            make_rule("now", "later"),
+            make_rule("lines", "later"),
+        ]
+    )
+
+    assert program.listnames == ["lines", "now", "later"]
+    assert program.initial_list == 0
+    assert program.source_ids == [0, 1, 0]
+    assert program.target_ids == [1, 2, 2]
+
+
+def test_compile_routing_program_indexes_rules_by_source_list(make_rule):
+    """Each list knows the rules, in order, for which it is the source."""
+    program = compile_routing_program(
+        [
+            make_rule("lines", "now"),
+            make_rule("now", "lines"),
+            make_rule("lines", "later"),
+        ]
+    )
+
+    assert program.source_events == [[0, 2], [1], []]
@@ -0,0 +1,36 @@
+"""Tests $MKLMKL/exec/dispatch.py
+
+Cases that random rule chains rarely draw are checked here; every engine is
+checked against the reference engine in test_dispatch_engines.py.
+"""
+
+from mklists.exec.dispatch import dispatch_compiled
+
+
+def test_dispatch_compiled_fans_back_from_target_to_earlier_source(make_rule):
+    """Lines moved back to an earlier list are seen by later rules on that list."""
+    rules = [
+        make_rule("lines", "now", pattern="^NOW"),
+        make_rule("now", "lines", pattern="alpha", field=2),
+        make_rule("lines", "later", pattern="alpha"),
+    ]
+    datalines = ["NOW alpha", "NOW beta", "LATER gamma"]
+
+    result = dispatch_compiled(rules, datalines)
+
+    assert result == {
+        "lines": ["LATER gamma"],
+        "now": ["NOW beta"],
+        "later": ["NOW alpha"],
+    }
+
+
+def test_dispatch_compiled_sorts_target_even_if_rule_moved_nothing(make_rule):
+    """Target is sorted by a rule even when that rule matches no lines."""
+    rules = [
+        make_rule("lines", "out", pattern="."),
+        make_rule("lines", "out", pattern="nomatch", sortkey=0),
+    ]
+    datalines = ["b", "a"]
+
+    assert dispatch_compiled(rules, datalines)["out"] == ["a", "b"]
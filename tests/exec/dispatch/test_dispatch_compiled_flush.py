@@ -0,0 +1,67 @@
+"""Tests $MKLMKL/exec/dispatch.py
+
+Lists passed to flush as soon as they are final must hold what the reference
+engine would leave in them after the last rule.
+"""
+
+import random
+import pytest
+from mklists.exec.dispatch import dispatch_compiled
+from mklists.exec.process_datalines import _dispatch_reference
+from mklists.plan.resolve import _resolve_list_last_uses
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_dispatch_compiled_flushed_lists_match_reference_engine(
+    seed, random_rulechain, random_datalines
+):
+    """Every list is flushed once, after its last use, with its final lines."""
+    rng = random.Random(seed)
+    rules = random_rulechain(
+        rng, rng.randint(1, 15), fields=(0, 1, 2), sortkeys=(None, 0, 1)
+    )
+    datalines = random_datalines(rng, rng.randint(1, 40), max_words=3)
+    expected = _dispatch_reference(rules, list(datalines))
+    last_uses = _resolve_list_last_uses(rules)
+    flushed = {}
+
+    def flush(listname, lines):
+        assert listname not in flushed
+        flushed[listname] = list(lines)
+
+    remaining = dispatch_compiled(rules, datalines, last_uses=last_uses, flush=flush)
+
+    assert remaining == {}
+    assert flushed == expected
+    assert list(flushed) == sorted(flushed, key=last_uses.__getitem__)
+    assert all(line is None for line in datalines)
+
+
+def test_dispatch_compiled_flushes_list_before_later_rules_run(make_rule):
+    """A list no later rule uses is flushed before later lists are final."""
+    rules = [
+        make_rule("lines", "now", "^NOW"),
+        make_rule("lines", "later", "LATER"),
+        make_rule("later", "archive", "x"),
+    ]
+    order = []
+
+    dispatch_compiled(
+        rules,
+        ["NOW a", "LATER x", "b"],
+        last_uses=_resolve_list_last_uses(rules),
+        flush=lambda listname, lines: order.append((listname, list(lines))),
+    )
+
+    assert order == [
+        ("now", ["NOW a"]),
+        ("lines", ["b"]),
+        ("later", []),
+        ("archive", ["LATER x"]),
+    ]
+
+
+def test_dispatch_compiled_flush_requires_last_uses(make_rule):
+    """Flush without last uses of lists is a programming error."""
+    with pytest.raises(ValueError):
+        dispatch_compiled([make_rule("lines", "now")], ["a"], flush=print)
@@ -0,0 +1,81 @@
+"""Tests profiling of rules by dispatch_compiled in $MKLMKL/exec/dispatch.py"""
+
+import random
+import pytest
+from mklists.exec.dispatch import (
+    DispatchStats,
+    _route_datalines,
+    _route_datalines_by_rule,
+    compile_routing_program,
+    dispatch_compiled,
+)
+from mklists.exec.linetable import LineTable
+from mklists.exec.process_datalines import _dispatch_reference
+
+
+@pytest.fixture
+def random_case(random_rulechain, random_datalines):
+    """Return generator of rule chains and datalines, seeded by seed."""
+
+    def make(seed):
+        rng = random.Random(seed)
+        rules = random_rulechain(
+            rng,
+            rng.randint(1, 20),
+            fields=(0, 1, 2),
+            sortkeys=(None, 0, 1),
+            patterns=["^a", "b", "c$", "^zzz", ".", "a|c"],
+        )
+        datalines = random_datalines(rng, 30, words=["a", "b", "c", "ab", "x"])
+        return rules, datalines
+
+    return make
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_route_datalines_by_rule_matches_route_datalines(seed, random_case):
+    """Routing one rule at a time moves the same lines as routing line by line."""
+    rules, datalines = random_case(seed)
+    program = compile_routing_program(rules)
+
+    batches, _, _ = _route_datalines_by_rule(program, LineTable(datalines))
+
+    assert batches == _route_datalines(program, LineTable(datalines))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_dispatch_compiled_profile_output_unchanged(seed, random_case):
+    """Profiling records one entry per rule and does not change output."""
+    rules, datalines = random_case(seed)
+    stats = DispatchStats()
+
+    result = dispatch_compiled(rules, list(datalines), stats=stats, profile=True)
+
+    assert result == _dispatch_reference(rules, datalines)
+    assert [entry.rule for entry in stats.rule_stats] == rules
+
+
+def test_dispatch_compiled_profile_counts_lines(make_rule):
+    """Counters record lines tested against and moved by each rule."""
+    rules = [
+        make_rule("lines", "a", "^a", sortkey=0),
+        make_rule("lines", "b", "^b"),
+        make_rule("empty", "c", "x"),
+        make_rule("a", "c", "2"),
+    ]
+    stats = DispatchStats()
+
+    dispatch_compiled(rules, ["a1", "b1", "a2", "c1"], stats=stats, profile=True)
+
+    assert [
+        (entry.lines_examined, entry.lines_matched) for entry in stats.rule_stats
+    ] == [(4, 2), (2, 1), (0, 0), (2, 1)]
+    assert stats.rule_stats[0].sort_seconds > 0
+    assert stats.rule_stats[1].sort_seconds == 0
+    assert stats.rule_stats[2].seconds == 0
+
+
+def test_dispatch_compiled_profile_requires_stats(make_rule):
+    """Profiling without stats in which to record counters raises ValueError."""
+    with pytest.raises(ValueError):
+        dispatch_compiled([make_rule("lines", "now")], ["a"], profile=True)
@@ -0,0 +1,62 @@
+"""Tests every engine of dispatch_datalines_to_targets in $MKLMKL/exec
+
+Each engine is checked against the reference engine, which is the specification
+of dispatch semantics, on the same random rule chains and datalines.
+"""
+
+import random
+import pytest
+from mklists.exec.codegen import generate_router
+from mklists.exec.dispatch import DispatchStats
+from mklists.exec.dispatch_numpy import numpy_available
+from mklists.exec.process_datalines import dispatch_datalines_to_targets
+
+ENGINES = [
+    "compiled",
+    "generated",
+    pytest.param(
+        "numpy",
+        marks=pytest.mark.skipif(not numpy_available(), reason="requires NumPy"),
+    ),
+]
+
+
+def _dispatch(engine, rules, datalines):
+    """Return lists and number of rules skipped by given engine."""
+    stats = DispatchStats()
+    if engine == "generated":
+        lines_dict = dispatch_datalines_to_targets(
+            rules,
+            list(datalines),
+            engine="compiled",
+            router=generate_router(rules),
+            stats=stats,
+        )
+    else:
+        lines_dict = dispatch_datalines_to_targets(
+            rules, list(datalines), engine=engine, stats=stats
+        )
+    return (
+        {name: list(lines) for name, lines in lines_dict.items()},
+        stats.rules_skipped,
+    )
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("seed", range(50))
+def test_engine_matches_reference_engine(
+    seed, engine, random_rulechain, random_datalines
+):
+    """Engine gives the lists of the reference engine and skips the same rules."""
+    rng = random.Random(seed)
+    rules = random_rulechain(
+        rng,
+        rng.randint(1, 30),
+        exact_share=rng.choice([0.0, 0.3, 0.6]),
+        fields=(-1, 0, 0, 1, 2, 3),
+    )
+    datalines = random_datalines(rng, rng.randint(1, 80), newlines=True)
+
+    assert _dispatch(engine, rules, datalines) == _dispatch(
+        "reference", rules, datalines
+    )
@@ -0,0 +1,36 @@
+"""Tests $MKLMKL/exec/dispatch_numpy.py
+
+The vectorized engine is checked against the reference engine, which is the
+specification of dispatch semantics.
+"""
+
+import pytest
+from mklists.exec.process_datalines import _dispatch_reference
+
+pytest.importorskip("numpy")
+
+from mklists.exec.dispatch_numpy import dispatch_vectorized  # noqa: E402
+
+
+def test_dispatch_vectorized_with_nul_in_datalines(make_rule):
+    """Lines containing NUL are matched as the reference engine matches them."""
+    rules = [
+        make_rule("lines", "nul", "^a\x00"),
+        make_rule("lines", "exact", "^b$", sortkey=0),
+    ]
+    datalines = ["a\x00b", "a", "b", "b\x00", "a\x00", "b\n"]
+
+    assert dispatch_vectorized(rules, datalines) == _dispatch_reference(
+        rules, datalines
+    )
+
+
+def test_dispatch_vectorized_sorts_on_field_with_missing_fields(make_rule):
+    """Sorting on a field some lines lack puts those lines first, stably."""
+    rules = [make_rule("lines", "sorted", ".", 0, 2)]
+    datalines = ["x b", "y", "z a", "w"]
+
+    assert dispatch_vectorized(rules, datalines) == {
+        "lines": [],
+        "sorted": ["y", "w", "z a", "x b"],
+    }
@@ -0,0 +1,85 @@
+"""Tests $MKLMKL/exec/external_sort.py"""
+
+import random
+import pytest
+from mklists.exec.dispatch import dispatch_compiled
+from mklists.exec.external_sort import (
+    SpilledLines,
+    sort_in_chunks,
+    spill_sorted_runs,
+)
+from mklists.exec.process_datalines import _dispatch_reference, _sort_datalines
+
+
+@pytest.mark.parametrize("sortkey", [0, 1, 2, 3])
+@pytest.mark.parametrize("memory_limit", [1, 10, 100, 10_000])
+def test_spilled_runs_match_in_memory_sort(
+    tmp_path, sortkey, memory_limit, random_datalines
+):
+    """Merged runs give the same stable order as sorting in memory."""
+    datalines = random_datalines(random.Random(sortkey), 200)
+
+    result = spill_sorted_runs(
+        sort_in_chunks(datalines, sortkey, memory_limit), sortkey, tmp_path
+    )
+
+    assert isinstance(result, SpilledLines)
+    assert len(result) == len(datalines)
+    assert list(result) == _sort_datalines(datalines, sortkey)
+
+
+def test_spilled_lines_unlink_removes_run_files(tmp_path):
+    """Run files are written to the spill directory and removed by unlink."""
+    result = spill_sorted_runs(sort_in_chunks(["b", "a", "c"], 0, 1), 0, tmp_path)
+    assert len(list(tmp_path.iterdir())) == 3
+
+    result.unlink()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("with_flush", [False, True])
+def test_dispatch_compiled_with_sort_memory_limit(
+    tmp_path, seed, with_flush, make_rule, random_datalines
+):
+    """Spilling sorted lists to disk does not change the result.
+
+    Lines of spilled lists are released from the datalines given, so the
+    expected result is computed first.
+    """
+    rng = random.Random(seed)
+    datalines = random_datalines(rng, 150)
+    rules = [
+        make_rule("lines", "now", "NOW", sortkey=rng.randint(0, 3)),
+        make_rule("lines", "later", "LATER", field=1),
+        make_rule("now", "phone", "@phone", sortkey=rng.randint(0, 3)),
+        make_rule("later", "now", "alpha", sortkey=rng.randint(0, 3)),
+        make_rule("lines", "now", "beta"),
+    ]
+    last_uses = {"lines": 4, "now": 4, "later": 3, "phone": 2}
+    expected = _dispatch_reference(rules, datalines)
+    flushed = {}
+
+    result = dispatch_compiled(
+        rules,
+        datalines,
+        last_uses=last_uses if with_flush else None,
+        flush=(
+            (lambda name, lines: flushed.update({name: list(lines)}))
+            if with_flush
+            else None
+        ),
+        sort_memory_limit=50,
+        spill_dir=tmp_path,
+    )
+
+    result = {name: list(lines) for name, lines in result.items()}
+    result.update(flushed)
+    assert result == expected
+
+
+def test_dispatch_compiled_sort_memory_limit_requires_spill_dir(make_rule):
+    """A sort memory limit without a spill directory raises ValueError."""
+    with pytest.raises(ValueError):
+        dispatch_compiled([make_rule("lines", "now")], ["a"], sort_memory_limit=10)
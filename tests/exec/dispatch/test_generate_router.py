@@ -0,0 +1,83 @@
+"""Tests $MKLMKL/exec/codegen.py
+
+Generated routers are checked against the routing program they were generated
+from; dispatch through them is checked against the reference engine with the
+other engines, in test_dispatch_engines.py.
+"""
+
+import random
+import pytest
+from mklists.exec import codegen
+from mklists.exec.codegen import generate_router
+from mklists.exec.dispatch import _route_datalines, dispatch_compiled
+from mklists.exec.linetable import LineTable
+from mklists.exec.process_datalines import _dispatch_reference
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_generated_router_routes_like_routing_program(
+    seed, random_rulechain, random_datalines
+):
+    """Generated router moves the same lines as the routing program it is from."""
+    rng = random.Random(seed)
+    rules = random_rulechain(
+        rng, rng.randint(1, 25), exact_share=0.3, fields=(-1, 0, 0, 1, 2, 3)
+    )
+    datalines = random_datalines(rng, rng.randint(1, 80), newlines=True)
+    router = generate_router(rules)
+
+    assert router.route(datalines) == _route_datalines(
+        router.program, LineTable(datalines)
+    )
+
+
+def test_generated_router_source_has_constant_fields_and_literals(make_rule):
+    """Field indexes and literal patterns are constants in generated source."""
+    rules = [
+        make_rule("lines", "now", "^NOW", 2),
+        make_rule("now", "later", r"\d"),
+    ]
+    source = generate_router(rules).source
+
+    assert "text = fields[1]" in source
+    assert "text.startswith('NOW')" in source
+    assert "s1(line) is not None" in source
+
+
+def test_generated_router_is_reused_across_calls(make_rule):
+    """Router holds no per-call state, so one router serves repeated dispatches."""
+    rules = [make_rule("lines", "now", "^NOW")]
+    router = generate_router(rules)
+
+    assert router.route(["NOW a", "b"]) == router.route(["NOW a", "b"])
+    assert list(router.route(["b", "NOW c"])[0]) == [1]
+
+
+def _feedback_chain(make_rule, length):
+    """Return rule chain in which each list moves lines back to the first."""
+    rules = []
+    for n in range(length // 2):
+        rules.append(make_rule("lines", f"t{n}", f"w{n}"))
+        rules.append(make_rule(f"t{n}", "lines", f"v{n}"))
+    return rules
+
+
+def test_generate_router_gives_up_past_max_generated_tests(make_rule, monkeypatch):
+    """No router is generated for chains that would inline too many tests."""
+    rules = _feedback_chain(make_rule, 40)
+    monkeypatch.setattr(codegen, "MAX_GENERATED_TESTS", 200)
+
+    assert generate_router(rules[:20]) is not None
+    assert generate_router(rules) is None
+
+
+def test_dispatch_without_router_for_long_feedback_chain(make_rule):
+    """Long chains are routed by the routing program, with the same result."""
+    rules = _feedback_chain(make_rule, 600)
+    datalines = [f"w{n} v{n}" for n in range(0, 300, 7)] + ["w3", "x"]
+    router = generate_router(rules)
+
+    assert router is None
+    assert dispatch_compiled(rules, datalines, router=router) == _dispatch_reference(
+        rules, datalines
+    )
@@ -0,0 +1,110 @@
+"""Tests $MKLMKL/exec/linetable.py"""
+
+from mklists.exec.linetable import IndexedLines, LineTable, line_id_array
+
+
+def test_linetable_fields_are_split_on_whitespace():
+    """Fields are the whitespace-delimited fields of a line."""
+    table = LineTable(["alpha  beta\tgamma\n"])
+
+    assert table.fields(0) == ("alpha", "beta", "gamma")
+
+
+def test_linetable_fields_are_cached():
+    """Fields of a line are computed once and then reused."""
+    table = LineTable(["alpha beta"])
+
+    assert table.fields(0) is table.fields(0)
+
+
+def test_linetable_keyfn_zero_is_whole_line():
+    """Sort key 0 maps a line ID to the whole line."""
+    table = LineTable(["b 2", "a 1"])
+
+    assert table.keyfn(0)(1) == "a 1"
+
+
+def test_linetable_keyfn_is_field_n_through_end_of_line():
+    """Sort key N maps a line ID to fields N through end, joined by spaces."""
+    table = LineTable(["x  b   c", "y"])
+    keyfn = table.keyfn(2)
+
+    assert keyfn(0) == "b c"
+    assert keyfn(1) == ""
+
+
+def test_linetable_cache_nbytes_grows_only_with_lines_used():
+    """Cache holds nothing for lines never split or sorted by field."""
+    table = LineTable([f"line {n}" for n in range(100)])
+    empty = table.cache_nbytes()
+
+    table.fields(0)
+
+    assert table.cache_nbytes() > empty
+
+
+def test_linetable_without_field_cache_stores_nothing():
+    """With cache_fields False, fields are returned but not stored."""
+    table = LineTable(["alpha beta"], cache_fields=False)
+    empty = table.cache_nbytes()
+
+    assert table.fields(0) == ("alpha", "beta")
+    assert table.cache_nbytes() == empty
+
+
+def test_linetable_drop_fields_empties_cache():
+    """After drop_fields, cached fields are released and no more are stored."""
+    table = LineTable(["alpha beta", "gamma"])
+    empty = LineTable(["alpha beta", "gamma"], cache_fields=False).cache_nbytes()
+    table.fields(0)
+
+    table.drop_fields()
+
+    assert table.fields(1) == ("gamma",)
+    assert table.cache_nbytes() <= empty
+
+
+def test_linetable_sort_text_equal_to_line_is_line_itself():
+    """Sort text identical to its line is stored as the line, costing nothing."""
+    lines = ["alpha beta", "x  y"]
+    table = LineTable(lines, cache_fields=False)
+    keyfn = table.keyfn(1)
+    empty = table.cache_nbytes()
+
+    assert keyfn(0) is lines[0]
+    assert table.cache_nbytes() == empty
+    assert keyfn(1) == "x y"
+    assert table.cache_nbytes() > empty
+
+
+def test_indexedlines_reads_lines_by_line_id():
+    """View yields lines of table in order of its line IDs."""
+    lines = ["a", "b", "c"]
+    view = IndexedLines(lines, line_id_array([2, 0]))
+
+    assert len(view) == 2
+    assert list(view) == ["c", "a"]
+    assert view[1] == "a"
+    assert view[-1] == "a"
+    assert view[:1] == ["c"]
+
+
+def test_indexedlines_compares_equal_to_list_of_same_lines():
+    """View compares equal to a list (or view) of the same lines, in order."""
+    lines = ["a", "b", "c"]
+    view = IndexedLines(lines, line_id_array([1, 2]))
+
+    assert view == ["b", "c"]
+    assert ["b", "c"] == view
+    assert view == IndexedLines(["x", "b", "c"], line_id_array([1, 2]))
+    assert view != ["c", "b"]
+    assert view != ["b"]
+    assert view != "bc"
+
+
+def test_line_id_array_is_compact():
+    """Line IDs are stored in a machine-word array, not as Python ints."""
+    ids = line_id_array(range(1000))
+
+    assert ids.itemsize <= 4
+    assert list(ids) == list(range(1000))
@@ -0,0 +1,148 @@
+"""Tests $MKLMKL/exec/route_cache.py"""
+
+import random
+import pytest
+from mklists.exec.dispatch import (
+    _route_datalines,
+    compile_routing_program,
+    dispatch_compiled,
+)
+from mklists.exec.linetable import LineTable
+from mklists.exec.process_datalines import _dispatch_reference
+from mklists.exec.route_cache import RouteCache, line_digest, rulechain_fingerprint
+
+WORDS = ["NOW", "LATER", "alpha", "beta", "@phone", "x"]
+
+
+@pytest.fixture
+def rulechain(make_rule):
+    """Return rule chain whose routes are cached."""
+    return [
+        make_rule("lines", "now", "NOW", sortkey=1),
+        make_rule("lines", "later", "LATER", field=1),
+        make_rule("now", "phone", "@phone", sortkey=0),
+        make_rule("later", "now", "alpha"),
+        make_rule("lines", "now", "beta"),
+    ]
+
+
+def _datalines(rng, count):
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+        + f" {rng.randint(0, 20)}"
+        for _ in range(count)
+    ]
+
+
+def _route(program):
+    return lambda lines: _route_datalines(program, LineTable(lines))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_route_cache_routes_like_routing_all_lines(seed, rulechain):
+    """Batches rebuilt from cached routes equal those of routing every line."""
+    rng = random.Random(seed)
+    program = compile_routing_program(rulechain)
+    cache = RouteCache("f", 1000)
+    first = _datalines(rng, 60)
+    second = first[10:] + _datalines(rng, 20)
+    rng.shuffle(second)
+
+    assert cache.route(first, len(rulechain), _route(program)) == _route(program)(first)
+    assert cache.route(second, len(rulechain), _route(program)) == _route(program)(
+        second
+    )
+    assert cache.misses == len(first) + sum(line not in first for line in second)
+
+
+def test_route_cache_routes_only_missing_lines(rulechain):
+    """Only lines not found in the cache are passed to the routing function."""
+    program = compile_routing_program(rulechain)
+    routed = []
+
+    def route_lines(lines):
+        routed.append(list(lines))
+        return _route(program)(lines)
+
+    cache = RouteCache("f", 1000)
+    cache.route(["NOW 1", "x"], len(rulechain), route_lines)
+    cache.route(["x", "beta", "NOW 1"], len(rulechain), route_lines)
+
+    assert routed == [["NOW 1", "x"], ["beta"]]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_route_cache_save_and_load_round_trip(tmp_path, rulechain):
+    """Saved routes are loaded for the same fingerprint, and not for another."""
+    path = tmp_path / ".cache"
+    program = compile_routing_program(rulechain)
+    cache = RouteCache("f", 1000)
+    datalines = _datalines(random.Random(0), 40)
+    cache.route(datalines, len(rulechain), _route(program))
+
+    cache.save(path)
+
+    assert RouteCache.load(path, "f", 1000).routes == cache.routes
+    assert RouteCache.load(path, "other", 1000).routes == {}
+
+
+def test_route_cache_save_evicts_least_recently_used(tmp_path, rulechain):
+    """Entries for lines not seen recently are evicted first."""
+    path = tmp_path / ".cache"
+    program = compile_routing_program(rulechain)
+    cache = RouteCache("f", 2)
+    cache.route(["a", "b", "c"], len(rulechain), _route(program))
+    cache.route(["a"], len(rulechain), _route(program))
+
+    cache.save(path)
+
+    assert list(RouteCache.load(path, "f", 2).routes) == [
+        line_digest("c"),
+        line_digest("a"),
+    ]
+
+
+@pytest.mark.parametrize("content", [b"", b"garbage\n", b'{"format": 1}\n', None])
+def test_route_cache_load_unusable_file_gives_empty_cache(tmp_path, content):
+    """Missing, corrupt or truncated cache files are ignored."""
+    path = tmp_path / ".cache"
+    if content is not None:
+        path.write_bytes(content)
+
+    assert RouteCache.load(path, "f", 10).routes == {}
+
+
+def test_route_cache_load_truncated_file_gives_empty_cache(tmp_path, rulechain):
+    """A cache file cut short is ignored."""
+    path = tmp_path / ".cache"
+    cache = RouteCache("f", 10)
+    cache.route(["NOW 1"], len(rulechain), _route(compile_routing_program(rulechain)))
+    cache.save(path)
+    path.write_bytes(path.read_bytes()[:-3])
+
+    assert RouteCache.load(path, "f", 10).routes == {}
+
+
+def test_rulechain_fingerprint_changes_with_rule_files(tmp_path):
+    """Fingerprint depends on the contents and order of rule files."""
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.write_text("0|x|lines|x.txt|\n")
+    second.write_text("0|y|lines|y.txt|\n")
+    fingerprint = rulechain_fingerprint([first, second])
+
+    assert rulechain_fingerprint([second, first]) != fingerprint
+    second.write_text("0|z|lines|y.txt|\n")
+    assert rulechain_fingerprint([first, second]) != fingerprint
+
+
+def test_dispatch_compiled_with_route_cache_matches_reference(rulechain):
+    """Dispatch with a warm route cache gives the same lists."""
+    rng = random.Random(3)
+    cache = RouteCache("f", 1000)
+    datalines = _datalines(rng, 80)
+    dispatch_compiled(rulechain, list(datalines), route_cache=cache)
+    datalines = datalines[5:] + _datalines(rng, 10)
+
+    result = dispatch_compiled(rulechain, list(datalines), route_cache=cache)
+
+    assert result == _dispatch_reference(rulechain, datalines)
@@ -0,0 +1,73 @@
+"""Tests RoutingTrace in $MKLMKL/exec/dispatch.py"""
+
+import random
+import pytest
+from mklists.exec.dispatch import DispatchStats, dispatch_compiled
+from mklists.exec.process_datalines import (
+    _dataline_matches_pattern,
+    dispatch_datalines_to_targets,
+)
+
+
+def _expected_hops(rules, line):
+    """Follow one line through the rules, one rule at a time."""
+    current = rules[0].source
+    hops = []
+    for rule_index, rule in enumerate(rules):
+        if rule.source == current and _dataline_matches_pattern(
+            line, rule.source_matchpattern, rule.source_matchfield
+        ):
+            hops.append((rule_index, rule.source, rule.target))
+            current = rule.target
+    return hops, current
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_routing_trace_hops_follow_rules(seed, random_rulechain):
+    """Hops of each line are the moves made by applying rules one at a time."""
+    rng = random.Random(seed)
+    rules = random_rulechain(
+        rng,
+        rng.randint(1, 20),
+        fields=(0, 1, 2),
+        sortkeys=(None,),
+        patterns=["^a", "b", "c$", ".", "a|c"],
+    )
+    datalines = [rng.choice(["a b", "b c", "c", "ab a", "x"]) for _ in range(30)]
+    stats = DispatchStats()
+
+    dispatch_compiled(rules, list(datalines), stats=stats, trace=True)
+
+    trace = stats.trace
+    for line_id, line in enumerate(datalines):
+        hops, final_list = _expected_hops(rules, line)
+        assert trace.hops(line_id) == hops
+        assert trace.final_list(line_id) == final_list
+
+
+def test_routing_trace_find_returns_lines_containing_text(make_rule):
+    """Lines are found by substring, in line order."""
+    stats = DispatchStats()
+
+    dispatch_compiled(
+        [make_rule("lines", "now", "^N")],
+        ["NOW a", "later", "Nx a"],
+        stats=stats,
+        trace=True,
+    )
+
+    assert stats.trace.find(" a") == [0, 2]
+    assert stats.trace.hops(1) == []
+    assert stats.trace.final_list(2) == "now"
+
+
+def test_trace_requires_compiled_engine(make_rule):
+    """Tracing with the reference engine raises ValueError."""
+    with pytest.raises(ValueError):
+        dispatch_datalines_to_targets(
+            [make_rule("lines", "now")],
+            ["a"],
+            engine="reference",
+            stats=DispatchStats(),
+            trace=True,
+        )
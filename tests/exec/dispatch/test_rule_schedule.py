@@ -0,0 +1,60 @@
+"""Tests RuleSchedule in $MKLMKL/exec/dispatch.py"""
+
+from mklists.exec.dispatch import (
+    RuleSchedule,
+    compile_routing_program,
+)
+
+
+def _visited(rules, line_count, moves):
+    """Return rules yielded by schedule, given lines moved by each rule."""
+    schedule = RuleSchedule(compile_routing_program(rules), line_count)
+    visited = []
+    for rule_index in schedule:
+        visited.append(rule_index)
+        schedule.move(rule_index, moves.get(rule_index, 0))
+    return visited, schedule.skipped
+
+
+def test_rule_schedule_skips_subchain_of_empty_list(make_rule):
+    """Rules downstream of a list that receives no lines are never visited."""
+    rules = [
+        make_rule("lines", "a", "^a"),
+        make_rule("a", "b"),
+        make_rule("b", "c"),
+        make_rule("lines", "d", "^d"),
+        make_rule("d", "e"),
+    ]
+
+    visited, skipped = _visited(rules, 3, {0: 0, 3: 2, 4: 2})
+
+    assert visited == [0, 3, 4]
+    assert skipped == 2
+
+
+def test_rule_schedule_visits_rule_sorting_non_empty_target(make_rule):
+    """A rule with an empty source is still applied if it sorts a longer list."""
+    rules = [
+        make_rule("lines", "a"),
+        make_rule("empty", "a", sortkey=0),
+        make_rule("empty", "b", sortkey=0),
+    ]
+
+    visited, skipped = _visited(rules, 2, {0: 2})
+
+    assert visited == [0, 1]
+    assert skipped == 1
+
+
+def test_rule_schedule_revisits_list_that_refills(make_rule):
+    """A list emptied by one rule is followed again once lines move back into it."""
+    rules = [
+        make_rule("lines", "a"),
+        make_rule("lines", "b"),
+        make_rule("a", "lines"),
+        make_rule("lines", "c"),
+    ]
+
+    visited, _ = _visited(rules, 2, {0: 2, 2: 2, 3: 2})
+
+    assert visited == [0, 2, 3]
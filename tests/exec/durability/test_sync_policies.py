@@ -0,0 +1,63 @@
+"""Tests $MKLMKL/exec/durability.py"""
+
+import os
+import pytest
+from mklists.exec.backups import backup_datadirs
+from mklists.exec.durability import sync_dir, sync_file, sync_path
+from mklists.exec.reconcile import DatafileReconciler, datafile_state
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    """Record the number of calls to os.fsync."""
+    calls = []
+    real_fsync = os.fsync
+
+    def counting_fsync(fd):
+        calls.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    return calls
+
+
+@pytest.mark.parametrize("fsync, expected", [("none", 0), ("dir", 1), ("file", 3)])
+def test_sync_helpers_follow_policy(tmp_path, fsyncs, fsync, expected):
+    """Files are synced only for "file", directories unless "none"."""
+    path = tmp_path / "a.txt"
+    with path.open("w") as f:
+        f.write("a\n")
+        sync_file(f, fsync)
+    sync_path(path, fsync)
+    sync_dir(tmp_path, fsync)
+
+    assert len(fsyncs) == expected
+
+
+@pytest.mark.parametrize("fsync, expected", [("none", 0), ("dir", 2), ("file", 5)])
+def test_datafile_reconciler_syncs_as_configured(tmp_path, fsyncs, fsync, expected):
+    """With "dir", a datadir is synced after commit and after rewrite."""
+    (tmp_path / "a.txt").write_text("a\n")
+    reconciler = DatafileReconciler(tmp_path, {"a.txt": datafile_state(b"a\n")}, fsync)
+
+    reconciler.write_all({"a.txt": ["a", "b"], "b.txt": ["b"]})
+    reconciler.finish()
+
+    # "dir": the datadir twice; "file": also two staged files and the journal.
+    assert len(fsyncs) == expected
+    assert (tmp_path / "a.txt").read_text() == "a\nb\n"
+
+
+@pytest.mark.parametrize("fsync, expected", [("none", 0), ("dir", 2), ("file", 4)])
+def test_backup_datadirs_syncs_as_configured(tmp_path, fsyncs, fsync, expected):
+    """Each copied datadir, and the snapshot directory, is synced once."""
+    datadir = tmp_path / "a"
+    datadir.mkdir()
+    (datadir / "a.txt").write_text("a\n")
+    (datadir / ".rules").write_text("rules\n")
+    snapshot_dir = tmp_path / "backup"
+    snapshot_dir.mkdir()
+
+    backup_datadirs(datadirs=[datadir], snapshot_dir=snapshot_dir, fsync=fsync)
+
+    assert len(fsyncs) == expected
@@ -1,6 +1,9 @@
 """Tests $MKLMKL/exec/process_datadirs.py"""
 
+import pytest
+from mklists.errors import SafetyError
 from mklists.exec.process_datadirs import _read_datafiles
+from mklists.exec.reconcile import datafile_state
 
 
 def test_read_datafiles_single_file(tmp_path):
@@ -41,3 +44,32 @@ def test_read_datafiles_empty_input():
     lines = _read_datafiles([])
 
     assert not lines  # [] is falsy
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"a\nb\nc\n", b"a\nb\nc", b"a\r\nb\r\nc", "café\n".encode(), b""],
+)
+def test_read_datafiles_mapped_as_read(tmp_path, data):
+    """Mapped datafiles give the same lines and states as datafiles read."""
+    datafile = tmp_path / "data.txt"
+    datafile.write_bytes(data)
+    read_states, mapped_states = {}, {}
+
+    read = _read_datafiles([datafile], datafile_states=read_states, mmap_threshold=None)
+    mapped = _read_datafiles(
+        [datafile], datafile_states=mapped_states, mmap_threshold=1
+    )
+
+    assert mapped == read
+    assert mapped_states == read_states == {"data.txt": datafile_state(data)}
+
+
+@pytest.mark.parametrize("data", [b"a\n\nb\n", b"a\x00\n", b"\xff\n"])
+def test_read_datafiles_mapped_checks_contents(tmp_path, data):
+    """Mapped datafiles are checked as datafiles read are."""
+    datafile = tmp_path / "data.txt"
+    datafile.write_bytes(data)
+
+    with pytest.raises(SafetyError):
+        _read_datafiles([datafile], mmap_threshold=1)
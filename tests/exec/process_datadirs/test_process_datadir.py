@@ -1,14 +1,16 @@
 """Tests $MKLMKL/exec/process_datadirs.py"""
 
+import os
 import re
 import pytest
-from mklists.config.model import SafetyConfig
+from mklists.config.model import PerformanceConfig, SafetyConfig
 from mklists.errors import SafetyError
+from mklists.exec import dispatch
 from mklists.exec.process_datadirs import process_datadir
+from mklists.exec.reconcile import DatafileReconciler
 from mklists.plan.model import DatadirPlan
 from mklists.rules.model import Rule
 
-
 _SAFETY = SafetyConfig(invalid_filename_patterns=[])
 
 
@@ -89,6 +91,197 @@ def test_process_datadir_hidden_files_not_deleted(tmp_path):
     assert (tmp_path / ".rules").read_text() == "rules content\n"
 
 
+# ---------------------------------------------------------------------------
+# Early flush of finalized lists
+# ---------------------------------------------------------------------------
+
+
+def test_process_datadir_with_last_uses_writes_same_files(tmp_path):
+    """Writing lists as soon as they are final gives the same files."""
+    (tmp_path / "input.txt").write_text("alpha x\nbeta\nalpha\n")
+    (tmp_path / "other.txt").write_text("gamma x\n")
+    rules = [
+        _rule("input.txt", "a.txt", "^a"),
+        _rule("input.txt", "input.txt.new", "x"),
+        _rule("a.txt", "b.txt", "x", sortkey=0),
+    ]
+    plan = DatadirPlan(
+        datadir=tmp_path,
+        rules=rules,
+        rulefiles_used=[],
+        list_last_uses={"input.txt": 1, "input.txt.new": 1, "a.txt": 2, "b.txt": 2},
+    )
+
+    process_datadir(datadir_plan=plan, safety=_SAFETY)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "a.txt",
+        "b.txt",
+        "input.txt",
+        "input.txt.new",
+    ]
+    assert (tmp_path / "input.txt").read_text() == "beta\n"
+    assert (tmp_path / "input.txt.new").read_text() == "gamma x\n"
+    assert (tmp_path / "a.txt").read_text() == "alpha\n"
+    assert (tmp_path / "b.txt").read_text() == "alpha x\n"
+
+
+def test_process_datadir_uses_numpy_engine_for_large_datadir(tmp_path, monkeypatch):
+    """Large datadirs are dispatched with the NumPy engine despite early flush."""
+    pytest.importorskip("numpy")
+    from mklists.exec import process_datalines
+    from mklists.exec.dispatch_numpy import VECTORIZED_MIN_LINES
+
+    datalines = [
+        f"{'NOW' if n % 3 else 'LATER'} item{n}" for n in range(VECTORIZED_MIN_LINES)
+    ]
+    (tmp_path / "input.txt").write_text("".join(f"{line}\n" for line in datalines))
+    plan = DatadirPlan(
+        datadir=tmp_path,
+        rules=[
+            _rule("input.txt", "now.txt", "^NOW"),
+            _rule("now.txt", "sorted.txt", sortkey=2),
+        ],
+        rulefiles_used=[],
+        list_last_uses={"input.txt": 0, "now.txt": 1, "sorted.txt": 1},
+    )
+    calls = []
+    dispatch_vectorized = process_datalines.dispatch_vectorized
+
+    def recording_dispatch_vectorized(rules, lines, **kwargs):
+        calls.append(len(lines))
+        return dispatch_vectorized(rules, lines, **kwargs)
+
+    monkeypatch.setattr(
+        process_datalines, "dispatch_vectorized", recording_dispatch_vectorized
+    )
+
+    process_datadir(datadir_plan=plan, safety=_SAFETY)
+
+    assert calls == [VECTORIZED_MIN_LINES]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["input.txt", "sorted.txt"]
+    assert (tmp_path / "input.txt").read_text().splitlines() == [
+        line for line in datalines if line.startswith("LATER")
+    ]
+    assert (tmp_path / "sorted.txt").read_text().splitlines() == sorted(
+        (line for line in datalines if line.startswith("NOW")),
+        key=lambda line: line.split()[1],
+    )
+
+
+def test_process_datadir_with_sort_memory_limit_leaves_no_spill_files(tmp_path):
+    """Lists sorted on disk are written in order, and run files are removed."""
+    datalines = [f"{n % 7} item{n}" for n in range(100)]
+    (tmp_path / "input.txt").write_text("".join(f"{line}\n" for line in datalines))
+    plan = DatadirPlan(
+        datadir=tmp_path,
+        rules=[_rule("input.txt", "sorted.txt", sortkey=1)],
+        rulefiles_used=[],
+    )
+
+    process_datadir(
+        datadir_plan=plan,
+        safety=_SAFETY,
+        performance=PerformanceConfig(sort_memory_limit=64),
+    )
+
+    assert [p.name for p in tmp_path.iterdir()] == ["sorted.txt"]
+    assert (tmp_path / "sorted.txt").read_text().splitlines() == sorted(datalines)
+
+
+def test_process_datadir_routes_in_pool_of_dispatch_workers(tmp_path, monkeypatch):
+    """Lines are routed in a worker pool as allowed by performance settings."""
+    datalines = [f"{'NOW' if n % 3 else 'LATER'} item{n}" for n in range(100)]
+    (tmp_path / "input.txt").write_text("".join(f"{line}\n" for line in datalines))
+    plan = DatadirPlan(
+        datadir=tmp_path,
+        rules=[_rule("input.txt", "now.txt", "^NOW", sortkey=2)],
+        rulefiles_used=[],
+    )
+    chunk_counts = []
+    route_in_pool = dispatch._route_datalines_in_pool
+
+    def recording_route_in_pool(program, lines, chunk_count):
+        chunk_counts.append(chunk_count)
+        return route_in_pool(program, lines, chunk_count)
+
+    monkeypatch.setattr(dispatch, "_route_datalines_in_pool", recording_route_in_pool)
+
+    process_datadir(
+        datadir_plan=plan,
+        safety=_SAFETY,
+        performance=PerformanceConfig(dispatch_workers=2, min_chunk_lines=40),
+    )
+
+    assert chunk_counts == [2]
+    assert (tmp_path / "input.txt").read_text().splitlines() == [
+        line for line in datalines if line.startswith("LATER")
+    ]
+    assert (tmp_path / "now.txt").read_text().splitlines() == sorted(
+        (line for line in datalines if line.startswith("NOW")),
+        key=lambda line: line.split()[1],
+    )
+
+
+def test_process_datadir_logs_rules_skipped(tmp_path, caplog):
+    """Rules whose source list stays empty are skipped and counted."""
+    (tmp_path / "input.txt").write_text("alpha\nbeta\n")
+    rules = [
+        _rule("input.txt", "a.txt", "^a"),
+        _rule("input.txt", "z.txt", "^z"),
+        _rule("z.txt", "zz.txt", "z"),
+    ]
+    plan = DatadirPlan(datadir=tmp_path, rules=rules, rulefiles_used=[])
+
+    with caplog.at_level("INFO", logger="mklists"):
+        process_datadir(datadir_plan=plan, safety=_SAFETY)
+
+    assert "Skipped 1 of 3 rules with empty sources" in caplog.messages
+
+
+def test_process_datadir_with_route_cache_routes_only_changed_lines(tmp_path, caplog):
+    """Second run routes only the changed line, with the same result."""
+    (tmp_path / "input.txt").write_text("alpha\nbeta x\ngamma\n")
+    rules = [
+        _rule("input.txt", "a.txt", "^a"),
+        _rule("input.txt", "x.txt", "x", sortkey=0),
+    ]
+    plan = DatadirPlan(datadir=tmp_path, rules=rules, rulefiles_used=[])
+    performance = PerformanceConfig(route_cache_entries=100)
+
+    process_datadir(datadir_plan=plan, safety=_SAFETY, performance=performance)
+    (tmp_path / "input.txt").write_text("gamma\ndelta x\n")
+    with caplog.at_level("INFO", logger="mklists"):
+        process_datadir(datadir_plan=plan, safety=_SAFETY, performance=performance)
+
+    assert "Routed 1 of 4 lines (3 from route cache)" in caplog.messages
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        ".mklists-route-cache",
+        "a.txt",
+        "input.txt",
+        "x.txt",
+    ]
+    assert (tmp_path / "a.txt").read_text() == "alpha\n"
+    assert (tmp_path / "x.txt").read_text() == "beta x\ndelta x\n"
+
+
+def test_process_datadir_rerun_leaves_datafiles_untouched(tmp_path, caplog):
+    """A run that changes nothing writes no datafile."""
+    (tmp_path / "input.txt").write_text("alpha\nbeta\n")
+    rules = [_rule("input.txt", "a.txt", "^a")]
+    plan = DatadirPlan(datadir=tmp_path, rules=rules, rulefiles_used=[])
+    process_datadir(datadir_plan=plan, safety=_SAFETY)
+    for path in tmp_path.iterdir():
+        os.utime(path, ns=(0, 0))
+
+    with caplog.at_level("INFO", logger="mklists"):
+        process_datadir(datadir_plan=plan, safety=_SAFETY)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt", "input.txt"]
+    assert all(p.stat().st_mtime_ns == 0 for p in tmp_path.iterdir())
+    assert "Datafiles: 0 created, 0 changed, 0 deleted, 2 unchanged" in caplog.messages
+
+
 # ---------------------------------------------------------------------------
 # Safety check integration
 # ---------------------------------------------------------------------------
@@ -121,3 +314,28 @@ def test_process_datadir_raises_on_invalid_filename(tmp_path):
 
     with pytest.raises(SafetyError):
         process_datadir(datadir_plan=plan, safety=safety)
+
+
+def test_process_datadir_interrupted_leaves_datafiles_as_they_were(
+    tmp_path, monkeypatch
+):
+    """An interrupt after lists are staged discards them."""
+    write_all = DatafileReconciler.write_all
+
+    def interrupted_write_all(self, datalines_dict):
+        write_all(self, datalines_dict)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(DatafileReconciler, "write_all", interrupted_write_all)
+    (tmp_path / "input.txt").write_text("alpha\nbeta\n")
+    plan = DatadirPlan(
+        datadir=tmp_path,
+        rules=[_rule("input.txt", "output.txt")],
+        rulefiles_used=[],
+    )
+
+    with pytest.raises(KeyboardInterrupt):
+        process_datadir(datadir_plan=plan, safety=_SAFETY)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["input.txt"]
+    assert (tmp_path / "input.txt").read_text() == "alpha\nbeta\n"
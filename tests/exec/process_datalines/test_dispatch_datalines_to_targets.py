@@ -5,6 +5,7 @@ import re
 import pytest
 from mklists.errors import DataNotFoundError, RulesNotFoundError
 from mklists.rules import Rule
+from mklists.exec import process_datalines
 from mklists.exec.process_datalines import dispatch_datalines_to_targets
 
 
@@ -186,3 +187,107 @@ def test_apply_rules_initializes_all_rule_keys():
     result = dispatch_datalines_to_targets(rules, datalines)
 
     assert set(result.keys()) == {"in", "mid", "out"}
+
+
+def test_apply_rules_reference_engine_gives_same_result():
+    """Reference engine is selectable and agrees with the default engine."""
+    rules = [
+        Rule(
+            source="in",
+            target="out",
+            source_matchpattern=re.compile(r"beta"),
+            source_matchfield=1,
+            target_sortkey=2,
+        )
+    ]
+    datalines = ["beta two\n", "alpha one\n", "beta one\n"]
+
+    result = dispatch_datalines_to_targets(rules, datalines, engine="reference")
+
+    assert result == dispatch_datalines_to_targets(rules, datalines)
+
+
+def test_apply_rules_unknown_engine_raises_value_error():
+    """Unknown dispatch engine raises ValueError."""
+    with pytest.raises(ValueError):
+        dispatch_datalines_to_targets([], ["alpha\n"], engine="bogus")
+
+
+def test_apply_rules_auto_engine_uses_compiled_engine_below_threshold(mocker):
+    """Auto engine uses compiled engine for fewer than VECTORIZED_MIN_LINES lines."""
+    vectorized = mocker.patch("mklists.exec.process_datalines.dispatch_vectorized")
+    rules = [
+        Rule(
+            source_matchfield=0,
+            source_matchpattern=re.compile("a"),
+            source="lines",
+            target="alines",
+            target_sortkey=None,
+        )
+    ]
+    result = dispatch_datalines_to_targets(rules, ["alpha\n", "echo\n"])
+    assert result == {"lines": ["echo\n"], "alines": ["alpha\n"]}
+    vectorized.assert_not_called()
+
+
+def test_apply_rules_auto_engine_flushes_with_numpy_engine(mocker):
+    """Auto engine uses NumPy engine, flushing lists after the last rule."""
+    pytest.importorskip("numpy")
+    mocker.patch("mklists.exec.process_datalines.VECTORIZED_MIN_LINES", 1)
+    vectorized = mocker.spy(process_datalines, "dispatch_vectorized")
+    rules = [
+        Rule(
+            source_matchfield=0,
+            source_matchpattern=re.compile("a"),
+            source="lines",
+            target="alines",
+            target_sortkey=None,
+        )
+    ]
+    flushed = {}
+
+    def flush(listname, lines):
+        flushed[listname] = list(lines)
+
+    result = dispatch_datalines_to_targets(
+        rules,
+        ["alpha", "echo"],
+        last_uses={"lines": 0, "alines": 0},
+        flush=flush,
+    )
+
+    assert result == {}
+    assert flushed == {"lines": ["echo"], "alines": ["alpha"]}
+    vectorized.assert_called_once()
+
+
+def test_apply_rules_auto_engine_sorts_on_disk_above_memory_limit(tmp_path, mocker):
+    """Auto engine honors sort memory limit even with NumPy and many lines."""
+    pytest.importorskip("numpy")
+    from mklists.exec.dispatch_numpy import VECTORIZED_MIN_LINES
+    from mklists.exec.external_sort import SpilledLines
+
+    vectorized = mocker.patch("mklists.exec.process_datalines.dispatch_vectorized")
+    rules = [
+        Rule(
+            source_matchfield=0,
+            source_matchpattern=re.compile("."),
+            source="lines",
+            target="sorted",
+            target_sortkey=2,
+        )
+    ]
+    datalines = [f"line {n % 1000:03d} {n}" for n in range(VECTORIZED_MIN_LINES)]
+
+    result = dispatch_datalines_to_targets(
+        rules,
+        list(datalines),
+        sort_memory_limit=2**20,
+        spill_dir=tmp_path,
+    )
+
+    vectorized.assert_not_called()
+    assert isinstance(result["sorted"], SpilledLines)
+    assert list(result["sorted"]) == sorted(
+        datalines, key=lambda line: line.split(maxsplit=1)[1]
+    )
@@ -0,0 +1,31 @@
+"""Tests $MKLMKL/exec/reconcile.py"""
+
+import pytest
+from mklists.exec.reconcile import _text_chunks
+
+
+@pytest.mark.parametrize("line_length", [1, 10, 300])
+def test_text_chunks_are_near_buffer_size(line_length):
+    """Chunks hold all lines, with newlines, in chunks near the buffer size."""
+    lines = [f"{i:0{line_length}d}"[-line_length:] for i in range(5000)]
+
+    chunks = list(_text_chunks(lines, buffer_size=4096))
+
+    assert "".join(chunks) == "".join(f"{line}\n" for line in lines)
+    assert all(len(chunk) <= 2 * 4096 for chunk in chunks[1:])
+    assert len(chunks) <= 2 * (len(lines) * (line_length + 1) // 4096 + 1)
+
+
+def test_text_chunks_lines_longer_than_buffer_are_not_split():
+    """Lines longer than the buffer size are written one per chunk."""
+    lines = [str(i) * 1000 for i in range(100)]
+
+    chunks = list(_text_chunks(lines, buffer_size=256))
+
+    assert "".join(chunks) == "".join(f"{line}\n" for line in lines)
+    assert chunks[1:] == [f"{line}\n" for line in lines[16:]]
+
+
+def test_text_chunks_of_no_lines():
+    """No lines give no chunks."""
+    assert list(_text_chunks([], buffer_size=4096)) == []
@@ -0,0 +1,88 @@
+"""Tests $MKLMKL/exec/reconcile.py"""
+
+import os
+from mklists.exec.reconcile import (
+    DatafileReconciler,
+    ReconcileCounts,
+    datafile_state,
+)
+
+OLD_MTIME_NS = 1_000_000_000_000_000_000
+
+
+def _datadir(tmp_path, files):
+    """Write files with an old mtime, returning their states as when read."""
+    states = {}
+    for name, data in files.items():
+        path = tmp_path / name
+        path.write_bytes(data)
+        os.utime(path, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+        states[name] = datafile_state(data)
+    return states
+
+
+def test_datafile_reconciler_writes_new_files(tmp_path):
+    """Lists without datafiles are written, each line with a newline."""
+    reconciler = DatafileReconciler(tmp_path, {})
+
+    reconciler.write_all({"b.txt": ["b1"], "a.txt": ["a1", "a2"], "c.txt": []})
+
+    assert reconciler.finish() == ReconcileCounts(created=2)
+    assert (tmp_path / "a.txt").read_text() == "a1\na2\n"
+    assert (tmp_path / "b.txt").read_text() == "b1\n"
+    assert not (tmp_path / "c.txt").exists()
+
+
+def test_datafile_reconciler_leaves_unchanged_files_untouched(tmp_path):
+    """Files whose content would not change are not written."""
+    states = _datadir(tmp_path, {"a.txt": "alpha\nbéta\n".encode()})
+    reconciler = DatafileReconciler(tmp_path, states)
+
+    reconciler.write("a.txt", ["alpha", "béta"])
+
+    assert reconciler.finish() == ReconcileCounts(unchanged=1)
+    assert (tmp_path / "a.txt").stat().st_mtime_ns == OLD_MTIME_NS
+
+
+def test_datafile_reconciler_rewrites_changed_files(tmp_path):
+    """Files are rewritten if content differs, even if size does not."""
+    states = _datadir(
+        tmp_path,
+        {"same_size.txt": b"alpha\n", "longer.txt": b"a\n", "crlf.txt": b"a\r\n"},
+    )
+    reconciler = DatafileReconciler(tmp_path, states)
+
+    reconciler.write_all(
+        {"same_size.txt": ["alphb"], "longer.txt": ["a", "b"], "crlf.txt": ["a"]}
+    )
+
+    assert reconciler.finish() == ReconcileCounts(changed=3)
+    assert (tmp_path / "same_size.txt").read_text() == "alphb\n"
+    assert (tmp_path / "longer.txt").read_text() == "a\nb\n"
+    assert (tmp_path / "crlf.txt").read_bytes() == b"a\n"
+
+
+def test_datafile_reconciler_finish_deletes_vanished_files(tmp_path):
+    """Datafiles for which no lines were written are deleted; others are not."""
+    states = _datadir(tmp_path, {"a.txt": b"a\n", "b.txt": b"b\n", "c.txt": b"c\n"})
+    (tmp_path / ".rules").write_text("rules\n")
+    reconciler = DatafileReconciler(tmp_path, states)
+
+    reconciler.write("b.txt", ["b"])
+    reconciler.write("c.txt", [])
+
+    assert reconciler.finish() == ReconcileCounts(unchanged=1, deleted=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".rules", "b.txt"]
+
+
+def test_datafile_reconciler_stages_lists_until_finish(tmp_path):
+    """Datafiles are unchanged until finish, and abort discards staged lists."""
+    states = _datadir(tmp_path, {"a.txt": b"a\n", "b.txt": b"b\n"})
+    reconciler = DatafileReconciler(tmp_path, states)
+
+    reconciler.write_all({"a.txt": ["a", "a2"], "c.txt": ["c"]})
+
+    assert (tmp_path / "a.txt").read_text() == "a\n"
+    assert not (tmp_path / "c.txt").exists()
+    reconciler.abort()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt", "b.txt"]
@@ -0,0 +1,88 @@
+"""Tests $MKLMKL/exec/reconcile.py"""
+
+import json
+import pytest
+from mklists.errors import SafetyError
+from mklists.exec.reconcile import (
+    JOURNAL_FILE_NAME,
+    STAGING_DIR_NAME,
+    recover_datadir,
+)
+
+
+def _interrupted(tmp_path, journal):
+    """Datadir in which a rewrite of a.txt and b.txt, deleting c.txt, stopped."""
+    for name in ["a.txt", "b.txt", "c.txt"]:
+        (tmp_path / name).write_text(f"old {name}\n")
+    staging_dir = tmp_path / STAGING_DIR_NAME
+    staging_dir.mkdir()
+    (staging_dir / "b.txt").write_text("new b.txt\n")
+    (tmp_path / "a.txt").write_text("new a.txt\n")
+    if journal is not None:
+        (tmp_path / JOURNAL_FILE_NAME).write_text(journal)
+
+
+def test_recover_datadir_rolls_forward_committed_rewrite(tmp_path):
+    """Rewrite is completed if its journal is in place."""
+    journal = {"format": 1, "replace": ["a.txt", "b.txt"], "delete": ["c.txt"]}
+    _interrupted(tmp_path, json.dumps(journal))
+
+    assert recover_datadir(tmp_path) == "rolled forward"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt", "b.txt"]
+    assert (tmp_path / "a.txt").read_text() == "new a.txt\n"
+    assert (tmp_path / "b.txt").read_text() == "new b.txt\n"
+
+
+def test_recover_datadir_rolls_back_uncommitted_rewrite(tmp_path):
+    """Staged lists are discarded if there is no journal."""
+    (tmp_path / "a.txt").write_text("a\n")
+    (tmp_path / STAGING_DIR_NAME).mkdir()
+    (tmp_path / STAGING_DIR_NAME / "a.txt").write_text("new a\n")
+
+    assert recover_datadir(tmp_path) == "rolled back"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt"]
+    assert (tmp_path / "a.txt").read_text() == "a\n"
+
+
+def test_recover_datadir_deletes_unfinished_journals(tmp_path):
+    """Journals interrupted before being renamed into place are deleted."""
+    (tmp_path / "a.txt").write_text("a\n")
+    (tmp_path / f"{JOURNAL_FILE_NAME}-x1y2z3").write_text('{"format": 1')
+
+    assert recover_datadir(tmp_path) == "rolled back"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt"]
+
+
+def test_recover_datadir_rolls_forward_and_deletes_unfinished_journals(tmp_path):
+    """Unfinished journals left beside a committed journal are deleted too."""
+    journal = {"format": 1, "replace": ["a.txt", "b.txt"], "delete": ["c.txt"]}
+    _interrupted(tmp_path, json.dumps(journal))
+    (tmp_path / f"{JOURNAL_FILE_NAME}-x1y2z3").write_text("")
+
+    assert recover_datadir(tmp_path) == "rolled forward"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt", "b.txt"]
+
+
+def test_recover_datadir_with_nothing_to_recover(tmp_path):
+    """Datadir without staged lists or journal is left alone."""
+    (tmp_path / "a.txt").write_text("a\n")
+
+    assert recover_datadir(tmp_path) is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt"]
+
+
+@pytest.mark.parametrize(
+    "journal",
+    [
+        "",
+        '{"format": 2, "replace": [], "delete": []}',
+        '{"format": 1, "replace": ["../a.txt"], "delete": []}',
+    ],
+)
+def test_recover_datadir_unreadable_journal_raises(tmp_path, journal):
+    """Datadir is left for inspection if its journal cannot be read."""
+    _interrupted(tmp_path, journal)
+
+    with pytest.raises(SafetyError):
+        recover_datadir(tmp_path)
+    assert (tmp_path / JOURNAL_FILE_NAME).exists()
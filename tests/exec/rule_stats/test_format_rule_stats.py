@@ -0,0 +1,49 @@
+"""Tests $MKLMKL/exec/rule_stats.py"""
+
+from pathlib import Path
+import re
+from mklists.exec.dispatch import RuleStats
+from mklists.exec.rule_stats import (
+    DatadirRuleStats,
+    costliest_rules,
+    format_rule_stats,
+)
+from mklists.rules import Rule
+
+
+def _stats(lineno, match_seconds, sort_seconds=0.0):
+    rule = Rule(
+        0,
+        re.compile("x"),
+        "lines",
+        f"t{lineno}.txt",
+        None,
+        rulefile=Path("/d/.rules"),
+        lineno=lineno,
+    )
+    return RuleStats(rule, 10, 1, match_seconds, sort_seconds)
+
+
+def test_costliest_rules_orders_by_total_time():
+    """Rules are ordered by match plus sort time; ties keep rule order."""
+    rule_stats = [_stats(1, 0.1), _stats(2, 0.1, 0.3), _stats(3, 0.2), _stats(4, 0.2)]
+
+    top = costliest_rules(rule_stats, 3)
+
+    assert [entry.rule.lineno for entry in top] == [2, 3, 4]
+
+
+def test_format_rule_stats_lists_top_rules_by_location():
+    """Table lists at most top rules, each by rule file and line number."""
+    datadir_rule_stats = DatadirRuleStats(
+        datadir=Path("/d"),
+        pass_number=1,
+        rules_skipped=2,
+        rule_stats=[_stats(1, 0.25), _stats(5, 0.5)],
+    )
+
+    lines = format_rule_stats(datadir_rule_stats, top=1)
+
+    assert lines[0] == "Rule stats for /d (pass 1): 2 rules, 2 skipped, 0.750000s"
+    assert len(lines) == 3
+    assert lines[2].endswith("/d/.rules:5 (lines -> t5.txt)")
@@ -0,0 +1,45 @@
+"""Tests $MKLMKL/exec/rule_stats.py"""
+
+import json
+from pathlib import Path
+import re
+from mklists.exec.dispatch import RuleStats
+from mklists.exec.rule_stats import DatadirRuleStats, rule_stats_to_json
+from mklists.rules import Rule
+
+
+def test_rule_stats_to_json_records_every_rule():
+    """JSON document has format version and counters of every rule."""
+    rule = Rule(1, re.compile("^a"), "lines", "a.txt", 0)
+    datadir_rule_stats = DatadirRuleStats(
+        datadir=Path("/d"),
+        pass_number=2,
+        rules_skipped=0,
+        rule_stats=[RuleStats(rule, 4, 2, 0.5, 0.25)],
+    )
+
+    document = json.loads(rule_stats_to_json([datadir_rule_stats]))
+
+    assert document == {
+        "version": 1,
+        "datadirs": [
+            {
+                "datadir": "/d",
+                "pass": 2,
+                "rules_skipped": 0,
+                "rules": [
+                    {
+                        "rulefile": None,
+                        "lineno": None,
+                        "source": "lines",
+                        "target": "a.txt",
+                        "pattern": "^a",
+                        "lines_examined": 4,
+                        "lines_matched": 2,
+                        "match_seconds": 0.5,
+                        "sort_seconds": 0.25,
+                    }
+                ],
+            }
+        ],
+    }
@@ -0,0 +1,160 @@
+"""Tests $MKLMKL/exec/run.py"""
+
+from dataclasses import replace
+import logging
+import time
+import pytest
+from mklists.config.model import PerformanceConfig, SafetyConfig
+from mklists.errors import SafetyError
+from mklists.exec import run as run_module
+from mklists.exec.run import run_mklists
+from mklists.logging import logger
+from mklists.plan.model import DatadirPlan, PassPlan, RunPlan
+from mklists.rules.load import load_rules_for_datadir
+
+NAMES = ["a", "b", "c", "d"]
+
+
+def _run_plan(tmp_path, jobs):
+    datadir_plans = []
+    for name in NAMES:
+        datadir = tmp_path / name
+        datadir.mkdir()
+        rulefile = datadir / ".rules"
+        rulefile.write_text("0|^x|input.txt|x.txt|\n")
+        (datadir / "input.txt").write_text(f"x {name}\ny {name}\n")
+        datadir_plans.append(
+            DatadirPlan(
+                datadir=datadir,
+                rules=load_rules_for_datadir([rulefile]),
+                rulefiles_used=[rulefile],
+            )
+        )
+    return RunPlan(
+        pass_plans=[PassPlan(snapshot_dir=None, snapshot_datatree_configfiles=[])],
+        datadir_plans=datadir_plans,
+        skipped_datadirs=[],
+        routing_dict={},
+        linkify_md_dir=None,
+        linkify_html_dir=None,
+        is_datatree_root=True,
+        safety=SafetyConfig(invalid_filename_patterns=[]),
+        backup=None,
+        performance=PerformanceConfig(jobs=jobs),
+    )
+
+
+def _slowed_process_datadir(monkeypatch):
+    """Make earlier datadirs take longer, so that later ones finish first."""
+    process_datadir = run_module.process_datadir
+
+    def slowed(*, datadir_plan, **kwargs):
+        time.sleep(0.02 * (len(NAMES) - NAMES.index(datadir_plan.datadir.name)))
+        logger.info(f"done {datadir_plan.datadir.name}")
+        return process_datadir(datadir_plan=datadir_plan, **kwargs)
+
+    monkeypatch.setattr(run_module, "process_datadir", slowed)
+
+
+def test_run_mklists_jobs_process_datadirs_as_one_job_does(tmp_path):
+    """Datadirs processed concurrently end up as if processed one by one."""
+    run_mklists(_run_plan(tmp_path, jobs=3))
+
+    for name in NAMES:
+        assert (tmp_path / name / "x.txt").read_text() == f"x {name}\n"
+        assert (tmp_path / name / "input.txt").read_text() == f"y {name}\n"
+
+
+def test_run_mklists_jobs_log_in_plan_order(tmp_path, monkeypatch, caplog):
+    """Logs of datadirs processed concurrently are in plan order."""
+    _slowed_process_datadir(monkeypatch)
+
+    with caplog.at_level(logging.INFO, logger="mklists"):
+        run_mklists(_run_plan(tmp_path, jobs=4))
+
+    done = [message for message in caplog.messages if message.startswith("done ")]
+    assert done == [f"done {name}" for name in NAMES]
+    paths = [str(tmp_path / name) for name in NAMES]
+    assert [message for message in caplog.messages if message in paths] == paths
+
+
+def test_run_mklists_jobs_raise_first_error_in_plan_order(tmp_path, monkeypatch):
+    """If several datadirs fail, the error of the first in plan order is raised."""
+    _slowed_process_datadir(monkeypatch)
+    run_plan = _run_plan(tmp_path, jobs=4)
+    for name in ["b", "d"]:
+        (tmp_path / name / "input.txt").write_text("x\n\ny\n")
+
+    with pytest.raises(SafetyError, match=str(tmp_path / "b")):
+        run_mklists(run_plan)
+
+    assert (tmp_path / "b" / "input.txt").read_text() == "x\n\ny\n"
+
+
+def test_run_mklists_jobs_start_no_datadir_after_error(tmp_path):
+    """Datadirs not started when one fails are left as they were."""
+    run_plan = _run_plan(tmp_path, jobs=2)
+    (tmp_path / "a" / "input.txt").write_text("x\n\ny\n")
+    (tmp_path / "b" / "input.txt").write_text("x\n\ny\n")
+
+    with pytest.raises(SafetyError, match=str(tmp_path / "a")):
+        run_mklists(run_plan)
+
+    for name in ["c", "d"]:
+        assert not (tmp_path / name / "x.txt").exists()
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_run_mklists_generates_each_router_once(tmp_path, monkeypatch, jobs):
+    """Routing function of each rule chain is generated once, then reused."""
+    run_plan = _run_plan(tmp_path, jobs=jobs)
+    run_plan = replace(run_plan, pass_plans=run_plan.pass_plans * 2)
+    generated = []
+    routers_used = []
+    generate_router = run_module.generate_router
+    process_datadir = run_module.process_datadir
+
+    def recording_generate_router(rules):
+        generated.append(rules)
+        return generate_router(rules)
+
+    def recording_process_datadir(*, router, **kwargs):
+        routers_used.append(router)
+        return process_datadir(router=router, **kwargs)
+
+    monkeypatch.setattr(run_module, "generate_router", recording_generate_router)
+    monkeypatch.setattr(run_module, "process_datadir", recording_process_datadir)
+
+    run_mklists(run_plan)
+
+    assert len(generated) == 1
+    assert len(routers_used) == 2 * len(NAMES)
+    assert len({id(router) for router in routers_used}) == 1
+
+
+def test_run_mklists_generates_router_for_each_distinct_rule_chain(
+    tmp_path, monkeypatch
+):
+    """Datadirs whose rules differ are each given a router of their own."""
+    run_plan = _run_plan(tmp_path, jobs=2)
+    rulefile = tmp_path / "a" / ".rules"
+    rulefile.write_text("0|^y|input.txt|y.txt|\n")
+    datadir_plans = [
+        replace(run_plan.datadir_plans[0], rules=load_rules_for_datadir([rulefile])),
+        *run_plan.datadir_plans[1:],
+    ]
+    run_plan = replace(run_plan, datadir_plans=datadir_plans)
+    generated = []
+    generate_router = run_module.generate_router
+
+    def recording_generate_router(rules):
+        generated.append(rules)
+        return generate_router(rules)
+
+    monkeypatch.setattr(run_module, "generate_router", recording_generate_router)
+
+    run_mklists(run_plan)
+
+    assert sorted(rules[0].target for rules in generated) == ["x.txt", "y.txt"]
+    assert (tmp_path / "a" / "y.txt").read_text() == "y a\n"
+    assert (tmp_path / "b" / "x.txt").read_text() == "x b\n"
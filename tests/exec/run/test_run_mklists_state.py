@@ -0,0 +1,88 @@
+"""Tests $MKLMKL/exec/run.py"""
+
+import logging
+import os
+from mklists.config.model import SafetyConfig
+from mklists.exec.run import run_mklists
+from mklists.plan.model import DatadirPlan, PassPlan, RunPlan, StatePlan
+from mklists.rules.load import load_rules_for_datadir
+
+
+def _run_plan(tmp_path, names):
+    datadir_plans = []
+    for name in names:
+        datadir = tmp_path / name
+        datadir.mkdir(exist_ok=True)
+        rulefile = datadir / ".rules"
+        if not rulefile.exists():
+            rulefile.write_text("0|^a|input.txt|a.txt|\n")
+            (datadir / "input.txt").write_text("alpha\nbeta\n")
+        datadir_plans.append(
+            DatadirPlan(
+                datadir=datadir,
+                rules=load_rules_for_datadir([rulefile]),
+                rulefiles_used=[rulefile],
+            )
+        )
+    return RunPlan(
+        pass_plans=[PassPlan(snapshot_dir=None, snapshot_datatree_configfiles=[])],
+        datadir_plans=datadir_plans,
+        skipped_datadirs=[],
+        routing_dict={},
+        linkify_md_dir=None,
+        linkify_html_dir=None,
+        is_datatree_root=True,
+        safety=SafetyConfig(invalid_filename_patterns=[]),
+        backup=None,
+        state=StatePlan(state_file=tmp_path / ".mklists-state", configfiles=[]),
+    )
+
+
+def test_run_mklists_skips_run_if_nothing_changed(tmp_path, caplog):
+    """Second run of an unchanged datatree does nothing."""
+    run_plan = _run_plan(tmp_path, ["x", "y"])
+    run_mklists(run_plan)
+    assert (tmp_path / ".mklists-state").is_file()
+
+    with caplog.at_level(logging.INFO, logger="mklists"):
+        run_mklists(run_plan)
+
+    assert "No datadir has changed since the last run" in caplog.messages
+    assert (tmp_path / "x" / "a.txt").read_text() == "alpha\n"
+
+
+def test_run_mklists_skips_only_unchanged_datadirs(tmp_path, caplog):
+    """A changed datadir is processed, and unchanged ones are skipped."""
+    run_plan = _run_plan(tmp_path, ["x", "y"])
+    run_mklists(run_plan)
+    (tmp_path / "y" / "input.txt").write_text("beta\nanother\n")
+
+    with caplog.at_level(logging.INFO, logger="mklists"):
+        run_mklists(run_plan)
+
+    assert f"{tmp_path / 'x'} unchanged since the last run" in caplog.messages
+    assert f"{tmp_path / 'y'} unchanged since the last run" not in caplog.messages
+    assert (tmp_path / "y" / "a.txt").read_text() == "alpha\nanother\n"
+
+
+def test_run_mklists_processes_all_datadirs_if_rules_change(tmp_path, caplog):
+    """Changed rules make a datadir changed."""
+    run_plan = _run_plan(tmp_path, ["x"])
+    run_mklists(run_plan)
+    (tmp_path / "x" / ".rules").write_text("0|^b|input.txt|b.txt|\n")
+    run_plan = _run_plan(tmp_path, ["x"])
+
+    run_mklists(run_plan)
+
+    assert (tmp_path / "x" / "b.txt").read_text() == "beta\n"
+
+
+def test_run_mklists_refreshes_state_of_touched_files(tmp_path):
+    """State of files touched but unchanged is saved, so they are not read again."""
+    run_plan = _run_plan(tmp_path, ["x"])
+    run_mklists(run_plan)
+    os.utime(tmp_path / "x" / "a.txt", ns=(0, 0))
+
+    run_mklists(run_plan)
+
+    assert '"a.txt": [\n     6,\n     0,' in (tmp_path / ".mklists-state").read_text()
@@ -0,0 +1,48 @@
+"""Tests $MKLMKL/exec/safety.py"""
+
+import os
+import pytest
+from mklists.errors import SafetyError
+from mklists.exec.safety import _check_entry_is_regular_file
+from mklists.exec.snapshot import take_dir_snapshot
+
+
+def _entry(dirpath, name):
+    return take_dir_snapshot(dirpath).entries[name]
+
+
+def test_regular_readable_file_passes(tmp_path):
+    """File is a regular file."""
+    (tmp_path / "a.txt").write_text("a\n")
+
+    _check_entry_is_regular_file(_entry(tmp_path, "a.txt"))
+
+
+def test_check_file_is_regular_file_even_if_hidden(tmp_path):
+    """File is a regular file even if hidden (just FYI...)."""
+    (tmp_path / ".rules").write_text("x\n")
+
+    _check_entry_is_regular_file(_entry(tmp_path, ".rules"))
+
+
+def test_directory_fails(tmp_path):
+    """Directory is not a regular file, raise SafetyError."""
+    (tmp_path / "subdir").mkdir()
+
+    with pytest.raises(SafetyError) as exc:
+        _check_entry_is_regular_file(_entry(tmp_path, "subdir"))
+
+    assert "is not a regular file" in str(exc.value)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="symlink semantics differ on Windows")
+def test_check_directory_contents_rejects_symlink(tmp_path):
+    """Symlink is not a regular file, raise SafetyError."""
+    target = tmp_path / "target.txt"
+    target.write_text("x\n")
+    (tmp_path / "link.txt").symlink_to(target)
+
+    with pytest.raises(SafetyError) as exc:
+        _check_entry_is_regular_file(_entry(tmp_path, "link.txt"))
+
+    assert "is a symlink" in str(exc.value)
@@ -0,0 +1,40 @@
+"""Tests $MKLMKL/exec/safety.py"""
+
+import mmap
+from mklists.exec.safety import datafile_bytes
+
+
+def test_datafile_bytes_reads_files_below_threshold(tmp_path):
+    """Files smaller than the threshold are read in one call."""
+    datafile = tmp_path / "data.txt"
+    datafile.write_bytes(b"a\nb\n")
+
+    with datafile_bytes(datafile, mmap_threshold=5) as data:
+        assert data == b"a\nb\n"
+        assert isinstance(data, bytes)
+
+
+def test_datafile_bytes_maps_files_from_threshold(tmp_path):
+    """Files of at least the threshold are mapped until exit."""
+    datafile = tmp_path / "data.txt"
+    datafile.write_bytes(b"a\nb\n")
+
+    with datafile_bytes(datafile, mmap_threshold=4) as data:
+        assert isinstance(data, mmap.mmap)
+        assert data[:] == b"a\nb\n"
+    assert data.closed
+
+
+def test_datafile_bytes_never_maps_if_no_threshold_or_empty(tmp_path):
+    """Files are read if threshold is None (the default), as are empty files."""
+    datafile = tmp_path / "data.txt"
+    datafile.write_bytes(b"a\n")
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+
+    with datafile_bytes(datafile, mmap_threshold=None) as data:
+        assert data == b"a\n"
+    with datafile_bytes(datafile) as data:
+        assert isinstance(data, bytes)
+    with datafile_bytes(empty, mmap_threshold=1) as data:
+        assert data == b""
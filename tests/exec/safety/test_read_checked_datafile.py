@@ -0,0 +1,60 @@
+"""Tests $MKLMKL/exec/safety.py"""
+
+import pytest
+from mklists.errors import SafetyError
+from mklists.exec.safety import read_checked_datafile
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"",
+        b"alpha\n",
+        b"alpha\nbeta\n",
+        b"alpha\nbeta",
+        b"alpha\r\nbeta\r\n",
+        b"alpha\rbeta\n",
+        b"caf\xc3\xa9 \xe2\x80\xa8 x\n",
+        b"alpha\x0bbeta\x0cgamma\n",
+    ],
+)
+def test_read_checked_datafile_reads_lines_as_text_mode_does(tmp_path, content):
+    """Lines are split as by reading the file in text mode."""
+    p = tmp_path / "data.txt"
+    p.write_bytes(content)
+    with p.open(encoding="utf-8") as f:
+        expected = [line.rstrip("\n") for line in f]
+
+    assert read_checked_datafile(p) == expected
+
+
+@pytest.mark.parametrize(
+    "content, lineno",
+    [
+        (b"\n", 1),
+        (b"alpha\n\n", 2),
+        (b"alpha\n \t\nbeta\n", 2),
+        (b"alpha\r\n\r\nbeta\r\n", 2),
+        (b"alpha\nbeta\n  ", 3),
+        (b"alpha\n\xe2\x80\x83\n", 2),
+    ],
+)
+def test_read_checked_datafile_blank_line_fails(tmp_path, content, lineno):
+    """Blank or whitespace-only lines are reported with their line number."""
+    p = tmp_path / "data.txt"
+    p.write_bytes(content)
+
+    with pytest.raises(SafetyError) as exc:
+        read_checked_datafile(p)
+
+    assert str(exc.value) == (
+        f"{p}: has blank or whitespace-only line at line {lineno}"
+    )
+
+
+def test_read_checked_datafile_nul_after_scanned_bytes_passes(tmp_path):
+    """Only the first 8 KB are scanned for NUL bytes, as before."""
+    p = tmp_path / "data.txt"
+    p.write_bytes(b"x" * 8192 + b"\x00\n")
+
+    assert read_checked_datafile(p) == ["x" * 8192 + "\x00"]
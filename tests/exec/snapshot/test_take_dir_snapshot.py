@@ -0,0 +1,58 @@
+"""Tests $MKLMKL/exec/snapshot.py"""
+
+import os
+import pytest
+from mklists.exec.snapshot import take_dir_snapshot
+
+
+def test_take_dir_snapshot_lists_entries_in_order_of_name(tmp_path):
+    """All entries, hidden ones included, are listed by name."""
+    (tmp_path / "b.txt").write_text("b\n")
+    (tmp_path / ".rules").write_text("x\n")
+    (tmp_path / "a.txt").write_text("a\n")
+    (tmp_path / "subdir").mkdir()
+
+    dir_snapshot = take_dir_snapshot(tmp_path)
+
+    assert list(dir_snapshot.entries) == [".rules", "a.txt", "b.txt", "subdir"]
+    assert "a.txt" in dir_snapshot
+    assert "c.txt" not in dir_snapshot
+    assert [e.name for e in dir_snapshot.visible_entries()] == [
+        "a.txt",
+        "b.txt",
+        "subdir",
+    ]
+
+
+def test_take_dir_snapshot_datafiles_are_visible_files(tmp_path):
+    """Datafiles are visible files, as paths under the directory."""
+    (tmp_path / "b.txt").write_text("b\n")
+    (tmp_path / ".rules").write_text("x\n")
+    (tmp_path / "a.txt").write_text("a\n")
+    (tmp_path / "subdir").mkdir()
+
+    assert take_dir_snapshot(tmp_path).datafiles() == [
+        tmp_path / "a.txt",
+        tmp_path / "b.txt",
+    ]
+
+
+def test_take_dir_snapshot_is_not_updated(tmp_path):
+    """Files created after the snapshot was taken are not listed."""
+    (tmp_path / "a.txt").write_text("a\n")
+    dir_snapshot = take_dir_snapshot(tmp_path)
+    (tmp_path / "b.txt").write_text("b\n")
+
+    assert dir_snapshot.datafiles() == [tmp_path / "a.txt"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="symlink semantics differ on Windows")
+def test_take_dir_snapshot_entries_know_symlinks(tmp_path):
+    """Entry types come from the listing, without following symlinks."""
+    (tmp_path / "target.txt").write_text("x\n")
+    (tmp_path / "link.txt").symlink_to(tmp_path / "target.txt")
+
+    entry = take_dir_snapshot(tmp_path).entries["link.txt"]
+
+    assert entry.is_symlink()
+    assert not entry.is_file(follow_symlinks=False)
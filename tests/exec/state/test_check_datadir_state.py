@@ -0,0 +1,130 @@
+"""Tests $MKLMKL/exec/state.py"""
+
+import os
+import pytest
+from mklists.exec.snapshot import take_dir_snapshot
+from mklists.exec.state import (
+    RACY_WINDOW_NS,
+    RunState,
+    check_datadir_state,
+    files_digest,
+    has_racy_files,
+    load_run_state,
+    record_datadir_state,
+    save_run_state,
+)
+
+OLD_MTIME_NS = 1_000_000_000_000_000_000
+
+
+def _recorded(datadir, recorded_ns=None):
+    """Write two datafiles with an old mtime and return their recorded state."""
+    (datadir / ".rules").write_text("0|.|a.txt|b.txt|\n")
+    for name, text in [("a.txt", "alpha\n"), ("b.txt", "beta\n")]:
+        (datadir / name).write_text(text)
+        os.utime(datadir / name, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+    if recorded_ns is None:
+        recorded_ns = OLD_MTIME_NS + 10 * RACY_WINDOW_NS
+    return record_datadir_state(take_dir_snapshot(datadir), "rules", recorded_ns)
+
+
+def test_check_datadir_state_unchanged(tmp_path):
+    """Datadir with the same files, sizes and mtimes is unchanged."""
+    recorded = _recorded(tmp_path)
+
+    assert check_datadir_state(take_dir_snapshot(tmp_path), recorded, "rules") == (
+        recorded
+    )
+    assert not has_racy_files(recorded)
+
+
+def test_check_datadir_state_touched_file_is_unchanged(tmp_path):
+    """A file touched without being changed is compared by digest."""
+    recorded = _recorded(tmp_path)
+    os.utime(tmp_path / "a.txt", ns=(OLD_MTIME_NS + 1, OLD_MTIME_NS + 1))
+
+    current = check_datadir_state(take_dir_snapshot(tmp_path), recorded, "rules")
+
+    assert current is not None
+    assert current.files["a.txt"].mtime_ns == OLD_MTIME_NS + 1
+    assert current.files["a.txt"].digest == recorded.files["a.txt"].digest
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda d: (d / "a.txt").write_text("alphb\n"),
+        lambda d: (d / "a.txt").write_text("alpha beta\n"),
+        lambda d: (d / "c.txt").write_text("gamma\n"),
+        lambda d: (d / "b.txt").unlink(),
+        lambda d: (d / "sub").mkdir(),
+    ],
+)
+def test_check_datadir_state_changed(tmp_path, change):
+    """Changed, added or removed datafiles make a datadir changed."""
+    recorded = _recorded(tmp_path)
+    change(tmp_path)
+
+    assert check_datadir_state(take_dir_snapshot(tmp_path), recorded, "rules") is None
+
+
+def test_check_datadir_state_changed_rules(tmp_path):
+    """A datadir whose rules have changed is changed."""
+    recorded = _recorded(tmp_path)
+
+    assert check_datadir_state(take_dir_snapshot(tmp_path), recorded, "new") is None
+
+
+def test_check_datadir_state_racy_file_is_compared_by_digest(tmp_path):
+    """A same-size change that left the mtime as recorded is found if racy."""
+    recorded = _recorded(tmp_path, recorded_ns=OLD_MTIME_NS + 1)
+    (tmp_path / "a.txt").write_text("alphb\n")
+    os.utime(tmp_path / "a.txt", ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+
+    assert has_racy_files(recorded)
+    assert check_datadir_state(take_dir_snapshot(tmp_path), recorded, "rules") is None
+
+
+def test_check_datadir_state_empty_datadir_is_never_unchanged(tmp_path):
+    """A datadir without datafiles is processed, to report that it is empty."""
+    recorded = record_datadir_state(take_dir_snapshot(tmp_path), "rules", 0)
+
+    assert check_datadir_state(take_dir_snapshot(tmp_path), recorded, "rules") is None
+
+
+def test_run_state_save_and_load_round_trip(tmp_path):
+    """State is saved with datadirs relative to the state file, and loaded."""
+    datadir = tmp_path / "a"
+    datadir.mkdir()
+    run_state = RunState(
+        config_digest=files_digest([]),
+        datadirs={datadir: _recorded(datadir)},
+    )
+
+    save_run_state(tmp_path / ".mklists-state", run_state)
+
+    assert '"a": {' in (tmp_path / ".mklists-state").read_text()
+    assert load_run_state(tmp_path / ".mklists-state") == run_state
+
+
+@pytest.mark.parametrize("umask", [0o022, 0o077])
+def test_run_state_file_mode_follows_umask(tmp_path, umask):
+    """State file gets the mode given by the umask, as other files written."""
+    previous = os.umask(umask)
+    try:
+        save_run_state(
+            tmp_path / ".mklists-state", RunState(config_digest="", datadirs={})
+        )
+    finally:
+        os.umask(previous)
+
+    assert (tmp_path / ".mklists-state").stat().st_mode & 0o777 == 0o666 & ~umask
+
+
+@pytest.mark.parametrize("content", [None, "", "{}", '{"format": 0}', "[1]"])
+def test_load_run_state_unusable_file_gives_none(tmp_path, content):
+    """Missing, corrupt or outdated state files are ignored."""
+    if content is not None:
+        (tmp_path / ".mklists-state").write_text(content)
+
+    assert load_run_state(tmp_path / ".mklists-state") is None
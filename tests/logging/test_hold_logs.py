@@ -0,0 +1,31 @@
+"""Tests $MKLMKL/logging.py"""
+
+import logging
+import threading
+from mklists.logging import hold_logs, logger, replay_logs
+
+
+def test_hold_logs_holds_records_until_replayed(caplog):
+    """Records logged while holding are handled only when replayed."""
+    with caplog.at_level(logging.INFO, logger="mklists"):
+        with hold_logs() as records:
+            logger.info("held")
+        logger.info("not held")
+
+        assert caplog.messages == ["not held"]
+        replay_logs(records)
+
+    assert caplog.messages == ["not held", "held"]
+
+
+def test_hold_logs_holds_records_of_current_thread_only(caplog):
+    """Records logged by other threads are handled as usual."""
+    with caplog.at_level(logging.INFO, logger="mklists"):
+        with hold_logs() as records:
+            thread = threading.Thread(target=logger.info, args=["other thread"])
+            thread.start()
+            thread.join()
+            logger.info("held")
+
+    assert caplog.messages == ["other thread"]
+    assert [record.getMessage() for record in records] == ["held"]
@@ -0,0 +1,37 @@
+"""Tests for _resolve_list_last_uses."""
+
+import re
+from mklists.plan.resolve import _resolve_list_last_uses
+from mklists.rules import Rule
+
+
+def _rule(source, target):
+    return Rule(
+        source_matchfield=0,
+        source_matchpattern=re.compile("."),
+        source=source,
+        target=target,
+        target_sortkey=None,
+    )
+
+
+def test_resolve_list_last_uses_as_source_or_target():
+    """Last use of a list is the last rule reading from or writing to it."""
+    rules = [
+        _rule("lines", "now"),
+        _rule("now", "later"),
+        _rule("lines", "archive"),
+        _rule("later", "now"),
+    ]
+
+    assert _resolve_list_last_uses(rules) == {
+        "lines": 2,
+        "now": 3,
+        "later": 3,
+        "archive": 2,
+    }
+
+
+def test_resolve_list_last_uses_empty_rules():
+    """No rules, no lists."""
+    assert _resolve_list_last_uses([]) == {}
@@ -101,3 +101,18 @@ def test_invalid_rule_format_raises_error(tmp_path):
 
     with pytest.raises(RuleError):
         _load_rules_from_rulefile(rulefile)
+
+
+def test_rules_record_rulefile_and_line_number(tmp_path):
+    """Each rule records the rule file and line number it was loaded from."""
+    rulefile = write_rulefile(
+        tmp_ruledir=tmp_path,
+        text_to_write="# comment\n0|a|lines|a.txt|\n\n  1|b|lines|b.txt|\n",
+    )
+    rules = _load_rules_from_rulefile(rulefile)
+
+    assert [(rule.rulefile, rule.lineno) for rule in rules] == [
+        (rulefile, 2),
+        (rulefile, 4),
+    ]
+    assert rules[0] == Rule(0, re.compile("a"), "lines", "a.txt", None)
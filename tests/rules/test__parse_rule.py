@@ -3,7 +3,7 @@
 import re
 import pytest
 from mklists.errors import RuleError
-from mklists.rules.model import Rule
+from mklists.rules.model import ExactRule, Rule
 from mklists.rules.load import _parse_rule
 
 
@@ -87,3 +87,21 @@ def test_target_sortkey_less_than_zero_raises_error(bad_sortorder):
     ruleline_fields = ["1", ".*", "source", "target", bad_sortorder]
     with pytest.raises(RuleError):
         _parse_rule(ruleline_fields)
+
+
+def test_matchfield_with_equals_sign_gives_exact_rule():
+    """Match field suffixed with "=" gives rule testing equality with plain text."""
+    rule = _parse_rule(["1=", " @phone.* ", "lines", "phone", ""])
+    assert isinstance(rule, ExactRule)
+    assert rule.source_matchfield == 1
+    assert rule.source_matchvalue == "@phone.*"
+    assert rule.source_matcher.kind == "equal"
+    assert rule.source_matchpattern.search("@phone.*")
+    assert not rule.source_matchpattern.search("@phone.*x")
+    assert not rule.source_matchpattern.search("@phonebook")
+
+
+def test_matchfield_with_equals_sign_requires_integer():
+    """Exact match field must still be an integer."""
+    with pytest.raises(RuleError):
+        _parse_rule(["x=", "@phone", "lines", "phone", ""])
@@ -0,0 +1,65 @@
+"""Tests $MKLMKL/rules/matcher.py"""
+
+import pickle
+import re
+import pytest
+from mklists.rules.matcher import compile_matcher
+from mklists.rules.model import Rule
+
+
+@pytest.mark.parametrize(
+    "regex, kind, literal",
+    [
+        ("NOW", "literal", "NOW"),
+        ("^NOW", "prefix", "NOW"),
+        ("NOW$", "suffix", "NOW"),
+        ("^NOW$", "exact", "NOW"),
+        (r"^N\.OW", "prefix", "N.OW"),
+        (r"a\$", "literal", "a$"),
+        ("^X 19", "prefix", "X 19"),
+        ("", "literal", ""),
+        ("^N.W", "regex", None),
+        (r"^\d+", "regex", None),
+        ("a|b", "regex", None),
+        ("(?i)now", "regex", None),
+    ],
+)
+def test_compile_matcher_recognizes_literal_patterns(regex, kind, literal):
+    """Plain, anchored and escaped literals get string-method matchers."""
+    matcher = compile_matcher(re.compile(regex))
+
+    assert matcher.kind == kind
+    assert matcher.literal == literal
+
+
+@pytest.mark.parametrize("regex", ["NOW", "^NOW", "NOW$", "^NOW$", r"N\(OW", "^N.W"])
+@pytest.mark.parametrize(
+    "text", ["NOW", "NOW\n", "NOW later", "later NOW", "N(OW", "NOWNOW\n", "", "\n"]
+)
+def test_compile_matcher_agrees_with_regex_search(regex, text):
+    """Matcher succeeds exactly when regex search succeeds."""
+    pattern = re.compile(regex)
+
+    assert bool(compile_matcher(pattern).test(text)) == bool(pattern.search(text))
+
+
+def test_matcher_survives_pickling():
+    """Matchers can be pickled even though their test may be a closure."""
+    matcher = pickle.loads(pickle.dumps(compile_matcher(re.compile("^NOW"))))
+
+    assert matcher.kind == "prefix"
+    assert matcher.test("NOW then")
+
+
+def test_rule_carries_matcher_for_its_pattern():
+    """Rule exposes a matcher derived from its match pattern."""
+    rule = Rule(
+        source_matchfield=1,
+        source_matchpattern=re.compile("^NOW"),
+        source="lines",
+        target="now",
+        target_sortkey=None,
+    )
+
+    assert rule.source_matcher.kind == "prefix"
+    assert rule.source_matcher.pattern is rule.source_matchpattern
@@ -0,0 +1,116 @@
+"""Tests $MKLMKL/rules/load.py"""
+
+import re
+from mklists.rules.load import _parse_rule, group_rule_runs
+from mklists.rules.model import Rule
+
+
+def _rule(source, target, pattern=".", field=1):
+    return Rule(
+        source_matchfield=field,
+        source_matchpattern=re.compile(pattern),
+        source=source,
+        target=target,
+        target_sortkey=None,
+    )
+
+
+def _indexes(runs):
+    return [run.rule_indexes for run in runs]
+
+
+def test_rules_sharing_source_and_field_form_one_run():
+    """Consecutive rules with same source and match field form one run."""
+    rules = [_rule("lines", "now", "^NOW"), _rule("lines", "later", "^LATER")]
+
+    runs = group_rule_runs(rules)
+
+    assert _indexes(runs) == [(0, 1)]
+    assert runs[0].source == "lines"
+    assert runs[0].source_matchfield == 1
+
+
+def test_rules_on_other_lists_do_not_break_run():
+    """A rule reading and writing other lists does not interrupt a run."""
+    rules = [
+        _rule("lines", "now", "^NOW"),
+        _rule("now", "today", "x"),
+        _rule("lines", "later", "^LATER"),
+    ]
+
+    assert _indexes(group_rule_runs(rules)) == [(0, 2), (1,)]
+
+
+def test_rule_targeting_source_breaks_run():
+    """A rule adding lines to the source list ends the run."""
+    rules = [
+        _rule("lines", "now", "^NOW"),
+        _rule("now", "lines", "x"),
+        _rule("lines", "later", "^LATER"),
+    ]
+
+    assert _indexes(group_rule_runs(rules)) == [(0,), (1,), (2,)]
+
+
+def test_different_match_field_breaks_run():
+    """A rule testing a different match field starts a new run."""
+    rules = [_rule("lines", "now", "^NOW"), _rule("lines", "later", "^L", field=2)]
+
+    assert _indexes(group_rule_runs(rules)) == [(0,), (1,)]
+
+
+def test_pattern_with_groups_is_not_combined():
+    """Patterns with groups stand alone, since group numbers would shift."""
+    rules = [
+        _rule("lines", "now", "^NOW"),
+        _rule("lines", "later", r"(a)\1"),
+        _rule("lines", "today", "^T"),
+    ]
+
+    assert _indexes(group_rule_runs(rules)) == [(0,), (1,), (2,)]
+
+
+def test_classifier_reports_first_rule_not_leftmost_match():
+    """First matching rule wins, even if a later rule matches further left."""
+    rules = [_rule("lines", "now", "NOW"), _rule("lines", "later", "^LATER")]
+
+    classifier = group_rule_runs(rules)[0].classifier
+
+    assert classifier.match("LATER NOW").lastgroup == "r0"
+    assert classifier.match("LATER").lastgroup == "r1"
+    assert classifier.match("SOON") is None
+
+
+def test_single_rule_run_has_no_classifier():
+    """A run of one rule is tested with that rule's own pattern."""
+    assert group_rule_runs([_rule("lines", "now")])[0].classifier is None
+
+
+def _exact(source, target, value, field=1):
+    return _parse_rule([f"{field}=", value, source, target, ""])
+
+
+def test_exact_rules_form_run_with_index_of_first_rule_per_value():
+    """Run of exact rules is indexed by value, first rule winning on duplicates."""
+    rules = [
+        _exact("lines", "phone", "@phone"),
+        _exact("lines", "home", "@home"),
+        _exact("lines", "other", "@phone"),
+    ]
+
+    runs = group_rule_runs(rules)
+
+    assert _indexes(runs) == [(0, 1, 2)]
+    assert runs[0].index == {"@phone": 0, "@home": 1}
+    assert runs[0].classifier is None
+
+
+def test_exact_and_pattern_rules_form_separate_runs():
+    """Switching between exact and pattern rules starts a new run."""
+    rules = [
+        _exact("lines", "phone", "@phone"),
+        _rule("lines", "now", "^NOW"),
+        _rule("lines", "later", "^LATER"),
+    ]
+
+    assert _indexes(group_rule_runs(rules)) == [(0,), (1, 2)]